@@ -1,8 +1,5 @@
-import operator
-from functools import reduce
-
 from django.contrib.admin import SimpleListFilter
-from django.db.models import CharField, Q
+from django.db.models import CharField
 from django.db.models.functions import Length
 
 from admin_honeypot.admin import LoginAttemptAdmin as HoneypotLoginAttemptAdmin
@@ -76,7 +73,7 @@ class RegionFilter(SimpleListFilter):
     title = "Région"
 
     parameter_name = "region"
-    filter_parameter_name = "zipcode"
+    filter_parameter_name = "department_insee_code"
 
     def lookups(self, request, model_admin):
         return [(r.insee_code, r.name) for r in Region.objects.all()] + [
@@ -90,28 +87,26 @@ class RegionFilter(SimpleListFilter):
             return
 
         if region_pk == "other":
-            return queryset.filter(**{self.filter_parameter_name: 0})
+            return queryset.filter(
+                **{f"{self.filter_parameter_name}__isnull_or_blank": True}
+            )
 
-        region = Region.objects.get(pk=region_pk)
-        qgroup = reduce(
-            operator.or_,
-            (
-                Q(
-                    **{
-                        f"{self.filter_parameter_name}__startswith": d.zipcode  # noqa: E501
-                    }
-                )
-                for d in Department.objects.filter(region=region).all()
-            ),
-        )
-        return queryset.filter(qgroup)
+        # Corsican codes may only be known from the zipcode, see
+        # `Department.insee_code_from_zipcode`
+        codes = set()
+        for insee_code, zipcode in Department.objects.filter(
+            region_id=region_pk
+        ).values_list("insee_code", "zipcode"):
+            codes.update((insee_code, zipcode))
+
+        return queryset.filter(**{f"{self.filter_parameter_name}__in": codes})
 
 
 class DepartmentFilter(SimpleListFilter):
     title = "Département"
 
     parameter_name = "department"
-    filter_parameter_name = "zipcode"
+    filter_parameter_name = "department_insee_code"
 
     @classmethod
     def generate_filter_list(cls, region=None):
@@ -141,11 +136,15 @@ class DepartmentFilter(SimpleListFilter):
             return
         if department_value == "other":
             return queryset.filter(
-                Q(**{f"{self.filter_parameter_name}__isnull_or_blank": True})
-                | Q(**{f"{self.filter_parameter_name}__length__lt": 5})
+                **{f"{self.filter_parameter_name}__isnull_or_blank": True}
             )
         return queryset.filter(
-            **{f"{self.filter_parameter_name}__startswith": department_value}
+            **{
+                f"{self.filter_parameter_name}__in": {
+                    department_value,
+                    Department.extract_dept_zipcode(department_value),
+                }
+            }
         )
 
 
@@ -64,6 +64,32 @@ def getenv_bool(key: str, default: Optional[bool] = None) -> bool:
             )
 
 
+def getenv_datetime(key: str) -> Optional[datetime]:
+    """Obtains a timezone-aware datetime from an ISO 8601 environment variable
+
+    Values without a UTC offset are rejected: they would be compared with the
+    timezone-aware datetimes Django uses.
+
+    :param key: The name the the environment variable to load
+    :return: `None` if the environment variable is not set or empty
+    """
+    var = os.getenv(key)
+    if not var:
+        return None
+
+    try:
+        value = datetime.fromisoformat(var)
+    except ValueError:
+        raise ValueError(f"{key} is not a valid ISO 8601 datetime: {var}")
+
+    if value.tzinfo is None or value.utcoffset() is None:
+        raise ValueError(
+            f"{key} must include a UTC offset, e.g. 2026-11-01T00:00+01:00"
+        )
+
+    return value
+
+
 HOST = os.environ["HOST"]
 DEFAULT_AUTO_FIELD = "django.db.models.AutoField"
 
@@ -72,6 +98,12 @@ FC_AS_FI_CALLBACK_URL = os.environ["FC_AS_FI_CALLBACK_URL"]
 FC_AS_FI_ID = os.environ["FC_AS_FI_ID"]
 HASH_FC_AS_FI_SECRET = os.environ["HASH_FC_AS_FI_SECRET"]
 FC_AS_FI_HASH_SALT = os.environ["FC_AS_FI_HASH_SALT"]
+# Codes and tokens issued before they were stored as HMAC digests are still searched
+# by their PBKDF2 hash until this date (ISO 8601 with a UTC offset), unset once they
+# all expired
+FC_AS_FI_LEGACY_TOKEN_HASHES_UNTIL = getenv_datetime(
+    "FC_AS_FI_LEGACY_TOKEN_HASHES_UNTIL"
+)
 FC_AS_FI_LOGOUT_REDIRECT_URI = os.environ["FC_AS_FI_LOGOUT_REDIRECT_URI"]
 
 # FC as FS
@@ -79,8 +111,20 @@ FC_AS_FS_BASE_URL = os.environ["FC_AS_FS_BASE_URL"]
 FC_AS_FS_ID = os.environ["FC_AS_FS_ID"]
 FC_AS_FS_SECRET = os.environ["FC_AS_FS_SECRET"]
 FC_AS_FS_CALLBACK_URL = os.environ["FC_AS_FS_CALLBACK_URL"]
+# Seconds to wait for the token and userinfo endpoints of FranceConnect
+FC_AS_FS_HTTP_TIMEOUT = float(os.getenv("FC_AS_FS_HTTP_TIMEOUT", 5))
 
 FC_CONNECTION_AGE = int(os.environ["FC_CONNECTION_AGE"])
+# Expired connections are purged by batches, for at most the given time (in seconds)
+EXPIRED_CONNECTIONS_PURGE_BATCH_SIZE = int(
+    os.getenv("EXPIRED_CONNECTIONS_PURGE_BATCH_SIZE", 1000)
+)
+EXPIRED_CONNECTIONS_PURGE_TIME_BUDGET = int(
+    os.getenv("EXPIRED_CONNECTIONS_PURGE_TIME_BUDGET", 60)
+)
+# Same for the rows deleted by the other maintenance tasks
+MAINTENANCE_BATCH_SIZE = int(os.getenv("MAINTENANCE_BATCH_SIZE", 1000))
+MAINTENANCE_TIME_BUDGET = int(os.getenv("MAINTENANCE_TIME_BUDGET", 60))
 
 if os.environ.get("FC_AS_FS_TEST_PORT"):
     FC_AS_FS_TEST_PORT = int(os.environ["FC_AS_FS_TEST_PORT"])
@@ -350,6 +394,8 @@ MANDAT_TEMPLATE_DIR = "aidants_connect_web/mandat_templates"
 MANDAT_TEMPLATE_CURRENT_FILE = "20210308_mandat.html"
 MANDAT_TEMPLATE_PATH = os.path.join(MANDAT_TEMPLATE_DIR, MANDAT_TEMPLATE_CURRENT_FILE)
 ATTESTATION_SALT = os.getenv("ATTESTATION_SALT", "")
+# Mandates moved to another organisation per transaction by the transfer_mandates task
+MANDATE_TRANSFER_BATCH_SIZE = int(os.getenv("MANDATE_TRANSFER_BATCH_SIZE", 500))
 
 # Magic Auth
 MAGICAUTH_EMAIL_FIELD = "email"
@@ -391,6 +437,18 @@ EMAIL_USE_SSL = os.getenv("EMAIL_USE_SSL", None)
 EMAIL_EXTRA_HEADERS = os.getenv("EMAIL_EXTRA_HEADERS", None)
 EMAIL_SENDER = os.getenv("EMAIL_SENDER", os.getenv("ADMIN_EMAIL"))
 
+## Emails queued with aidants_connect_web.mail.queue_mail are sent by the
+## send_queued_emails task, EMAIL_OUTBOX_BATCH_SIZE at a time for at most
+## EMAIL_OUTBOX_TIME_BUDGET seconds. A failed email is retried after
+## EMAIL_OUTBOX_RETRY_DELAY seconds, doubled after each attempt, up to
+## EMAIL_OUTBOX_MAX_ATTEMPTS attempts. Sent emails are kept
+## EMAIL_OUTBOX_RETENTION_DAYS days.
+EMAIL_OUTBOX_BATCH_SIZE = int(os.getenv("EMAIL_OUTBOX_BATCH_SIZE", 100))
+EMAIL_OUTBOX_TIME_BUDGET = int(os.getenv("EMAIL_OUTBOX_TIME_BUDGET", 240))
+EMAIL_OUTBOX_RETRY_DELAY = int(os.getenv("EMAIL_OUTBOX_RETRY_DELAY", 60))
+EMAIL_OUTBOX_MAX_ATTEMPTS = int(os.getenv("EMAIL_OUTBOX_MAX_ATTEMPTS", 8))
+EMAIL_OUTBOX_RETENTION_DAYS = int(os.getenv("EMAIL_OUTBOX_RETENTION_DAYS", 30))
+
 ## Emails from the server
 SERVER_EMAIL = os.getenv("SERVER_EMAIL", os.getenv("ADMIN_EMAIL"))
 DEFAULT_FROM_EMAIL = os.getenv("DEFAULT_FROM_EMAIL", SERVER_EMAIL)
@@ -484,6 +542,39 @@ CELERY_RESULT_BACKEND = REDIS_URL
 CELERY_RESULT_SERIALIZER = JSON_SERIALIZER
 CELERY_TASK_SERIALIZER = JSON_SERIALIZER
 CELERY_ACCEPT_CONTENT = [JSON_CONTENT_TYPE]
+# Tasks triggered by the code under test, like the sending of queued emails, run
+# in the test process
+CELERY_TASK_ALWAYS_EAGER = "test" in sys.argv
+
+# Caches
+# FranceConnect handshake states (see aidants_connect_web/fc_handshakes.py) are
+# short-lived: they are kept in Redis, with native expiry, rather than in database
+FC_HANDSHAKE_CACHE = "fc_handshakes"
+CACHES = {
+    "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+    FC_HANDSHAKE_CACHE: {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": os.getenv("FC_HANDSHAKE_REDIS_URL", REDIS_URL),
+        "KEY_PREFIX": FC_HANDSHAKE_CACHE,
+    },
+}
+
+if "test" in sys.argv:
+    CACHES[FC_HANDSHAKE_CACHE] = {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": FC_HANDSHAKE_CACHE,
+    }
+
+# Attestation QR codes (see aidants_connect_web/qrcodes.py) are kept in an in-process
+# LRU and, if QRCODE_REDIS_URL is set, in a cache shared by all processes
+QRCODE_LOCAL_CACHE_SIZE = int(os.getenv("QRCODE_LOCAL_CACHE_SIZE", 1024))
+QRCODE_CACHE = "qrcodes" if os.getenv("QRCODE_REDIS_URL") else None
+if QRCODE_CACHE:
+    CACHES[QRCODE_CACHE] = {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": os.getenv("QRCODE_REDIS_URL"),
+        "KEY_PREFIX": QRCODE_CACHE,
+    }
 
 # COVID-19 changes
 ETAT_URGENCE_2020_LAST_DAY = datetime.strptime(
@@ -509,6 +600,9 @@ AC_IMPORT_HABILITATION_REQUESTS = getenv_bool("AC_IMPORT_HABILITATION_REQUESTS",
 SUPPORT_EMAIL = "connexion@aidantsconnect.beta.gouv.fr"
 
 MANDAT_EXPIRED_SOON = 30
+USAGERS_INDEX_PAGE_SIZE = int(os.getenv("USAGERS_INDEX_PAGE_SIZE", 500))
+# How long (in seconds) browsers and proxies may cache the public statistics page
+STATISTICS_CACHE_MAX_AGE = int(os.getenv("STATISTICS_CACHE_MAX_AGE", 3600))
 MANDAT_EXPIRED_SOON_EMAIL_SUBJECT = os.getenv(
     "MANDAT_EXPIRED_SOON_EMAIL_SUBJECT", "Ces mandats vont bientôt expirer"
 )
@@ -523,6 +617,11 @@ WORKERS_NO_TOTP_NOTIFY_EMAIL_FROM = os.getenv(
     "WORKERS_NO_TOTP_NOTIFY_EMAIL_FROM", SUPPORT_EMAIL
 )
 
+## The periodic notification emails are rendered by NOTIFICATIONS_RENDER_WORKERS
+## processes and sent NOTIFICATIONS_BATCH_SIZE at a time through one connection
+NOTIFICATIONS_BATCH_SIZE = int(os.getenv("NOTIFICATIONS_BATCH_SIZE", 100))
+NOTIFICATIONS_RENDER_WORKERS = int(os.getenv("NOTIFICATIONS_RENDER_WORKERS", 1))
+
 PHONENUMBER_DEFAULT_REGION = os.getenv("PHONENUMBER_DEFAULT_REGION", "FR")
 
 AIDANTS__ORGANISATIONS_CHANGED_EMAIL_SUBJECT = os.getenv(
@@ -595,6 +694,16 @@ EMAIL_NEW_MESSAGE_RECEIVED_SUBJECT = os.getenv(
 PIX_METABASE_USER = os.getenv("PIX_METABASE_USER")
 PIX_METABASE_PASSWORD = os.getenv("PIX_METABASE_PASSWORD")
 PIX_METABASE_CARD_ID = os.getenv("PIX_METABASE_CARD_ID")
+PIX_METABASE_BASE_URL = os.getenv("PIX_METABASE_BASE_URL", "https://metabase.pix.fr")
+PIX_METABASE_HTTP_TIMEOUT = float(os.getenv("PIX_METABASE_HTTP_TIMEOUT", 60))
+
+# Outbound HTTP calls fail immediately for HTTP_CIRCUIT_BREAKER_RESET_TIMEOUT
+# seconds after HTTP_CIRCUIT_BREAKER_THRESHOLD consecutive failures of a service,
+# see aidants_connect_common.utils.http_client
+HTTP_CIRCUIT_BREAKER_THRESHOLD = int(os.getenv("HTTP_CIRCUIT_BREAKER_THRESHOLD", 5))
+HTTP_CIRCUIT_BREAKER_RESET_TIMEOUT = int(
+    os.getenv("HTTP_CIRCUIT_BREAKER_RESET_TIMEOUT", 30)
+)
 
 if "test" in sys.argv:
     GOUV_ADDRESS_SEARCH_API_DISABLED = True
@@ -607,6 +716,21 @@ else:
         "GOUV_ADDRESS_SEARCH_API_BASE_URL", "https://api-adresse.data.gouv.fr/search/"
     )
 
+# Seconds to wait for the address API, see `search_adresses`
+GOUV_ADDRESS_SEARCH_API_TIMEOUT = float(os.getenv("GOUV_ADDRESS_SEARCH_API_TIMEOUT", 2))
+# Responses are kept in the database, and in an LRU in each process, for
+# GOUV_ADDRESS_SEARCH_CACHE_TIMEOUT seconds, or for
+# GOUV_ADDRESS_SEARCH_NEGATIVE_CACHE_TIMEOUT seconds if there was no result
+GOUV_ADDRESS_SEARCH_CACHE_TIMEOUT = int(
+    os.getenv("GOUV_ADDRESS_SEARCH_CACHE_TIMEOUT", 30 * 24 * 60 * 60)
+)
+GOUV_ADDRESS_SEARCH_NEGATIVE_CACHE_TIMEOUT = int(
+    os.getenv("GOUV_ADDRESS_SEARCH_NEGATIVE_CACHE_TIMEOUT", 24 * 60 * 60)
+)
+GOUV_ADDRESS_SEARCH_LOCAL_CACHE_SIZE = int(
+    os.getenv("GOUV_ADDRESS_SEARCH_LOCAL_CACHE_SIZE", 512)
+)
+
 AUTOCOMPLETE_SCRIPT_SRC = "https://cdn.jsdelivr.net/npm/@tarekraafat/autocomplete.js@10.2.7/dist/autoComplete.min.js"  # noqa
 
 if not GOUV_ADDRESS_SEARCH_API_DISABLED:
@@ -0,0 +1,129 @@
+import logging
+from datetime import timedelta
+from time import monotonic
+from uuid import uuid4
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from django_otp.plugins.otp_static.models import StaticDevice, StaticToken
+from django_otp.plugins.otp_totp.models import TOTPDevice
+
+from aidants_connect_common.models import AddressAPIResult
+from aidants_connect_common.tasks import purge_address_api_results
+from aidants_connect_common.utils.maintenance import MaintenanceReport
+from aidants_connect_habilitation.models import Issuer, IssuerEmailConfirmation
+from aidants_connect_habilitation.tasks import delete_expired_email_confirmations
+from aidants_connect_web.models import Aidant, Connection, Organisation
+from aidants_connect_web.tasks import (
+    delete_duplicated_static_tokens,
+    delete_expired_connections,
+)
+
+logger = logging.getLogger()
+
+
+class Command(BaseCommand):
+    help = (
+        "Seeds rows to delete for each maintenance task, runs the tasks and prints "
+        "their reports. Everything is rolled back at the end."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--rows",
+            type=int,
+            default=10000,
+            help="Number of rows to delete seeded for each task",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            help="Number of rows deleted per statement",
+        )
+
+    def handle(self, *args, **options):
+        rows, batch_size = options["rows"], options["batch_size"]
+
+        with transaction.atomic():
+            start = monotonic()
+            self.seed(rows)
+            self.stdout.write(
+                f"Seeded {rows} rows per task in {monotonic() - start:.2f}s"
+            )
+
+            results = [
+                delete_expired_connections(
+                    batch_size=batch_size, time_budget=float("inf"), logger=logger
+                ),
+                *delete_duplicated_static_tokens(
+                    batch_size=batch_size, time_budget=float("inf"), logger=logger
+                ),
+                delete_expired_email_confirmations(
+                    batch_size=batch_size, time_budget=float("inf"), logger=logger
+                ),
+                purge_address_api_results(
+                    batch_size=batch_size, time_budget=float("inf"), logger=logger
+                ),
+            ]
+            for result in results:
+                self.stdout.write(str(MaintenanceReport(**result)))
+
+            transaction.set_rollback(True)
+
+    def seed(self, rows: int):
+        past = timezone.now() - timedelta(days=1)
+
+        Connection.objects.bulk_create(
+            Connection(state=uuid4().hex, code=uuid4().hex, expires_on=past)
+            for _ in range(rows)
+        )
+
+        organisation = Organisation.objects.create(name="Benchmark")
+        confirmed_aidant, aidant = (
+            Aidant.objects.create(
+                username=f"{uuid4().hex}@benchmark.local",
+                email=f"{uuid4().hex}@benchmark.local",
+                profession="Benchmark",
+                organisation=organisation,
+            )
+            for _ in range(2)
+        )
+        TOTPDevice.objects.create(
+            user=confirmed_aidant, name="Benchmark", confirmed=True
+        )
+        obsolete_device = StaticDevice.objects.create(user=confirmed_aidant)
+        device = StaticDevice.objects.create(user=aidant)
+        # Half of the tokens of `device` are duplicates
+        StaticToken.objects.bulk_create(
+            [
+                *(
+                    StaticToken(device=obsolete_device, token=f"{i:06d}")
+                    for i in range(rows)
+                ),
+                *(
+                    StaticToken(device=device, token=f"{i // 2:06d}")
+                    for i in range(rows * 2)
+                ),
+            ]
+        )
+
+        issuer = Issuer.objects.create(
+            first_name="Bench",
+            last_name="Mark",
+            profession="Benchmark",
+            email=f"{uuid4().hex}@benchmark.local",
+        )
+        sent = timezone.now() - timedelta(
+            days=settings.EMAIL_CONFIRMATION_EXPIRE_DAYS + 1
+        )
+        IssuerEmailConfirmation.objects.bulk_create(
+            IssuerEmailConfirmation(issuer=issuer, sent=sent) for _ in range(rows)
+        )
+
+        AddressAPIResult.objects.bulk_create(
+            AddressAPIResult(query=f"benchmark {uuid4().hex}", expiration_date=past)
+            for _ in range(rows)
+        )
@@ -0,0 +1,91 @@
+import csv
+import logging
+import re
+import unicodedata
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from aidants_connect_common.models import Commune
+
+logger = logging.getLogger()
+
+# Column names vary between the releases of the dataset
+COLUMNS = {
+    "code_commune_insee": "insee_code",
+    "code_postal": "zipcode",
+    "nom_commune": "name",
+    "nom_de_la_commune": "name",
+    "libelle_d_acheminement": "label",
+    "ligne_5": "line_5",
+}
+
+
+def _column_name(header: str) -> str:
+    header = unicodedata.normalize("NFKD", header.strip().lstrip("#"))
+    header = "".join(char for char in header if not unicodedata.combining(char))
+    return COLUMNS.get(re.sub(r"\W+", "_", header.lower()).strip("_"))
+
+
+class Command(BaseCommand):
+    help = (
+        "Replaces the communes used to find INSEE codes offline with those of the "
+        "La Poste hexasmal CSV file (https://www.data.gouv.fr/fr/datasets/"
+        "base-officielle-des-codes-postaux/)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("csv_file", type=Path, help="Path to the CSV file")
+        parser.add_argument(
+            "--encoding",
+            default="utf-8-sig",
+            help="Encoding of the CSV file, older releases use latin-1",
+        )
+        parser.add_argument("--batch-size", type=int, default=5000)
+
+    def handle(self, *args, **options):
+        path = Path(options["csv_file"])
+        if not path.is_file():
+            raise CommandError(f"{path} is not a file")
+
+        with open(path, newline="", encoding=options["encoding"]) as f:
+            dialect = csv.Sniffer().sniff(f.readline(), delimiters=";,")
+            f.seek(0)
+            reader = csv.reader(f, dialect)
+            columns = [_column_name(header) for header in next(reader)]
+
+            missing = {"insee_code", "zipcode", "name"} - set(columns)
+            if missing:
+                raise CommandError(f"Missing columns in {path}: {sorted(missing)}")
+
+            communes = {}
+            for row in reader:
+                values = {
+                    column: value.strip()
+                    for column, value in zip(columns, row)
+                    if column is not None
+                }
+                insee_code = values["insee_code"].zfill(5)
+                zipcode = values["zipcode"].zfill(5)
+                for name in (
+                    values["name"],
+                    values.get("label", ""),
+                    values.get("line_5", ""),
+                ):
+                    key = (Commune.normalize_name(name), zipcode, insee_code)
+                    if key[0] and key not in communes:
+                        communes[key] = Commune(
+                            insee_code=insee_code,
+                            zipcode=zipcode,
+                            name=name,
+                            normalized_name=key[0],
+                        )
+
+        with transaction.atomic():
+            Commune.objects.all().delete()
+            Commune.objects.bulk_create(
+                communes.values(), batch_size=options["batch_size"]
+            )
+
+        logger.info(f"Loaded {len(communes)} commune names from {path}")
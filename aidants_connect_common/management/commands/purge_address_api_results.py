@@ -0,0 +1,30 @@
+import logging
+
+from django.core.management.base import BaseCommand
+
+from aidants_connect_common.tasks import purge_address_api_results
+
+logger = logging.getLogger()
+
+
+class Command(BaseCommand):
+    help = "Deletes the expired responses of the address API from the cache"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            help="Number of results deleted per statement",
+        )
+        parser.add_argument(
+            "--time-budget",
+            type=int,
+            help="Time, in seconds, after which no new batch is started",
+        )
+
+    def handle(self, *args, **options):
+        purge_address_api_results(
+            batch_size=options["batch_size"],
+            time_budget=options["time_budget"],
+            logger=logger,
+        )
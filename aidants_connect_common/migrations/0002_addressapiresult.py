@@ -0,0 +1,26 @@
+# Generated by Django 4.0.10 on 2026-10-18 21:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('aidants_connect_common', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AddressAPIResult',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('query', models.TextField(unique=True, verbose_name='Requête')),
+                ('results', models.JSONField(default=list, verbose_name='Résultats')),
+                ('expiration_date', models.DateTimeField(db_index=True, verbose_name="Date d'expiration")),
+            ],
+            options={
+                'verbose_name': "Résultat de l'API adresse",
+                'verbose_name_plural': "Résultats de l'API adresse",
+            },
+        ),
+    ]
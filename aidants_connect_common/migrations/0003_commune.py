@@ -0,0 +1,30 @@
+# Generated by Django 4.0.10 on 2026-10-18 21:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('aidants_connect_common', '0002_addressapiresult'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Commune',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('insee_code', models.CharField(max_length=5, verbose_name='Code INSEE')),
+                ('zipcode', models.CharField(max_length=5, verbose_name='Code Postal')),
+                ('name', models.CharField(max_length=100, verbose_name='Nom')),
+                ('normalized_name', models.CharField(max_length=100, verbose_name='Nom normalisé')),
+            ],
+            options={
+                'verbose_name': 'Commune',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='commune',
+            constraint=models.UniqueConstraint(fields=('normalized_name', 'zipcode', 'insee_code'), name='unique_commune_name_per_zipcode'),
+        ),
+    ]
@@ -1,7 +1,10 @@
-from typing import Any
+import re
+import unicodedata
+from typing import Any, Collection, Dict, Optional, Set, Tuple
 
 from django.db import models
 from django.db.models import CASCADE
+from django.utils.timezone import now
 
 
 class Region(models.Model):
@@ -38,5 +41,156 @@ class Department(models.Model):
 
         return code[:2]
 
+    @classmethod
+    def insee_code_from_zipcode(
+        cls, zipcode: Any, current: Optional[str] = None
+    ) -> Optional[str]:
+        """Guesses the value of the `department_insee_code` columns from `zipcode`,
+        `None` if it is not a complete zipcode.
+
+        This is only a fallback for rows whose department is not known from the
+        address API: the zipcode of some communes is not the one of their
+        department, collectivités d'outre-mer share zipcodes with the department
+        they are close to and Corsican zipcodes do not tell Corse-du-Sud from
+        Haute-Corse apart ("20" is returned unless `current` is one of them).
+        """
+        zipcode = str(zipcode or "").strip()
+        if len(zipcode) < 5:
+            return None
+
+        code = cls.extract_dept_zipcode(zipcode)
+        if code == "20" and current in ("2A", "2B"):
+            return current
+
+        return code
+
     class Meta:
         verbose_name = "Département"
+
+
+class DepartmentInseeCodeMixin:
+    """Maintains the `department_insee_code` field of a model from its `zipcode`.
+
+    A code set along with the zipcode, by the address API, is kept. When the zipcode
+    changes without the code, it is guessed again with
+    `Department.insee_code_from_zipcode`.
+    """
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        if {"zipcode", "department_insee_code"}.issubset(field_names):
+            instance._loaded_address = (
+                instance.zipcode,
+                instance.department_insee_code,
+            )
+        return instance
+
+    def department_insee_code_is_stale(self) -> bool:
+        if not self.department_insee_code:
+            return True
+
+        loaded_address = getattr(self, "_loaded_address", None)
+        if loaded_address is None:
+            return False
+
+        loaded_zipcode, loaded_code = loaded_address
+        return (
+            self.zipcode != loaded_zipcode and self.department_insee_code == loaded_code
+        )
+
+    def save(self, *args, **kwargs):
+        if self.department_insee_code_is_stale():
+            self.department_insee_code = Department.insee_code_from_zipcode(
+                self.zipcode, self.department_insee_code
+            )
+            update_fields = kwargs.get("update_fields")
+            if update_fields is not None and "zipcode" in update_fields:
+                kwargs["update_fields"] = {*update_fields, "department_insee_code"}
+        super().save(*args, **kwargs)
+        self._loaded_address = (self.zipcode, self.department_insee_code)
+
+
+class AddressAPIResultQuerySet(models.QuerySet):
+    def expired(self):
+        return self.filter(expiration_date__lte=now())
+
+
+class AddressAPIResult(models.Model):
+    """Response of the government address API to a normalized query.
+
+    See `aidants_connect_common.utils.gouv_address_api.search_adresses`.
+    """
+
+    query = models.TextField("Requête", unique=True)
+    results = models.JSONField("Résultats", default=list)
+    expiration_date = models.DateTimeField("Date d'expiration", db_index=True)
+
+    objects = AddressAPIResultQuerySet.as_manager()
+
+    def __str__(self):
+        return self.query
+
+    class Meta:
+        verbose_name = "Résultat de l'API adresse"
+        verbose_name_plural = "Résultats de l'API adresse"
+
+
+class CommuneQuerySet(models.QuerySet):
+    def resolve_insee_codes(
+        self, keys: Collection[Tuple[str, str]]
+    ) -> Dict[Tuple[str, str], Set[str]]:
+        """Returns the INSEE codes of the communes matching each
+        ``(normalized name, zipcode)`` of `keys`, in a single query.
+
+        Keys without a matching commune are omitted.
+        """
+        keys = set(keys)
+        if not keys:
+            return {}
+
+        codes = {}
+        rows = self.filter(
+            normalized_name__in={name for name, _ in keys},
+            zipcode__in={zipcode for _, zipcode in keys},
+        ).values_list("normalized_name", "zipcode", "insee_code")
+        for name, zipcode, insee_code in rows:
+            if (name, zipcode) in keys:
+                codes.setdefault((name, zipcode), set()).add(insee_code)
+
+        return codes
+
+
+class Commune(models.Model):
+    """A name a commune is known by at a zipcode, from the La Poste hexasmal
+    dataset. See the ``load_communes`` command."""
+
+    insee_code = models.CharField("Code INSEE", max_length=5)
+    zipcode = models.CharField("Code Postal", max_length=5)
+    name = models.CharField("Nom", max_length=100)
+    normalized_name = models.CharField("Nom normalisé", max_length=100)
+
+    objects = CommuneQuerySet.as_manager()
+
+    def __str__(self):
+        return f"{self.name} ({self.zipcode})"
+
+    @staticmethod
+    def normalize_name(name: Any) -> str:
+        """Normalizes a city name the way the hexasmal dataset writes them:
+        uppercase, without accents nor punctuation and with the usual
+        abbreviations."""
+        name = unicodedata.normalize("NFKD", str(name or ""))
+        name = "".join(char for char in name if not unicodedata.combining(char))
+        name = re.sub(r"[\W_]+", " ", name.upper()).strip()
+        name = re.sub(r"\bSAINTE\b", "STE", name)
+        return re.sub(r"\bSAINT\b", "ST", name)
+
+    class Meta:
+        constraints = (
+            models.UniqueConstraint(
+                fields=("normalized_name", "zipcode", "insee_code"),
+                name="unique_commune_name_per_zipcode",
+            ),
+        )
+        verbose_name = "Commune"
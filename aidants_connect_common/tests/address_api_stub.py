@@ -0,0 +1,64 @@
+import json
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Thread
+from time import sleep
+from typing import Dict, List
+from urllib.parse import parse_qs, urlparse
+
+
+class AddressAPIStub:
+    """Serves canned responses of the government address API on localhost.
+
+    `features` maps a query to the properties of the features returned for it.
+    Every received query is appended to `queries`.
+    """
+
+    def __init__(self, features: Dict[str, List[dict]] = None, delay: float = 0):
+        self.features = features or {}
+        self.delay = delay
+        self.queries = []
+
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                query = parse_qs(urlparse(self.path).query).get("q", [""])[0]
+                stub.queries.append(query)
+                sleep(stub.delay)
+
+                body = json.dumps(
+                    {
+                        "type": "FeatureCollection",
+                        "features": [
+                            {"type": "Feature", "properties": properties}
+                            for properties in stub.features.get(query, [])
+                        ],
+                    }
+                ).encode()
+                try:
+                    self.send_response(200)
+                    self.send_header("Content-Type", "application/json")
+                    self.send_header("Content-Length", str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+                except ConnectionError:
+                    # The client gave up waiting
+                    pass
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server.server_port}/search/"
+
+    def __enter__(self):
+        Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *args):
+        self.server.shutdown()
+        self.server.server_close()
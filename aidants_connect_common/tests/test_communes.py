@@ -0,0 +1,99 @@
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from aidants_connect_common.models import Commune
+from aidants_connect_common.tasks import autofill_insee_code
+from aidants_connect_habilitation.tests.factories import (
+    ManagerFactory,
+    OrganisationRequestFactory,
+)
+from aidants_connect_web.tests.factories import OrganisationFactory
+
+HEXASMAL = "\n".join(
+    [
+        "#Code_commune_INSEE;Nom_commune;Code_postal;Ligne_5;"
+        "Libellé_d_acheminement;coordonnees_gps",
+        "27340;HOULBEC COCHEREL;27120;;HOULBEC COCHEREL;49.0726, 1.3650",
+        "42218;ST ETIENNE;42000;;ST ETIENNE;45.4301, 4.3791",
+        "42218;ST ETIENNE;42100;;ST ETIENNE;45.4301, 4.3791",
+        "75111;PARIS 11;75011;;PARIS;48.8591, 2.3800",
+        "97411;ST DENIS;97400;;ST DENIS;-20.9331, 55.4471",
+        "97411;ST DENIS;97490;STE CLOTILDE;ST DENIS;-20.9331, 55.4471",
+        "01001;L ABERGEMENT CLEMENCIAT;01400;;L ABERGEMENT CLEMENCIAT;46.1534, 4.9260",
+        "01400;L ABERGEMENT CLEMENCIAT;01400;;L ABERGEMENT CLEMENCIAT;46.1534, 4.9260",
+        "",
+    ]
+)
+
+
+class CommuneTests(TestCase):
+    def load_communes(self, content: str, encoding: str = "utf-8"):
+        with TemporaryDirectory() as directory:
+            path = Path(directory) / "laposte_hexasmal.csv"
+            path.write_text(content, encoding=encoding)
+            call_command("load_communes", path, encoding=encoding)
+
+    def test_load_communes(self):
+        self.load_communes(HEXASMAL, encoding="latin-1")
+
+        self.assertEqual(10, Commune.objects.count())
+        self.assertEqual(
+            {"97411"},
+            set(
+                Commune.objects.filter(
+                    normalized_name="STE CLOTILDE", zipcode="97490"
+                ).values_list("insee_code", flat=True)
+            ),
+        )
+
+        # Loading the file again replaces the communes
+        self.load_communes(
+            "code_commune_insee,nom_de_la_commune,code_postal,"
+            "libelle_d_acheminement,ligne_5\n"
+            "27340,HOULBEC COCHEREL,27120,HOULBEC COCHEREL,\n"
+        )
+        self.assertEqual(
+            ["HOULBEC COCHEREL"],
+            list(Commune.objects.values_list("name", flat=True)),
+        )
+
+    def test_autofill_insee_code(self):
+        self.load_communes(HEXASMAL)
+
+        organisations = [
+            OrganisationFactory(city="Houlbec-Cocherel", zipcode="27120"),
+            OrganisationFactory(city="Paris", zipcode="75011"),
+            OrganisationFactory(city="Paris", zipcode="0"),
+            # Two communes are known by this name at this zipcode
+            OrganisationFactory(city="L'Abergement-Clémenciat", zipcode="01400"),
+        ]
+        manager = ManagerFactory(city="Saint-Étienne", zipcode="42100")
+        organisation_request = OrganisationRequestFactory(
+            city="Sainte-Clotilde", zipcode="97490"
+        )
+
+        with self.assertNumQueries(10):
+            autofill_insee_code()
+
+        for item in organisations:
+            item.refresh_from_db()
+        manager.refresh_from_db()
+        organisation_request.refresh_from_db()
+
+        self.assertEqual(
+            ["27340", "75111", None, None],
+            [item.city_insee_code for item in organisations],
+        )
+        self.assertEqual("42218", manager.city_insee_code)
+        self.assertEqual("97411", organisation_request.city_insee_code)
+
+    def test_autofill_insee_code_without_communes(self):
+        organisation = OrganisationFactory(city="Paris", zipcode="75011")
+
+        autofill_insee_code()
+
+        organisation.refresh_from_db()
+        self.assertIsNone(organisation.city_insee_code)
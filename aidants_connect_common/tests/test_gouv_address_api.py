@@ -0,0 +1,110 @@
+from datetime import timedelta
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils.timezone import now
+
+from freezegun import freeze_time
+
+from aidants_connect_common.models import AddressAPIResult
+from aidants_connect_common.tests.address_api_stub import AddressAPIStub
+from aidants_connect_common.utils.gouv_address_api import (
+    clear_local_cache,
+    search_adresses,
+)
+
+ADDRESS = {
+    "id": "75107_8909_00013",
+    "name": "13 Rue Saint-Dominique",
+    "label": "13 Rue Saint-Dominique 75007 Paris",
+    "score": 0.97,
+    "postcode": "75007",
+    "city": "Paris",
+    "citycode": "75107",
+    "context": "75, Paris, Île-de-France",
+    "type": "housenumber",
+}
+
+
+@override_settings(
+    GOUV_ADDRESS_SEARCH_API_DISABLED=False,
+    GOUV_ADDRESS_SEARCH_API_TIMEOUT=0.5,
+    GOUV_ADDRESS_SEARCH_CACHE_TIMEOUT=3600,
+    GOUV_ADDRESS_SEARCH_NEGATIVE_CACHE_TIMEOUT=60,
+)
+class SearchAdressesTests(TestCase):
+    def setUp(self):
+        clear_local_cache()
+        self.addCleanup(clear_local_cache)
+
+    def search(self, stub: AddressAPIStub, query_string: str):
+        with override_settings(GOUV_ADDRESS_SEARCH_API_BASE_URL=stub.url):
+            return search_adresses(query_string)
+
+    def test_results_are_cached_by_normalized_query(self):
+        query = "13 rue saint-dominique 75007 paris"
+        with AddressAPIStub({query: [ADDRESS]}) as stub:
+            results = self.search(stub, "13 Rue Saint-Dominique  75007 Paris ")
+            self.assertEqual(1, len(results))
+            self.assertEqual("75107", results[0].citycode)
+            self.assertEqual("75", results[0].context.department_number)
+
+            self.assertEqual(
+                results, self.search(stub, "13 rue Saint-Dominique 75007 PARIS")
+            )
+
+            # Other processes only share the database
+            clear_local_cache()
+            self.assertEqual(results, self.search(stub, query))
+
+        self.assertEqual([query], stub.queries)
+        self.assertEqual(1, AddressAPIResult.objects.count())
+
+    def test_empty_results_are_cached_for_a_shorter_time(self):
+        with AddressAPIStub() as stub:
+            with freeze_time(now()) as frozen_time:
+                self.assertEqual([], self.search(stub, "nowhere"))
+                self.assertEqual(
+                    now() + timedelta(seconds=60),
+                    AddressAPIResult.objects.get(query="nowhere").expiration_date,
+                )
+
+                frozen_time.tick(timedelta(seconds=59))
+                self.search(stub, "nowhere")
+                self.assertEqual(1, len(stub.queries))
+
+                frozen_time.tick(timedelta(seconds=2))
+                self.search(stub, "nowhere")
+                self.assertEqual(2, len(stub.queries))
+
+    def test_failed_requests_are_not_cached(self):
+        with AddressAPIStub({"paris": [ADDRESS]}, delay=1) as stub:
+            self.assertEqual([], self.search(stub, "paris"))
+
+        self.assertFalse(AddressAPIResult.objects.exists())
+
+    def test_local_cache_is_bounded(self):
+        with AddressAPIStub({"paris": [ADDRESS]}) as stub:
+            with override_settings(GOUV_ADDRESS_SEARCH_LOCAL_CACHE_SIZE=1):
+                self.search(stub, "paris")
+                self.search(stub, "lyon")
+                AddressAPIResult.objects.all().delete()
+                self.search(stub, "paris")
+
+        self.assertEqual(["paris", "lyon", "paris"], stub.queries)
+
+    def test_purge_address_api_results(self):
+        AddressAPIResult.objects.create(
+            query="paris",
+            results=[ADDRESS],
+            expiration_date=now() - timedelta(seconds=1),
+        )
+        AddressAPIResult.objects.create(
+            query="lyon", results=[], expiration_date=now() + timedelta(days=1)
+        )
+
+        call_command("purge_address_api_results")
+
+        self.assertEqual(
+            ["lyon"], list(AddressAPIResult.objects.values_list("query", flat=True))
+        )
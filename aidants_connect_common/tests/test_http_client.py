@@ -0,0 +1,70 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.test import SimpleTestCase, override_settings
+
+from freezegun import freeze_time
+from requests.exceptions import Timeout
+
+from aidants_connect_common.tests.address_api_stub import AddressAPIStub
+from aidants_connect_common.utils.http_client import CircuitOpenError, HttpClient
+
+
+@override_settings(
+    GOUV_ADDRESS_SEARCH_API_TIMEOUT=0.2,
+    HTTP_CIRCUIT_BREAKER_THRESHOLD=2,
+    HTTP_CIRCUIT_BREAKER_RESET_TIMEOUT=30,
+)
+class HttpClientTests(SimpleTestCase):
+    def setUp(self):
+        self.client = HttpClient(
+            "test", timeout_setting="GOUV_ADDRESS_SEARCH_API_TIMEOUT"
+        )
+
+    def test_requests_time_out(self):
+        with AddressAPIStub(delay=1) as stub:
+            with self.assertRaises(Timeout):
+                self.client.get(stub.url)
+
+        with AddressAPIStub() as stub:
+            self.assertEqual(200, self.client.get(stub.url).status_code)
+
+        self.assertEqual(2, self.client.metrics["requests"])
+        self.assertEqual(1, self.client.metrics["failures"])
+        self.assertGreaterEqual(self.client.metrics["max_seconds"], 0.2)
+
+    def test_circuit_opens_after_consecutive_failures(self):
+        with freeze_time() as frozen_time, mock.patch.object(
+            self.client.session, "request"
+        ) as request_mock:
+            request_mock.return_value = mock.Mock(status_code=503)
+            self.client.get("http://service/")
+            self.client.get("http://service/")
+
+            with self.assertRaises(CircuitOpenError):
+                self.client.get("http://service/")
+            self.assertEqual(2, request_mock.call_count)
+            self.assertEqual(1, self.client.metrics["rejected"])
+
+            # Once the reset timeout has passed, a request probes the service
+            frozen_time.tick(timedelta(seconds=31))
+            request_mock.return_value = mock.Mock(status_code=200)
+            self.client.get("http://service/")
+            self.client.get("http://service/")
+            self.assertEqual(4, request_mock.call_count)
+
+    def test_failed_probe_reopens_the_circuit(self):
+        with freeze_time() as frozen_time, mock.patch.object(
+            self.client.session, "request", side_effect=Timeout()
+        ) as request_mock:
+            for _ in range(2):
+                with self.assertRaises(Timeout):
+                    self.client.get("http://service/")
+
+            frozen_time.tick(timedelta(seconds=31))
+            with self.assertRaises(Timeout):
+                self.client.get("http://service/")
+            with self.assertRaises(CircuitOpenError):
+                self.client.get("http://service/")
+
+            self.assertEqual(3, request_mock.call_count)
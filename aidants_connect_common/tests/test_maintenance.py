@@ -0,0 +1,103 @@
+import logging
+from datetime import timedelta
+from io import StringIO
+from threading import Event, Thread
+from time import sleep
+
+from django.core.management import call_command
+from django.db import connection, connections, transaction
+from django.test import TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from aidants_connect_common.models import AddressAPIResult
+from aidants_connect_common.utils.maintenance import delete_in_batches
+from aidants_connect_web.models import Connection
+
+logger = logging.getLogger()
+
+
+def create_results(count: int, expired: bool = True):
+    expiration_date = timezone.now() + timedelta(days=-1 if expired else 1)
+    return AddressAPIResult.objects.bulk_create(
+        AddressAPIResult(
+            query=f"{'expired' if expired else 'valid'} {i}",
+            expiration_date=expiration_date,
+        )
+        for i in range(count)
+    )
+
+
+class DeleteInBatchesTests(TestCase):
+    def test_deletes_rows_of_queryset_by_batches(self):
+        create_results(5)
+        valid = create_results(1, expired=False)
+
+        with CaptureQueriesContext(connection) as queries:
+            report = delete_in_batches(
+                AddressAPIResult.objects.expired(), batch_size=2, logger=logger
+            )
+
+        self.assertEqual(
+            [query["sql"].startswith("DELETE") for query in queries].count(True), 3
+        )
+        self.assertEqual(report.rows, 5)
+        self.assertEqual(report.batches, 3)
+        self.assertTrue(report.complete)
+        self.assertEqual(
+            list(AddressAPIResult.objects.values_list("pk", flat=True)),
+            [result.pk for result in valid],
+        )
+
+    def test_stops_when_time_budget_is_spent(self):
+        create_results(5)
+
+        report = delete_in_batches(
+            AddressAPIResult.objects.expired(),
+            batch_size=2,
+            time_budget=0,
+            logger=logger,
+        )
+
+        self.assertEqual(report.rows, 2)
+        self.assertFalse(report.complete)
+        self.assertEqual(AddressAPIResult.objects.count(), 3)
+
+    def test_benchmark_is_rolled_back(self):
+        stdout = StringIO()
+        call_command(
+            "benchmark_maintenance_tasks", rows=10, batch_size=4, stdout=stdout
+        )
+
+        self.assertIn(
+            "expired connections: 10 rows deleted in 3 batches", stdout.getvalue()
+        )
+        self.assertIn("duplicated static tokens: 10 rows deleted", stdout.getvalue())
+        self.assertIn("expired email confirmations: 10 rows deleted", stdout.getvalue())
+        self.assertIn("expired address API results: 10 rows deleted", stdout.getvalue())
+        self.assertFalse(Connection.objects.exists())
+        self.assertFalse(AddressAPIResult.objects.exists())
+
+
+class DeleteInBatchesLockTests(TransactionTestCase):
+    def test_measures_lock_wait(self):
+        locked = create_results(1)[0]
+        lock_acquired = Event()
+
+        def hold_lock():
+            try:
+                with transaction.atomic():
+                    AddressAPIResult.objects.select_for_update().get(pk=locked.pk)
+                    lock_acquired.set()
+                    sleep(0.3)
+            finally:
+                connections.close_all()
+
+        thread = Thread(target=hold_lock)
+        thread.start()
+        lock_acquired.wait()
+        report = delete_in_batches(AddressAPIResult.objects.expired(), logger=logger)
+        thread.join()
+
+        self.assertEqual(report.rows, 1)
+        self.assertGreaterEqual(report.lock_wait_seconds, 0.2)
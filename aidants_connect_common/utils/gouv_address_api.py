@@ -1,15 +1,26 @@
 import logging
+from collections import OrderedDict
+from datetime import datetime, timedelta
 from enum import Enum
-from typing import List, Union
+from threading import Lock
+from typing import List, Optional, Tuple, Union
 
 from django.conf import settings
+from django.utils.timezone import now
 
-import requests as python_request
 from pydantic import BaseModel, validator
 from requests.exceptions import RequestException
 
+from aidants_connect_common.models import AddressAPIResult
+from aidants_connect_common.utils.http_client import address_api
+
 logger = logging.getLogger()
 
+# Normalized query -> (expiration date, features properties), least recently used
+# first. The database holds the same entries for every process.
+_local_cache: "OrderedDict[str, Tuple[datetime, List[dict]]]" = OrderedDict()
+_local_cache_lock = Lock()
+
 
 class AddressType(Enum):
     HOUSENUMBER = "housenumber"
@@ -57,26 +68,98 @@ class Address(BaseModel):
         )
 
 
+def normalize_query(query_string: str) -> str:
+    return " ".join(query_string.split()).casefold()
+
+
+def clear_local_cache():
+    with _local_cache_lock:
+        _local_cache.clear()
+
+
 def search_adresses(query_string: str) -> List[Address]:
     """
     Takes an address manually provided by a user and searches on government API
     for data on this address.
 
     The API used is documented on https://adresse.data.gouv.fr/api-doc/adresse
+
+    Responses are cached by normalized query, searches without result included.
+    Failed requests are not cached and return no result.
     """
     if settings.GOUV_ADDRESS_SEARCH_API_DISABLED:
         return []
 
+    query = normalize_query(query_string)
+    if not query:
+        return []
+
+    results = _get_cached_results(query)
+    if results is None:
+        results = _request_api(query)
+        if results is None:
+            return []
+        _cache_results(query, results)
+
+    return [Address(**item) for item in results]
+
+
+def _get_cached_results(query: str) -> Optional[List[dict]]:
+    with _local_cache_lock:
+        entry = _local_cache.get(query)
+        if entry is not None:
+            if entry[0] > now():
+                _local_cache.move_to_end(query)
+                return entry[1]
+            del _local_cache[query]
+
+    entry = (
+        AddressAPIResult.objects.filter(query=query, expiration_date__gt=now())
+        .values_list("expiration_date", "results")
+        .first()
+    )
+    if entry is None:
+        return None
+
+    _store_locally(query, *entry)
+    return entry[1]
+
+
+def _cache_results(query: str, results: List[dict]):
+    timeout = (
+        settings.GOUV_ADDRESS_SEARCH_CACHE_TIMEOUT
+        if results
+        else settings.GOUV_ADDRESS_SEARCH_NEGATIVE_CACHE_TIMEOUT
+    )
+    expiration_date = now() + timedelta(seconds=timeout)
+    AddressAPIResult.objects.update_or_create(
+        query=query,
+        defaults={"results": results, "expiration_date": expiration_date},
+    )
+    _store_locally(query, expiration_date, results)
+
+
+def _store_locally(query: str, expiration_date: datetime, results: List[dict]):
+    with _local_cache_lock:
+        _local_cache[query] = (expiration_date, results)
+        _local_cache.move_to_end(query)
+        while len(_local_cache) > settings.GOUV_ADDRESS_SEARCH_LOCAL_CACHE_SIZE:
+            _local_cache.popitem(last=False)
+
+
+def _request_api(query: str) -> Optional[List[dict]]:
     try:
-        result = python_request.get(
+        response = address_api.get(
             settings.GOUV_ADDRESS_SEARCH_API_BASE_URL,
-            params={"q": query_string},
+            params={"q": query},
             headers={"Accept": "application/json"},
-        ).json()
-    except RequestException as e:
+        )
+        response.raise_for_status()
+        result = response.json()
+    except (RequestException, ValueError) as e:
         logger.warning("Address API did not respond correctly", exc_info=e)
-        return []
+        return None
 
     # The API returns a GeoJSON object. We proces it to only
     # extract relevent information in `result.properties[i].features`
-    return [Address(**item["properties"]) for item in result["features"]]
+    return [item["properties"] for item in result.get("features", [])]
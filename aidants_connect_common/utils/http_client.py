@@ -0,0 +1,152 @@
+"""
+HTTP clients of the external services called by the project.
+
+Each integration has its own `HttpClient`, holding a `requests.Session` whose
+connections to the service are pooled and kept alive. Requests always have connect
+and read timeouts, idempotent requests are retried a bounded number of times and,
+after ``settings.HTTP_CIRCUIT_BREAKER_THRESHOLD`` consecutive failures, requests to
+the service fail immediately for ``settings.HTTP_CIRCUIT_BREAKER_RESET_TIMEOUT``
+seconds instead of holding a worker until they time out.
+"""
+import logging
+from threading import Lock
+from time import monotonic
+from typing import Optional
+
+from django.conf import settings
+
+from requests import Response, Session
+from requests.adapters import HTTPAdapter
+from requests.exceptions import RequestException
+from urllib3.util.retry import Retry
+
+logger = logging.getLogger()
+
+CONNECT_TIMEOUT = 3.05
+
+
+class CircuitOpenError(RequestException):
+    """Raised instead of sending a request to a service that keeps failing"""
+
+
+class HttpClient:
+    def __init__(self, name: str, *, timeout_setting: str, retries: int = 0):
+        """
+        :param timeout_setting: name of the setting holding the read timeout in
+        seconds
+        :param retries: number of times a request is retried after a connection
+        error, a timeout or a 502, 503 or 504 response, for idempotent methods only
+        """
+        self.name = name
+        self.timeout_setting = timeout_setting
+
+        self.session = Session()
+        adapter = HTTPAdapter(
+            max_retries=Retry(
+                total=retries,
+                # Without retries, raise read timeouts as such
+                read=retries or False,
+                backoff_factor=0.3,
+                status_forcelist=(502, 503, 504),
+                allowed_methods=Retry.DEFAULT_ALLOWED_METHODS,
+                raise_on_status=False,
+            )
+        )
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        self._lock = Lock()
+        self._consecutive_failures = 0
+        self._opened_at: Optional[float] = None
+        self.reset_metrics()
+
+    def get(self, url: str, **kwargs) -> Response:
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> Response:
+        return self.request("POST", url, **kwargs)
+
+    def request(self, method: str, url: str, **kwargs) -> Response:
+        """Sends a request like `requests.request`.
+
+        Server errors are returned like with `requests`, but count as failures
+        for the circuit breaker.
+
+        :raise CircuitOpenError: if the service is considered unavailable
+        """
+        self._check_circuit()
+
+        kwargs.setdefault(
+            "timeout", (CONNECT_TIMEOUT, getattr(settings, self.timeout_setting))
+        )
+        start = monotonic()
+        try:
+            response = self.session.request(method, url, **kwargs)
+        except RequestException as e:
+            self._record(method, e.__class__.__name__, monotonic() - start, True)
+            raise
+
+        self._record(
+            method,
+            response.status_code,
+            monotonic() - start,
+            response.status_code >= 500,
+        )
+        return response
+
+    def reset_metrics(self):
+        with self._lock:
+            self.metrics = {
+                "requests": 0,
+                "failures": 0,
+                "rejected": 0,
+                "total_seconds": 0.0,
+                "max_seconds": 0.0,
+            }
+
+    def _check_circuit(self):
+        with self._lock:
+            if self._opened_at is None:
+                return
+
+            if (
+                monotonic() - self._opened_at
+                < settings.HTTP_CIRCUIT_BREAKER_RESET_TIMEOUT
+            ):
+                self.metrics["rejected"] += 1
+                raise CircuitOpenError(f"{self.name} is considered unavailable")
+
+            # Let this request probe the service; others keep failing fast until
+            # it succeeds.
+            self._opened_at = monotonic()
+
+    def _record(self, method: str, outcome, elapsed: float, failed: bool):
+        with self._lock:
+            self.metrics["requests"] += 1
+            self.metrics["total_seconds"] += elapsed
+            self.metrics["max_seconds"] = max(self.metrics["max_seconds"], elapsed)
+
+            if failed:
+                self.metrics["failures"] += 1
+                self._consecutive_failures += 1
+                if (
+                    self._consecutive_failures
+                    >= settings.HTTP_CIRCUIT_BREAKER_THRESHOLD
+                ):
+                    self._opened_at = monotonic()
+            else:
+                self._consecutive_failures = 0
+                self._opened_at = None
+
+        logger.info(f"HTTP {self.name} {method} {outcome} in {elapsed * 1000:.0f} ms")
+
+
+address_api = HttpClient(
+    "address_api", timeout_setting="GOUV_ADDRESS_SEARCH_API_TIMEOUT"
+)
+franceconnect = HttpClient(
+    "franceconnect", timeout_setting="FC_AS_FS_HTTP_TIMEOUT", retries=1
+)
+pix_metabase = HttpClient(
+    "pix_metabase", timeout_setting="PIX_METABASE_HTTP_TIMEOUT", retries=2
+)
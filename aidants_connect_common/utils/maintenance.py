@@ -0,0 +1,106 @@
+"""
+Batched deletions run by the maintenance tasks.
+
+`delete_in_batches` deletes the rows of a queryset with plain ``DELETE`` statements
+on their primary keys, `batch_size` rows per transaction, instead of loading every
+object to collect cascades and send signals. Each batch first locks its rows, so the
+time spent waiting for other transactions is measured separately from the deletion
+itself. Runs are bounded by a time budget: the next run deletes the rows left.
+
+The deleted models must not send ``pre_delete``/``post_delete`` signals that matter,
+and the rows referencing them must be deleted beforehand.
+"""
+from dataclasses import dataclass
+from logging import Logger
+from time import monotonic
+from typing import Optional
+
+from django.conf import settings
+from django.db import connections, router, transaction
+from django.db.models import QuerySet
+from django.template.defaultfilters import pluralize
+
+
+@dataclass
+class MaintenanceReport:
+    name: str
+    rows: int = 0
+    batches: int = 0
+    seconds: float = 0.0
+    lock_wait_seconds: float = 0.0
+    complete: bool = True
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows / max(self.seconds, 0.001)
+
+    def __str__(self):
+        return (
+            f"{self.name}: {self.rows} row{pluralize(self.rows)} deleted in "
+            f"{self.batches} batch{pluralize(self.batches, 'es')} "
+            f"({self.seconds:.2f}s, {self.rows_per_second:.0f} rows/s, "
+            f"{self.lock_wait_seconds:.3f}s waiting for locks)"
+            f"{'' if self.complete else ', time budget spent'}"
+        )
+
+
+def delete_in_batches(
+    queryset: QuerySet,
+    *,
+    name: Optional[str] = None,
+    batch_size: Optional[int] = None,
+    time_budget: Optional[float] = None,
+    logger: Logger,
+) -> MaintenanceReport:
+    """Deletes the rows of `queryset`, `batch_size` primary keys per transaction.
+
+    :param name: label of the rows in the logs, the model's plural verbose name by
+        default
+    :param time_budget: time, in seconds, after which no new batch is started
+    """
+    model = queryset.model
+    batch_size = batch_size or settings.MAINTENANCE_BATCH_SIZE
+    if time_budget is None:
+        time_budget = settings.MAINTENANCE_TIME_BUDGET
+
+    report = MaintenanceReport(name=name or str(model._meta.verbose_name_plural))
+    db = router.db_for_write(model)
+    delete_sql = (
+        f"DELETE FROM {model._meta.db_table} "
+        f"WHERE {model._meta.pk.column} = ANY(%s)"
+    )
+    candidates = queryset.order_by("pk").values_list("pk", flat=True)
+
+    start = monotonic()
+    while True:
+        with transaction.atomic(using=db):
+            pks = list(candidates[:batch_size])
+            if not pks:
+                break
+
+            lock_start = monotonic()
+            locked_pks = list(
+                model.objects.using(db)
+                .filter(pk__in=pks)
+                .select_for_update()
+                .values_list("pk", flat=True)
+            )
+            report.lock_wait_seconds += monotonic() - lock_start
+
+            with connections[db].cursor() as cursor:
+                cursor.execute(delete_sql, [locked_pks])
+                report.rows += cursor.rowcount
+
+        report.batches += 1
+        report.seconds = monotonic() - start
+        logger.info(str(report))
+
+        if len(pks) < batch_size:
+            break
+
+        if report.seconds >= time_budget:
+            report.complete = False
+            break
+
+    report.seconds = monotonic() - start
+    return report
@@ -0,0 +1,30 @@
+import logging
+
+from django.core.management.base import BaseCommand
+
+from aidants_connect_habilitation.tasks import delete_expired_email_confirmations
+
+logger = logging.getLogger()
+
+
+class Command(BaseCommand):
+    help = "Deletes the expired email confirmations of issuers"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            help="Number of confirmations deleted per statement",
+        )
+        parser.add_argument(
+            "--time-budget",
+            type=int,
+            help="Time, in seconds, after which no new batch is started",
+        )
+
+    def handle(self, *args, **options):
+        delete_expired_email_confirmations(
+            batch_size=options["batch_size"],
+            time_budget=options["time_budget"],
+            logger=logger,
+        )
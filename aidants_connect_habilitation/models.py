@@ -1,9 +1,9 @@
 from datetime import timedelta
+from logging import Logger
 from typing import Optional
 from uuid import uuid4
 
 from django.conf import settings
-from django.core.mail import send_mail
 from django.db import models, transaction
 from django.db.models import SET_NULL, Q
 from django.db.utils import IntegrityError
@@ -16,11 +16,14 @@ from django.utils.timezone import now
 
 from phonenumber_field.modelfields import PhoneNumberField
 
+from aidants_connect_common.models import DepartmentInseeCodeMixin
 from aidants_connect_common.utils.constants import (
     MessageStakeholders,
     RequestOriginConstants,
     RequestStatusConstants,
 )
+from aidants_connect_common.utils.maintenance import delete_in_batches
+from aidants_connect_web.mail import queue_mail
 from aidants_connect_web.models import (
     Aidant,
     HabilitationRequest,
@@ -105,8 +108,14 @@ class EmailConfirmationManager(models.Manager):
         sent_threshold = now() - timedelta(days=settings.EMAIL_CONFIRMATION_EXPIRE_DAYS)
         return Q(sent__lt=sent_threshold)
 
-    def delete_expired_confirmations(self):
-        self.all_expired().delete()
+    def delete_expired_confirmations(self, *, logger: Logger, **kwargs):
+        """Deletes the expired confirmations by batches, see `delete_in_batches`"""
+        return delete_in_batches(
+            self.all_expired(),
+            name="expired email confirmations",
+            logger=logger,
+            **kwargs,
+        )
 
 
 email_confirmation_sent = Signal()
@@ -184,7 +193,7 @@ class Manager(PersonWithResponsibilities):
         verbose_name_plural = "Responsables structure"
 
 
-class OrganisationRequest(models.Model):
+class OrganisationRequest(DepartmentInseeCodeMixin, models.Model):
     created_at = models.DateTimeField("Date création", auto_now_add=True)
 
     updated_at = models.DateTimeField("Date modification", auto_now=True)
@@ -252,8 +261,14 @@ class OrganisationRequest(models.Model):
         "Code INSEE de la ville", max_length=5, null=True, blank=True
     )
 
+    # Set from the address API or guessed from `zipcode`, see
+    # `DepartmentInseeCodeMixin`
     department_insee_code = models.CharField(
-        "Code INSEE du département", max_length=5, null=True, blank=True
+        "Code INSEE du département",
+        max_length=5,
+        null=True,
+        blank=True,
+        db_index=True,
     )
 
     is_private_org = models.BooleanField("Structure privée", default=False)
@@ -326,7 +341,7 @@ class OrganisationRequest(models.Model):
             "email/organisation_request_creation.html", context
         )
 
-        send_mail(
+        queue_mail(
             from_email=settings.EMAIL_ORGANISATION_REQUEST_FROM,
             recipient_list=[self.issuer.email],
             subject=settings.EMAIL_ORGANISATION_REQUEST_SUBMISSION_SUBJECT,
@@ -346,7 +361,7 @@ class OrganisationRequest(models.Model):
             "email/organisation_request_modifications_done.html", context
         )
 
-        send_mail(
+        queue_mail(
             from_email=settings.EMAIL_ORGANISATION_REQUEST_FROM,
             recipient_list=[self.issuer.email],
             subject=settings.EMAIL_ORGANISATION_REQUEST_MODIFICATION_SUBJECT,
@@ -601,7 +616,7 @@ class RequestMessage(models.Model):
             "email/new_message_received.html", context
         )
 
-        send_mail(
+        queue_mail(
             from_email=settings.EMAIL_ORGANISATION_REQUEST_FROM,
             recipient_list=[self.organisation.issuer.email],
             subject=settings.EMAIL_NEW_MESSAGE_RECEIVED_SUBJECT,
@@ -613,12 +628,3 @@ class RequestMessage(models.Model):
         if not self.pk and self.sender == "AC":
             self.send_message_email()
         return super(RequestMessage, self).save(*args, **kwargs)
-
-
-def _default_expiraton_date():
-    return now() + timedelta(days=1)
-
-
-class AddressAPIResultQuerySet(models.QuerySet):
-    def expired(self):
-        return self.filter(expiraton_date__lt=now())
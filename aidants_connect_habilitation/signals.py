@@ -1,5 +1,4 @@
 from django.conf import settings
-from django.core.mail import send_mail
 from django.db.models.signals import post_save
 from django.dispatch import receiver
 from django.http import HttpRequest
@@ -11,6 +10,7 @@ from aidants_connect_habilitation.models import (
     OrganisationRequest,
     email_confirmation_sent,
 )
+from aidants_connect_web.mail import queue_mail
 
 
 @receiver(email_confirmation_sent, sender=IssuerEmailConfirmation)
@@ -27,7 +27,7 @@ def send_email_confirmation(
     text_message = loader.render_to_string("signals/email_confirmation.txt", context)
     html_message = loader.render_to_string("signals/email_confirmation.html", context)
 
-    send_mail(
+    queue_mail(
         from_email=settings.EMAIL_CONFIRMATION_EXPIRE_DAYS_EMAIL_FROM,
         recipient_list=[confirmation.issuer.email],
         subject=settings.EMAIL_CONFIRMATION_EXPIRE_DAYS_EMAIL_SUBJECT,
@@ -59,7 +59,7 @@ def notify_issuer_draft_request_saved(
         "email/draft_organisation_request_saved.html", context
     )
 
-    send_mail(
+    queue_mail(
         from_email=settings.EMAIL_ORGANISATION_REQUEST_FROM,
         recipient_list=[instance.issuer.email],
         subject=settings.EMAIL_ORGANISATION_REQUEST_CREATION_SUBJECT,
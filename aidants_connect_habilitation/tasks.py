@@ -1,3 +1,4 @@
+from dataclasses import asdict
 from datetime import datetime
 from logging import Logger
 from zoneinfo import ZoneInfo
@@ -6,8 +7,9 @@ from django.conf import settings
 
 from celery import shared_task
 from celery.utils.log import get_task_logger
-from metabasepy import Client
 
+from aidants_connect_common.utils.http_client import pix_metabase
+from aidants_connect_habilitation.models import IssuerEmailConfirmation
 from aidants_connect_web.models import HabilitationRequest
 
 
@@ -15,15 +17,24 @@ from aidants_connect_web.models import HabilitationRequest
 def import_pix_results(*, logger=None):
     logger: Logger = logger or get_task_logger(__name__)
 
-    username = settings.PIX_METABASE_USER
-    password = settings.PIX_METABASE_PASSWORD
-    card_id = settings.PIX_METABASE_CARD_ID
-    cli = Client(
-        username=username, password=password, base_url="https://metabase.pix.fr"
+    base_url = settings.PIX_METABASE_BASE_URL
+    response = pix_metabase.post(
+        f"{base_url}/api/session",
+        json={
+            "username": settings.PIX_METABASE_USER,
+            "password": settings.PIX_METABASE_PASSWORD,
+        },
     )
-    cli.authenticate()
+    response.raise_for_status()
+    session_id = response.json()["id"]
     logger.info("Sucessfully authenticated to PIX database.")
-    json_result = cli.cards.download(card_id=card_id, format="json")
+
+    response = pix_metabase.post(
+        f"{base_url}/api/card/{settings.PIX_METABASE_CARD_ID}/query/json",
+        headers={"X-Metabase-Session": session_id},
+    )
+    response.raise_for_status()
+    json_result = response.json()
 
     for person in json_result:
         date_test_pix = datetime.strptime(
@@ -37,3 +48,18 @@ def import_pix_results(*, logger=None):
             aidant_a_former.save()
 
     logger.info("Sucessfully updated PIX results")
+
+
+@shared_task
+def delete_expired_email_confirmations(
+    *, batch_size=None, time_budget=None, logger=None
+):
+    logger: Logger = logger or get_task_logger(__name__)
+
+    report = IssuerEmailConfirmation.objects.delete_expired_confirmations(
+        batch_size=batch_size, time_budget=time_budget, logger=logger
+    )
+    logger.info(str(report))
+
+    # Task results are serialized to JSON
+    return asdict(report)
@@ -42,12 +42,13 @@ class OrganisationRequestAdminTests(TestCase):
         self.assertEqual(len(mail.outbox), 0)
 
         # this is supposed to one email:
-        org_request = OrganisationRequestFactory(
-            status=RequestStatusConstants.VALIDATED.name,
-            data_pass_id=67245456,
-        )
-        for _ in range(3):
-            AidantRequestFactory(organisation=org_request)
+        with self.captureOnCommitCallbacks(execute=True):
+            org_request = OrganisationRequestFactory(
+                status=RequestStatusConstants.VALIDATED.name,
+                data_pass_id=67245456,
+            )
+            for _ in range(3):
+                AidantRequestFactory(organisation=org_request)
 
         # this is supposed to send another email:
         self.org_request_admin.send_acceptance_email(org_request)
@@ -82,12 +83,13 @@ class OrganisationRequestAdminTests(TestCase):
         self.assertEqual(len(mail.outbox), 0)
 
         # this is supposed to one email:
-        org_request = OrganisationRequestFactory(
-            status=RequestStatusConstants.VALIDATED.name,
-            data_pass_id=67245456,
-        )
-        for _ in range(3):
-            AidantRequestFactory(organisation=org_request)
+        with self.captureOnCommitCallbacks(execute=True):
+            org_request = OrganisationRequestFactory(
+                status=RequestStatusConstants.VALIDATED.name,
+                data_pass_id=67245456,
+            )
+            for _ in range(3):
+                AidantRequestFactory(organisation=org_request)
 
         # this is supposed to send another email:
         email_body = "Corps du mail iaculis, scelerisque felis non, rutrum purus."
@@ -121,12 +123,13 @@ class OrganisationRequestAdminTests(TestCase):
         self.assertEqual(len(mail.outbox), 0)
 
         # this is supposed to one email:
-        org_request = OrganisationRequestFactory(
-            status=RequestStatusConstants.REFUSED.name,
-            data_pass_id=67245456,
-        )
-        for _ in range(3):
-            AidantRequestFactory(organisation=org_request)
+        with self.captureOnCommitCallbacks(execute=True):
+            org_request = OrganisationRequestFactory(
+                status=RequestStatusConstants.REFUSED.name,
+                data_pass_id=67245456,
+            )
+            for _ in range(3):
+                AidantRequestFactory(organisation=org_request)
 
         # this is supposed to send another email:
         email_body = "Corps du mail iaculis, scelerisque felis non, rutrum purus."
@@ -160,16 +163,18 @@ class OrganisationRequestAdminTests(TestCase):
         self.assertEqual(len(mail.outbox), 0)
 
         # this is supposed to one email:
-        org_request = OrganisationRequestFactory(
-            status=RequestStatusConstants.REFUSED.name,
-            data_pass_id=67245456,
-        )
-        for _ in range(3):
-            AidantRequestFactory(organisation=org_request)
+        with self.captureOnCommitCallbacks(execute=True):
+            org_request = OrganisationRequestFactory(
+                status=RequestStatusConstants.REFUSED.name,
+                data_pass_id=67245456,
+            )
+            for _ in range(3):
+                AidantRequestFactory(organisation=org_request)
 
         # this is supposed to send another email:
         content = "Corps du mail iaculis, scelerisque felis non, rutrum purus."
-        self.org_request_admin.send_changes_required_message(org_request, content)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.org_request_admin.send_changes_required_message(org_request, content)
 
         # so here we expect 2 emails here in outbox:
         self.assertEqual(len(mail.outbox), 2)
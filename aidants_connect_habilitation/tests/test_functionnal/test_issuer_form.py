@@ -61,7 +61,7 @@ class IssuerFormViewTests(FunctionalTestCase):
 
         WebDriverWait(self.selenium, 10).until(url_matches(f"^.+{path}$"))
 
-    @patch("aidants_connect_habilitation.signals.send_mail")
+    @patch("aidants_connect_habilitation.signals.queue_mail")
     def test_email_confirmation_process(self, send_mail_mock: Mock):
         email = Faker().email()
         issuer = IssuerFactory.build(email=email)
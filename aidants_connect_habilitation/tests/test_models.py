@@ -2,6 +2,7 @@ from datetime import timedelta
 from unittest.mock import ANY, Mock, patch
 
 from django.core import mail
+from django.core.management import call_command
 from django.db import IntegrityError
 from django.forms import model_to_dict
 from django.http import HttpRequest
@@ -282,11 +283,13 @@ class OrganisationRequestTests(TestCase):
             organisation_request.save()
             return organisation_request
 
-        organisation_request = prepare_data()
+        with self.captureOnCommitCallbacks(execute=True):
+            organisation_request = prepare_data()
         # expect one email when creating one organisation request
         self.assertEqual(len(mail.outbox), 1)
 
-        organisation_request.require_changes_request()
+        with self.captureOnCommitCallbacks(execute=True):
+            organisation_request.require_changes_request()
 
         self.assertEqual(
             organisation_request.status,
@@ -311,11 +314,13 @@ class OrganisationRequestTests(TestCase):
             organisation_request.save()
             return organisation_request
 
-        organisation_request = prepare_data()
+        with self.captureOnCommitCallbacks(execute=True):
+            organisation_request = prepare_data()
         # expect one email when creating one organisation request
         self.assertEqual(len(mail.outbox), 1)
 
-        organisation_request.refuse_request()
+        with self.captureOnCommitCallbacks(execute=True):
+            organisation_request.refuse_request()
 
         self.assertEqual(
             organisation_request.status,
@@ -363,6 +368,25 @@ class TestIssuerEmailConfirmation(TestCase):
         self.assertEqual(email_confirmation.issuer, issuer)
         self.assertEqual(email_confirmation.created, self.NOW)
 
+    @override_settings(EMAIL_CONFIRMATION_EXPIRE_DAYS=EXPIRE_DAYS)
+    def test_delete_expired_confirmations(self):
+        issuer: Issuer = IssuerFactory(email_verified=False)
+        for _ in range(3):
+            IssuerEmailConfirmation.objects.create(
+                issuer=issuer, sent=now() - timedelta(days=self.EXPIRE_DAYS + 1)
+            )
+        valid = IssuerEmailConfirmation.objects.create(
+            issuer=issuer, sent=now() - timedelta(days=self.EXPIRE_DAYS - 1)
+        )
+        not_sent = IssuerEmailConfirmation.objects.create(issuer=issuer)
+
+        call_command("delete_expired_email_confirmations", batch_size=2)
+
+        self.assertEqual(
+            set(IssuerEmailConfirmation.objects.values_list("pk", flat=True)),
+            {valid.pk, not_sent.pk},
+        )
+
     @override_settings(EMAIL_CONFIRMATION_EXPIRE_DAYS=EXPIRE_DAYS)
     def test_confirm_saves_issuer_model(self):
         issuer: Issuer = IssuerFactory(email_verified=False)
@@ -422,7 +446,7 @@ class TestIssuerEmailConfirmation(TestCase):
         EMAIL_CONFIRMATION_EXPIRE_DAYS_EMAIL_FROM=EMAIL_FROM,
         EMAIL_CONFIRMATION_EXPIRE_DAYS_EMAIL_SUBJECT=EMAIL_SUBJECT,
     )
-    @patch("aidants_connect_habilitation.signals.send_mail")
+    @patch("aidants_connect_habilitation.signals.queue_mail")
     def test_signal_sends_mail(self, send_mail_mock: Mock):
         email_confirmation = IssuerEmailConfirmation.for_issuer(
             IssuerFactory(email_verified=False)
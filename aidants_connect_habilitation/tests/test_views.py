@@ -108,7 +108,7 @@ class NewIssuerFormViewTests(TestCase):
                     "Request should have created an instance of IssuerEmailConfirmation"
                 )
 
-    @patch("aidants_connect_habilitation.views.send_mail")
+    @patch("aidants_connect_habilitation.views.queue_mail")
     def test_send_email_when_issuer_already_exists(self, send_mail_mock: Mock):
         issuer: Issuer = IssuerFactory()
 
@@ -850,13 +850,15 @@ class ValidationRequestFormViewTests(TestCase):
         cls.client = Client()
         cls.pattern_name = "habilitation_validation"
         cls.template_name = "validation_form.html"
-        cls.organisation: OrganisationRequest = DraftOrganisationRequestFactory(
-            manager=ManagerFactory()
-        )
-        AidantRequestFactory(organisation=cls.organisation)
-        cls.organisation_no_manager: OrganisationRequest = (
-            DraftOrganisationRequestFactory(manager=None)
-        )
+        # Sends the emails queued by the drafts, so that tests only see their own
+        with cls.captureOnCommitCallbacks(execute=True):
+            cls.organisation: OrganisationRequest = DraftOrganisationRequestFactory(
+                manager=ManagerFactory()
+            )
+            AidantRequestFactory(organisation=cls.organisation)
+            cls.organisation_no_manager: OrganisationRequest = (
+                DraftOrganisationRequestFactory(manager=None)
+            )
 
     def get_url(self, issuer_id, uuid):
         return reverse(
@@ -940,10 +942,13 @@ class ValidationRequestFormViewTests(TestCase):
             "without_elected": True,
         }
 
-        response = self.client.post(
-            self.get_url(self.organisation.issuer.issuer_id, self.organisation.uuid),
-            cleaned_data,
-        )
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                self.get_url(
+                    self.organisation.issuer.issuer_id, self.organisation.uuid
+                ),
+                cleaned_data,
+            )
 
         self.assertRedirects(
             response,
@@ -974,9 +979,10 @@ class ValidationRequestFormViewTests(TestCase):
     def test_do_the_job_when_changes_required(self):
         self.assertEqual(len(mail.outbox), 0)
 
-        organisation = OrganisationRequestFactory(
-            status=RequestStatusConstants.CHANGES_REQUIRED.name
-        )
+        with self.captureOnCommitCallbacks(execute=True):
+            organisation = OrganisationRequestFactory(
+                status=RequestStatusConstants.CHANGES_REQUIRED.name
+            )
         data_pass_id = organisation.data_pass_id
 
         cleaned_data = {
@@ -986,10 +992,11 @@ class ValidationRequestFormViewTests(TestCase):
             "without_elected": True,
         }
 
-        response = self.client.post(
-            self.get_url(organisation.issuer.issuer_id, organisation.uuid),
-            cleaned_data,
-        )
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                self.get_url(organisation.issuer.issuer_id, organisation.uuid),
+                cleaned_data,
+            )
 
         self.assertRedirects(
             response,
@@ -2,7 +2,6 @@ from uuid import UUID
 
 from django.conf import settings
 from django.contrib import messages
-from django.core.mail import send_mail
 from django.forms.models import model_to_dict
 from django.http import Http404, HttpResponseRedirect
 from django.shortcuts import get_object_or_404, redirect, render
@@ -48,6 +47,7 @@ __all__ = [
     "AddAidantsRequestView",
 ]
 
+from aidants_connect_web.mail import queue_mail
 from aidants_connect_web.models import Organisation
 
 """Mixins"""
@@ -205,7 +205,7 @@ class NewIssuerFormView(HabilitationStepMixin, FormView):
         html_message = loader.render_to_string(
             "email/issuer_profile_reminder.html", context
         )
-        send_mail(
+        queue_mail(
             from_email=settings.EMAIL_ORGANISATION_REQUEST_FROM,
             recipient_list=[email],
             subject=settings.EMAIL_HABILITATION_ISSUER_EMAIL_ALREADY_EXISTS_SUBJECT,
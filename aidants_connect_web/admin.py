@@ -6,9 +6,10 @@ from django.contrib import messages
 from django.contrib.admin import ModelAdmin, SimpleListFilter, TabularInline
 from django.contrib.auth.admin import UserAdmin as DjangoUserAdmin
 from django.core.mail import send_mail
+from django.db import transaction
 from django.db.models import QuerySet
 from django.http import HttpRequest, HttpResponseNotAllowed, HttpResponseRedirect
-from django.shortcuts import render
+from django.shortcuts import get_object_or_404, render
 from django.template import loader
 from django.urls import path, reverse
 from django.utils.html import format_html_join, linebreaks
@@ -34,7 +35,6 @@ from aidants_connect.admin import (
     admin_site,
 )
 from aidants_connect_common.models import Department
-from aidants_connect_common.utils.constants import JournalActionKeywords
 from aidants_connect_web.forms import (
     AidantChangeForm,
     AidantCreationForm,
@@ -49,9 +49,11 @@ from aidants_connect_web.models import (
     HabilitationRequest,
     Journal,
     Mandat,
+    MandatTransfer,
     Organisation,
     Usager,
 )
+from aidants_connect_web.tasks import transfer_mandates
 
 logger = logging.getLogger()
 
@@ -216,6 +218,8 @@ class OrganisationAdmin(
         "zipcode",
         "admin_num_active_aidants",
         "admin_num_mandats",
+        "admin_num_active_mandats",
+        "admin_num_usagers",
         "is_active",
         "id",
         "data_pass_id",
@@ -249,6 +253,9 @@ class OrganisationAdmin(
         "specific_delete_action",
     )
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).with_counters()
+
     def get_export_resource_class(self):
         return ExportHabilitationRequestAndAidantAndOrganisationResource
 
@@ -451,17 +458,15 @@ class AidantWithMandatsFilter(SimpleListFilter):
         if self.value() != "true":
             return queryset
 
-        return queryset.filter(
-            journal_entries__action=JournalActionKeywords.CREATE_ATTESTATION
-        ).distinct()
+        return queryset.filter(stats__mandats_created_count__gt=0)
 
 
 class AidantDepartmentFilter(DepartmentFilter):
-    filter_parameter_name = "organisations__zipcode"
+    filter_parameter_name = "organisations__department_insee_code"
 
 
 class AidantRegionFilter(RegionFilter):
-    filter_parameter_name = "organisations__zipcode"
+    filter_parameter_name = "organisations__department_insee_code"
 
 
 class AidantAdmin(ImportExportMixin, VisibleToAdminMetier, DjangoUserAdmin):
@@ -484,12 +489,22 @@ class AidantAdmin(ImportExportMixin, VisibleToAdminMetier, DjangoUserAdmin):
     display_totp_device_status.short_description = "Carte TOTP Activée"
     display_totp_device_status.boolean = True
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related("stats")
+
     def display_mandates_count(self, obj: Aidant):
-        return Journal.objects.filter(
-            action=JournalActionKeywords.CREATE_ATTESTATION, aidant=obj
-        ).count()
+        stats = getattr(obj, "stats", None)
+        return stats.mandats_created_count if stats is not None else 0
 
     display_mandates_count.short_description = "Nombre de mandats créés"
+    display_mandates_count.admin_order_field = "stats__mandats_created_count"
+
+    def display_last_mandat_date(self, obj: Aidant):
+        stats = getattr(obj, "stats", None)
+        return stats.last_mandat_date if stats is not None else None
+
+    display_last_mandat_date.short_description = "Date du dernier mandat créé"
+    display_last_mandat_date.admin_order_field = "stats__last_mandat_date"
 
     # The forms to add and change `Aidant` instances
     form = AidantChangeForm
@@ -516,6 +531,7 @@ class AidantAdmin(ImportExportMixin, VisibleToAdminMetier, DjangoUserAdmin):
         "email",
         "organisation",
         "display_mandates_count",
+        "display_last_mandat_date",
         "carte_totp",
         "is_active",
         "can_create_mandats",
@@ -720,11 +736,11 @@ class HabilitationRequestImportResource(resources.ModelResource):
 
 
 class HabilitationDepartmentFilter(DepartmentFilter):
-    filter_parameter_name = "organisation__zipcode"
+    filter_parameter_name = "organisation__department_insee_code"
 
 
 class HabilitationRequestRegionFilter(RegionFilter):
-    filter_parameter_name = "organisation__zipcode"
+    filter_parameter_name = "organisation__department_insee_code"
 
 
 class HabilitationRequestAdmin(ImportExportMixin, VisibleToAdminMetier, ModelAdmin):
@@ -1005,11 +1021,11 @@ class MandatAutorisationInline(VisibleToTechAdmin, TabularInline):
 
 
 class MandatRegionFilter(RegionFilter):
-    filter_parameter_name = "organisation__zipcode"
+    filter_parameter_name = "organisation__department_insee_code"
 
 
 class MandatDepartmentFilter(DepartmentFilter):
-    filter_parameter_name = "organisation__zipcode"
+    filter_parameter_name = "organisation__department_insee_code"
 
 
 class MandatAdmin(VisibleToTechAdmin, ModelAdmin):
@@ -1061,6 +1077,11 @@ class MandatAdmin(VisibleToTechAdmin, ModelAdmin):
                 self.admin_site.admin_view(self.mandate_transfer),
                 name="aidants_connect_web_mandat_transfer",
             ),
+            path(
+                "transfer/<int:transfer_id>/",
+                self.admin_site.admin_view(self.mandate_transfer_progress),
+                name="aidants_connect_web_mandat_transfer_progress",
+            ),
             *super().get_urls(),
         ]
 
@@ -1116,20 +1137,19 @@ class MandatAdmin(VisibleToTechAdmin, ModelAdmin):
 
     def __mandate_transfer_post(self, request):
         try:
-            ids = request.POST["ids"].split(",")
+            ids = [int(pk) for pk in request.POST["ids"].split(",")]
             organisation = Organisation.objects.get(pk=request.POST["organisation"])
-            failure, failed_ids = Mandat.transfer_to_organisation(organisation, ids)
-
-            mandates = Mandat.objects.filter(pk__in=failed_ids)
-            if failure:
-                context = {
-                    **self.admin_site.each_context(request),
-                    "media": self.media,
-                    "mandates": mandates,
-                    "mandates_count": mandates.count(),
-                }
-
-                return render(request, "admin/transfert_error.html", context)
+            transfer = MandatTransfer.objects.create(
+                organisation=organisation, requested_by=request.user, mandat_ids=ids
+            )
+            transaction.on_commit(lambda: self.__schedule_transfer(transfer))
+
+            return HttpResponseRedirect(
+                reverse(
+                    "otpadmin:aidants_connect_web_mandat_transfer_progress",
+                    kwargs={"transfer_id": transfer.pk},
+                )
+            )
         except Organisation.DoesNotExist:
             self.message_user(
                 request,
@@ -1158,6 +1178,38 @@ class MandatAdmin(VisibleToTechAdmin, ModelAdmin):
             reverse("otpadmin:aidants_connect_web_mandat_changelist")
         )
 
+    @staticmethod
+    def __schedule_transfer(transfer: MandatTransfer):
+        try:
+            transfer_mandates.delay(transfer_id=transfer.pk)
+        except Exception as e:
+            # The transfer stays pending, it can be run with the `transfer_mandates`
+            # command
+            logger.error(
+                f"Could not schedule mandate transfer {transfer.pk}", exc_info=e
+            )
+
+    def mandate_transfer_progress(self, request, transfer_id: int):
+        transfer = get_object_or_404(
+            MandatTransfer.objects.select_related("organisation"), pk=transfer_id
+        )
+        failed_mandates = Mandat.objects.filter(
+            pk__in=[pk for pk in transfer.failures if pk.isdigit()]
+        ).select_related("usager")
+        mandates_by_id = {str(mandate.pk): mandate for mandate in failed_mandates}
+
+        context = {
+            **self.admin_site.each_context(request),
+            "media": self.media,
+            "transfer": transfer,
+            "failures": [
+                (mandate_id, mandates_by_id.get(mandate_id), reason)
+                for mandate_id, reason in transfer.failures.items()
+            ],
+        }
+
+        return render(request, "admin/transfert_progress.html", context)
+
 
 class ConnectionAdmin(ModelAdmin):
     list_display = ("id", "usager", "aidant", "complete")
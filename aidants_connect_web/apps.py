@@ -7,3 +7,6 @@ class AidantConnectWebConfig(AppConfig):
     def ready(self):
         import aidants_connect_common.lookups  # noqa
         import aidants_connect_web.signals  # noqa
+        from aidants_connect_web.qrcodes import get_empty_qrcode
+
+        get_empty_qrcode()
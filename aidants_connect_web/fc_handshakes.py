@@ -0,0 +1,80 @@
+"""
+Short-lived FranceConnect handshake states.
+
+Until a connection is complete, its state lives in a key-value store with native
+expiry (``settings.FC_HANDSHAKE_CACHE``) rather than in the `Connection` table. This
+way, a flow abandoned mid-way does not write anything to the database and nothing has
+to be swept afterwards.
+"""
+from secrets import token_urlsafe
+from typing import Optional
+
+from django.conf import settings
+from django.core.cache import caches
+
+from aidants_connect_web.models import Connection
+
+FI_PREFIX = "fi"
+FS_STATE_PREFIX = "fs_state"
+
+
+def _store():
+    return caches[settings.FC_HANDSHAKE_CACHE]
+
+
+def _timeout() -> int:
+    # States are kept longer than the connection itself so that a late request gets
+    # a proper "connection expired" response instead of being treated as forged
+    return 2 * settings.FC_CONNECTION_AGE
+
+
+def start_fi_handshake(connection: Connection) -> str:
+    """Stores a not yet saved FC as FI connection.
+
+    :return: an unguessable identifier to use as `connection_id` in the next steps
+    """
+    handshake_id = token_urlsafe(32)
+    save_fi_handshake(handshake_id, connection)
+    return handshake_id
+
+
+def get_fi_handshake(handshake_id: Optional[str]) -> Optional[Connection]:
+    """
+    :return: an unsaved `Connection` rebuilt from the stored state or `None`
+    """
+    if not handshake_id:
+        return None
+
+    data = _store().get(f"{FI_PREFIX}:{handshake_id}")
+    return Connection(**data) if data is not None else None
+
+
+def save_fi_handshake(handshake_id: str, connection: Connection):
+    data = {
+        field.attname: getattr(connection, field.attname)
+        for field in Connection._meta.concrete_fields
+        if not field.primary_key
+    }
+    _store().set(f"{FI_PREFIX}:{handshake_id}", data, timeout=_timeout())
+
+
+def end_fi_handshake(handshake_id: str):
+    _store().delete(f"{FI_PREFIX}:{handshake_id}")
+
+
+def register_fs_state(connection: Connection):
+    """Records which FC as FS connection a `state` was issued for."""
+    _store().set(
+        f"{FS_STATE_PREFIX}:{connection.state}", connection.pk, timeout=_timeout()
+    )
+
+
+def find_fs_connection_id(state: Optional[str]) -> Optional[int]:
+    if not state:
+        return None
+
+    return _store().get(f"{FS_STATE_PREFIX}:{state}")
+
+
+def end_fs_state(state: str):
+    _store().delete(f"{FS_STATE_PREFIX}:{state}")
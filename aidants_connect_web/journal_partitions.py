@@ -0,0 +1,123 @@
+"""
+Monthly partitions of the journal.
+
+The `Journal` table is range-partitioned on `creation_date`, with one partition per
+month and a default partition for rows outside of every range (see migration
+``0017_journal_partitioning``). Partitions have to exist before the month starts:
+`create_journal_partitions` creates them ahead of time. The oldest partitions can be
+archived to compressed CSV files and dropped, so that the size of the indexes and the
+duration of vacuums stay bounded as the journal grows.
+"""
+import gzip
+import re
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import List, Tuple
+
+from django.db import connection, transaction
+
+JOURNAL_TABLE = "aidants_connect_web_journal"
+DEFAULT_PARTITION = f"{JOURNAL_TABLE}_default"
+
+PARTITION_NAME_REGEX = re.compile(rf"^{JOURNAL_TABLE}_y(\d{{4}})m(\d{{2}})$")
+
+
+def month_start(value: datetime) -> datetime:
+    value = value.astimezone(timezone.utc)
+    return datetime(value.year, value.month, 1, tzinfo=timezone.utc)
+
+
+def add_months(month: datetime, count: int) -> datetime:
+    index = month.year * 12 + month.month - 1 + count
+    return datetime(index // 12, index % 12 + 1, 1, tzinfo=timezone.utc)
+
+
+def partition_name(month: datetime) -> str:
+    return f"{JOURNAL_TABLE}_y{month.year}m{month.month:02d}"
+
+
+def create_default_partition(cursor):
+    cursor.execute(
+        f"CREATE TABLE IF NOT EXISTS {DEFAULT_PARTITION} "
+        f"PARTITION OF {JOURNAL_TABLE} DEFAULT"
+    )
+
+
+def create_journal_partition(cursor, month: datetime) -> bool:
+    """Creates the partition holding the entries of `month` if it does not exist.
+
+    Entries of that month already stored in the default partition are moved to the
+    new partition.
+
+    :return: whether the partition was created
+    """
+    name = partition_name(month)
+    cursor.execute("SELECT to_regclass(%s)", [name])
+    if cursor.fetchone()[0] is not None:
+        return False
+
+    start, end = month, add_months(month, 1)
+    cursor.execute(f"CREATE TABLE {name} (LIKE {JOURNAL_TABLE} INCLUDING DEFAULTS)")
+    cursor.execute(
+        f"WITH moved AS ("
+        f"DELETE FROM {DEFAULT_PARTITION} "
+        f"WHERE creation_date >= %s AND creation_date < %s RETURNING *"
+        f") INSERT INTO {name} SELECT * FROM moved",
+        [start, end],
+    )
+    cursor.execute(
+        f"ALTER TABLE {JOURNAL_TABLE} ATTACH PARTITION {name} "
+        f"FOR VALUES FROM (%s) TO (%s)",
+        [start, end],
+    )
+    return True
+
+
+def list_journal_partitions() -> List[Tuple[str, datetime]]:
+    """Lists the monthly partitions of the journal with the month they hold,
+    oldest first"""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT child.relname FROM pg_inherits "
+            "JOIN pg_class parent ON parent.oid = pg_inherits.inhparent "
+            "JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+            "WHERE parent.relname = %s",
+            [JOURNAL_TABLE],
+        )
+        names = [row[0] for row in cursor.fetchall()]
+
+    partitions = []
+    for name in names:
+        match = PARTITION_NAME_REGEX.match(name)
+        if match is not None:
+            year, month = int(match.group(1)), int(match.group(2))
+            partitions.append((name, datetime(year, month, 1, tzinfo=timezone.utc)))
+
+    return sorted(partitions, key=lambda partition: partition[1])
+
+
+def archive_journal_partition(name: str, output_dir: Path) -> Path:
+    """Writes the rows of a partition of the journal to a gzipped CSV file in
+    `output_dir`, then detaches the partition and drops it.
+
+    Detaching takes an exclusive lock on the whole journal until the transaction
+    ends: rows are exported beforehand, only holding a read lock on the partition,
+    and the journal is only locked to detach and drop it. Entries are dated when
+    they are written, so that archived months don't receive new ones meanwhile.
+
+    Nothing is dropped if the file could not be written.
+
+    :return: the path of the archive
+    """
+    path = Path(output_dir) / f"{name}.csv.gz"
+    partial_path = path.with_name(f"{path.name}.partial")
+
+    with connection.cursor() as cursor, gzip.open(partial_path, "wb") as f:
+        cursor.copy_expert(f"COPY {name} TO STDOUT WITH (FORMAT csv, HEADER)", f)
+    partial_path.rename(path)
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f"ALTER TABLE {JOURNAL_TABLE} DETACH PARTITION {name}")
+        cursor.execute(f"DROP TABLE {name}")
+
+    return path
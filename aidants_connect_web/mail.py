@@ -1,9 +1,16 @@
 import json
+import logging
 from smtplib import SMTPException
+from typing import Collection, Optional
 
 from django.conf import settings
 from django.core.mail.backends.smtp import EmailBackend
 from django.core.mail.message import EmailMessage, sanitize_address
+from django.db import transaction
+
+from aidants_connect_web.models import OutgoingEmail
+
+logger = logging.getLogger()
 
 
 class ForceSpecificSenderBackend(EmailBackend):
@@ -13,6 +20,10 @@ class ForceSpecificSenderBackend(EmailBackend):
     and add extra headers to emails (provided in JSON in settings.EMAIL_EXTRA_HEADERS).
     """
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.extra_headers = json.loads(settings.EMAIL_EXTRA_HEADERS)
+
     def _send(self, email_message: EmailMessage):
         """A helper method that does the actual sending."""
         if not email_message.recipients():
@@ -23,8 +34,7 @@ class ForceSpecificSenderBackend(EmailBackend):
             email_message.from_email, encoding
         )
         email_message.from_email = settings.EMAIL_SENDER
-        for key, value in json.loads(settings.EMAIL_EXTRA_HEADERS).items():
-            email_message.extra_headers[key] = value
+        email_message.extra_headers.update(self.extra_headers)
         # /Specific
         from_email = sanitize_address(email_message.from_email, encoding)
         recipients = [
@@ -40,3 +50,36 @@ class ForceSpecificSenderBackend(EmailBackend):
                 raise
             return False
         return True
+
+
+def queue_mail(
+    subject: str,
+    message: str,
+    from_email: Optional[str],
+    recipient_list: Collection[str],
+    html_message: Optional[str] = None,
+) -> OutgoingEmail:
+    """Queues an email like `django.core.mail.send_mail` would send it.
+
+    The email is stored in the outbox within the current transaction and sent by the
+    `send_queued_emails` task once it is committed.
+    """
+    email = OutgoingEmail.objects.create(
+        from_email=from_email or settings.DEFAULT_FROM_EMAIL,
+        recipients=list(recipient_list),
+        subject=subject,
+        body=message,
+        html_body=html_message or "",
+    )
+    transaction.on_commit(_drain_outbox)
+    return email
+
+
+def _drain_outbox():
+    from aidants_connect_web.tasks import send_queued_emails
+
+    try:
+        send_queued_emails.delay()
+    except Exception as e:
+        # The periodic run of the task will send the email
+        logger.warning("Could not schedule the sending of queued emails", exc_info=e)
@@ -0,0 +1,80 @@
+import logging
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from aidants_connect_common.utils.constants import AuthorizationDurations
+from aidants_connect_web.journal_partitions import (
+    add_months,
+    archive_journal_partition,
+    list_journal_partitions,
+    month_start,
+)
+
+logger = logging.getLogger()
+
+# The attestation creation entries of mandates are read as long as they last, at
+# most `AuthorizationDurations.LONG` (365 days), and searched up to 24 hours after
+# the creation of the mandate: 12 complete months may only last 365 days.
+MIN_RETENTION_MONTHS = 13
+
+
+class Command(BaseCommand):
+    help = (
+        "Detaches the partitions of the journal older than the retention period, "
+        "archives them to gzipped CSV files and drops them"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--retention-months",
+            type=int,
+            required=True,
+            help=(
+                "Number of complete months of entries to keep in the database, "
+                f"at least {MIN_RETENTION_MONTHS}"
+            ),
+        )
+        parser.add_argument(
+            "--output-dir",
+            type=Path,
+            required=True,
+            help="Directory the archives are written to",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Only list the partitions that would be archived",
+        )
+
+    def handle(self, *args, **options):
+        if options["retention_months"] < MIN_RETENTION_MONTHS:
+            raise CommandError(
+                f"At least {MIN_RETENTION_MONTHS} months must be kept: the journal "
+                "holds the attestations of mandates that last up to "
+                f"{AuthorizationDurations.DAYS[AuthorizationDurations.LONG]} days"
+            )
+
+        output_dir = Path(options["output_dir"])
+        if not output_dir.is_dir():
+            raise CommandError(f"{output_dir} is not a directory")
+
+        threshold = add_months(
+            month_start(timezone.now()), -options["retention_months"]
+        )
+        partitions = [
+            name for name, month in list_journal_partitions() if month < threshold
+        ]
+
+        if not partitions:
+            logger.info("No journal partition to archive")
+            return
+
+        for name in partitions:
+            if options["dry_run"]:
+                logger.info(f"{name} would be archived")
+                continue
+
+            path = archive_journal_partition(name, output_dir)
+            logger.info(f"{name} archived to {path}")
@@ -0,0 +1,119 @@
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+
+from django.core.management.base import BaseCommand
+from django.template.defaultfilters import pluralize
+
+from aidants_connect_web.models import Journal, Mandat
+from aidants_connect_web.utilities import (
+    find_mandat_template_path,
+    get_mandat_template_digests,
+)
+
+logger = logging.getLogger()
+
+
+class Command(BaseCommand):
+    help = (
+        "Finds from the journal which template was used by legacy mandates and "
+        "stores it in `Mandat.template_path`"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=500,
+            help="Number of mandates read and updated at once",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=multiprocessing.cpu_count(),
+            help="Number of processes computing attestation hashes, "
+            "hashes are computed in this process if 1 or less",
+        )
+        parser.add_argument(
+            "--after",
+            type=int,
+            default=0,
+            help="Only process mandates with a greater id, used to resume "
+            "an interrupted run",
+        )
+
+    def handle(self, *args, **options):
+        # Computed once here rather than in each worker
+        template_digests = get_mandat_template_digests()
+
+        # Daemonic processes, like the test runner's workers, can't have children
+        if options["workers"] > 1 and not multiprocessing.current_process().daemon:
+            # Workers only hash values: they never touch the database connection
+            # inherited from this process
+            with ProcessPoolExecutor(
+                max_workers=options["workers"],
+                mp_context=multiprocessing.get_context("fork"),
+            ) as executor:
+                unresolved = self.backfill(
+                    executor.map,
+                    template_digests,
+                    options["batch_size"],
+                    options["after"],
+                )
+        else:
+            unresolved = self.backfill(
+                map, template_digests, options["batch_size"], options["after"]
+            )
+
+        if unresolved:
+            logger.warning(
+                f"No template found for {len(unresolved)} "
+                f"mandate{pluralize(len(unresolved))}"
+            )
+            # Written to stdout so that the list can be saved for investigation
+            self.stdout.write("\n".join(str(pk) for pk in unresolved))
+
+    def backfill(self, map_func, template_digests, batch_size, after) -> list:
+        resolved_count = 0
+        unresolved = []
+        last_pk = after
+        while True:
+            mandates = list(
+                Mandat.objects.filter(template_path=None, pk__gt=last_pk)
+                .select_related("usager")
+                .prefetch_related("autorisations")
+                .order_by("pk")[:batch_size]
+            )
+            if not mandates:
+                break
+
+            journal_entries = Journal.find_attestation_creation_entries_by_mandate(
+                mandates
+            )
+            candidates = [
+                mandate._get_attestation_candidates(journal_entries[mandate.pk])
+                for mandate in mandates
+            ]
+            resolved = []
+            for mandate, template_path in zip(
+                mandates,
+                map_func(
+                    find_mandat_template_path, candidates, repeat(template_digests)
+                ),
+            ):
+                if template_path is None:
+                    unresolved.append(mandate.pk)
+                else:
+                    mandate.template_path = template_path
+                    resolved.append(mandate)
+
+            Mandat.objects.bulk_update(resolved, ["template_path"])
+            resolved_count += len(resolved)
+            last_pk = mandates[-1].pk
+            logger.info(
+                f"{resolved_count} mandate{pluralize(resolved_count)} updated, "
+                f"{len(unresolved)} unresolved; resume with --after {last_pk}"
+            )
+
+        return unresolved
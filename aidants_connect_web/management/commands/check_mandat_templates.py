@@ -0,0 +1,64 @@
+import json
+from os import listdir
+from os.path import join as path_join
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from aidants_connect_web import utilities
+from aidants_connect_web.utilities import (
+    MANDAT_TEMPLATE_DIGESTS_FILE,
+    MandatTemplateChangedError,
+    get_mandat_template_digest,
+    load_mandat_template_digests_file,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Checks that mandate templates were not modified since their digest was "
+        f"recorded in {MANDAT_TEMPLATE_DIGESTS_FILE.name}"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--register",
+            action="store_true",
+            help="Record the digest of templates that are not registered yet",
+        )
+
+    def handle(self, *args, **options):
+        template_dir = (
+            Path(utilities.__file__).resolve().parent
+            / "templates"
+            / settings.MANDAT_TEMPLATE_DIR
+        )
+        recorded_digests = load_mandat_template_digests_file()
+        digests = {}
+        errors = []
+
+        for filename in sorted(listdir(template_dir)):
+            template_path = path_join(settings.MANDAT_TEMPLATE_DIR, filename)
+            try:
+                digests[template_path] = get_mandat_template_digest(template_path)
+            except MandatTemplateChangedError as e:
+                errors.append(str(e))
+
+        if errors:
+            raise CommandError("\n".join(errors))
+
+        unregistered = sorted(digests.keys() - recorded_digests.keys())
+        if unregistered and not options["register"]:
+            raise CommandError(
+                "Those templates are not registered, run this command with "
+                f"--register to record their digest: {', '.join(unregistered)}"
+            )
+
+        if unregistered:
+            with open(MANDAT_TEMPLATE_DIGESTS_FILE, "w") as f:
+                json.dump({**recorded_digests, **digests}, f, indent=2, sort_keys=True)
+                f.write("\n")
+            self.stdout.write(f"Registered {', '.join(unregistered)}")
+
+        self.stdout.write(self.style.SUCCESS(f"{len(digests)} templates checked"))
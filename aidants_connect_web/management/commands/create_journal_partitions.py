@@ -0,0 +1,22 @@
+import logging
+
+from django.core.management.base import BaseCommand
+
+from aidants_connect_web.tasks import create_journal_partitions
+
+logger = logging.getLogger()
+
+
+class Command(BaseCommand):
+    help = "Creates the monthly partitions of the journal ahead of time"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--months-ahead",
+            type=int,
+            default=3,
+            help="Number of months after the current one to create partitions for",
+        )
+
+    def handle(self, *args, **options):
+        create_journal_partitions(months_ahead=options["months_ahead"], logger=logger)
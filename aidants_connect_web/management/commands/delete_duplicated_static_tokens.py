@@ -13,5 +13,21 @@ class Command(BaseCommand):
         "with confirmed totp cards"
     )
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            help="Number of rows deleted per statement",
+        )
+        parser.add_argument(
+            "--time-budget",
+            type=int,
+            help="Time, in seconds, after which no new batch is started",
+        )
+
     def handle(self, *args, **options):
-        delete_duplicated_static_tokens(logger=logger)
+        delete_duplicated_static_tokens(
+            batch_size=options["batch_size"],
+            time_budget=options["time_budget"],
+            logger=logger,
+        )
@@ -10,5 +10,21 @@ logger = logging.getLogger()
 class Command(BaseCommand):
     help = "Deletes the expired `Connection` objects from the database"
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            help="Number of connections deleted per statement",
+        )
+        parser.add_argument(
+            "--time-budget",
+            type=int,
+            help="Time, in seconds, after which no new batch is started",
+        )
+
     def handle(self, *args, **options):
-        delete_expired_connections(logger=logger)
+        delete_expired_connections(
+            batch_size=options["batch_size"],
+            time_budget=options["time_budget"],
+            logger=logger,
+        )
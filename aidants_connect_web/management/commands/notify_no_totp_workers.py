@@ -1,7 +1,12 @@
+import logging
+
 from django.core.management.base import BaseCommand
 
+from aidants_connect_web.notifications import DispatchReport
 from aidants_connect_web.tasks import notify_no_totp_workers
 
+logger = logging.getLogger()
+
 
 class Command(BaseCommand):
     help = (
@@ -9,5 +14,30 @@ class Command(BaseCommand):
         "who have not yet paired their TOTP card"
     )
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            help="Number of emails sent at once through the connection",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            help="Number of processes rendering the emails",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Send the emails to the in-memory backend and print the "
+            "throughput instead",
+        )
+
     def handle(self, *args, **options):
-        notify_no_totp_workers()
+        report = notify_no_totp_workers(
+            batch_size=options["batch_size"],
+            workers=options["workers"],
+            dry_run=options["dry_run"],
+            logger=logger,
+        )
+        if options["dry_run"]:
+            self.stdout.write(str(DispatchReport(**report)))
@@ -1,10 +1,40 @@
+import logging
+
 from django.core.management.base import BaseCommand
 
+from aidants_connect_web.notifications import DispatchReport
 from aidants_connect_web.tasks import notify_soon_expired_mandates
 
+logger = logging.getLogger()
+
 
 class Command(BaseCommand):
     help = "Notifies organisations by email about soon to be expired mandates"
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            help="Number of emails sent at once through the connection",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            help="Number of processes rendering the emails",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Send the emails to the in-memory backend and print the "
+            "throughput instead",
+        )
+
     def handle(self, *args, **options):
-        notify_soon_expired_mandates()
+        report = notify_soon_expired_mandates(
+            batch_size=options["batch_size"],
+            workers=options["workers"],
+            dry_run=options["dry_run"],
+            logger=logger,
+        )
+        if options["dry_run"]:
+            self.stdout.write(str(DispatchReport(**report)))
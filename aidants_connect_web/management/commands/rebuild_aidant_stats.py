@@ -0,0 +1,14 @@
+import logging
+
+from django.core.management.base import BaseCommand
+
+from aidants_connect_web.tasks import rebuild_aidant_stats
+
+logger = logging.getLogger()
+
+
+class Command(BaseCommand):
+    help = "Recomputes the activity figures of each aidant from the journal"
+
+    def handle(self, *args, **options):
+        rebuild_aidant_stats(logger=logger)
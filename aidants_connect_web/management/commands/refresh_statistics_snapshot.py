@@ -0,0 +1,14 @@
+import logging
+
+from django.core.management.base import BaseCommand
+
+from aidants_connect_web.tasks import refresh_statistics_snapshot
+
+logger = logging.getLogger()
+
+
+class Command(BaseCommand):
+    help = "Recomputes the figures displayed on the public statistics page"
+
+    def handle(self, *args, **options):
+        refresh_statistics_snapshot(logger=logger)
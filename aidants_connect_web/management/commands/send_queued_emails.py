@@ -0,0 +1,30 @@
+import logging
+
+from django.core.management.base import BaseCommand
+
+from aidants_connect_web.tasks import send_queued_emails
+
+logger = logging.getLogger()
+
+
+class Command(BaseCommand):
+    help = "Sends the emails waiting in the outbox"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            help="Number of emails locked and sent per transaction",
+        )
+        parser.add_argument(
+            "--time-budget",
+            type=int,
+            help="Time, in seconds, after which no new batch is started",
+        )
+
+    def handle(self, *args, **options):
+        send_queued_emails(
+            batch_size=options["batch_size"],
+            time_budget=options["time_budget"],
+            logger=logger,
+        )
@@ -0,0 +1,37 @@
+import logging
+
+from django.core.management.base import BaseCommand
+
+from aidants_connect_web.tasks import transfer_mandates
+
+logger = logging.getLogger()
+
+
+class Command(BaseCommand):
+    help = (
+        "Runs a mandate transfer requested in the admin that is still pending, "
+        "for instance because it could not be scheduled, or resumes one whose "
+        "worker was stopped"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("transfer_id", type=int)
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            help="Number of mandates transferred per transaction",
+        )
+        parser.add_argument(
+            "--resume",
+            action="store_true",
+            help="Also run the transfer if it is still marked as running: make "
+            "sure that no worker is running it anymore",
+        )
+
+    def handle(self, *args, **options):
+        transfer_mandates(
+            transfer_id=options["transfer_id"],
+            batch_size=options["batch_size"],
+            resume=options["resume"],
+            logger=logger,
+        )
@@ -0,0 +1,27 @@
+import logging
+
+from django.core.management.base import BaseCommand
+
+from aidants_connect_web.tasks import update_mandats_autorisation_state
+
+logger = logging.getLogger()
+
+
+class Command(BaseCommand):
+    help = (
+        "Recomputes the number of active autorisations and the revocation date "
+        "stored on each `Mandat`"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Number of mandates updated per statement",
+        )
+
+    def handle(self, *args, **options):
+        update_mandats_autorisation_state(
+            batch_size=options["batch_size"], logger=logger
+        )
@@ -0,0 +1,30 @@
+# Generated by Django 4.0.10 on 2026-10-18 20:22
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def populate_last_action_date(apps, schema_editor):
+    Aidant = apps.get_model("aidants_connect_web", "Aidant")
+    Journal = apps.get_model("aidants_connect_web", "Journal")
+
+    last_entry = Journal.objects.filter(aidant=OuterRef("pk")).order_by("-pk")
+    Aidant.objects.update(
+        last_action_date=Subquery(last_entry.values("creation_date")[:1])
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('aidants_connect_web', '0011_fix_pytz_timezones'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='aidant',
+            name='last_action_date',
+            field=models.DateTimeField(blank=True, editable=False, null=True, verbose_name='Date de la dernière action'),
+        ),
+        migrations.RunPython(populate_last_action_date, migrations.RunPython.noop),
+    ]
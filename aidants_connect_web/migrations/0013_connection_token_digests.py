@@ -0,0 +1,23 @@
+# Generated by Django 4.0.10 on 2026-10-18 20:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('aidants_connect_web', '0012_aidant_last_action_date'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='connection',
+            name='access_token_digest',
+            field=models.CharField(editable=False, max_length=64, null=True, unique=True),
+        ),
+        migrations.AddField(
+            model_name='connection',
+            name='code_digest',
+            field=models.CharField(editable=False, max_length=64, null=True, unique=True),
+        ),
+    ]
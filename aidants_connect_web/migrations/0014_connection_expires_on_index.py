@@ -0,0 +1,19 @@
+# Generated by Django 4.0.10 on 2026-10-18 20:30
+
+import aidants_connect_web.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('aidants_connect_web', '0013_connection_token_digests'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='connection',
+            name='expires_on',
+            field=models.DateTimeField(db_index=True, default=aidants_connect_web.models.default_connection_expiration_date),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 4.0.10 on 2026-10-18 20:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('aidants_connect_web', '0014_connection_expires_on_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StatisticsSnapshot',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('creation_date', models.DateTimeField(auto_now_add=True, verbose_name='Date de création')),
+                ('organisations_accredited_count', models.PositiveIntegerField(default=0)),
+                ('organisations_not_accredited_count', models.PositiveIntegerField(default=0)),
+                ('aidants_count', models.PositiveIntegerField(default=0)),
+                ('aidants_accrediting_count', models.PositiveIntegerField(default=0)),
+                ('mandats_count', models.PositiveIntegerField(default=0)),
+                ('active_mandats_count', models.PositiveIntegerField(default=0)),
+                ('usagers_with_mandat_count', models.PositiveIntegerField(default=0)),
+                ('usagers_with_active_mandat_count', models.PositiveIntegerField(default=0)),
+                ('autorisation_use_count', models.PositiveIntegerField(default=0)),
+                ('autorisation_use_recent_count', models.PositiveIntegerField(default=0)),
+                ('usagers_helped_count', models.PositiveIntegerField(default=0)),
+                ('usagers_helped_recent_count', models.PositiveIntegerField(default=0)),
+                ('demarches_count', models.JSONField(default=dict)),
+            ],
+            options={
+                'verbose_name': 'instantané des statistiques',
+                'verbose_name_plural': 'instantanés des statistiques',
+                'get_latest_by': 'creation_date',
+            },
+        ),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 4.0.10 on 2026-10-18 20:37
+
+from django.db import migrations, models
+from django.db.models import Case, Count, Exists, Max, OuterRef, Subquery, When
+from django.db.models.functions import Coalesce
+
+
+def populate_autorisation_state(apps, schema_editor):
+    Mandat = apps.get_model("aidants_connect_web", "Mandat")
+    Autorisation = apps.get_model("aidants_connect_web", "Autorisation")
+
+    autorisations = (
+        Autorisation.objects.filter(mandat=OuterRef("pk")).order_by().values("mandat")
+    )
+    active_autorisations = autorisations.filter(revocation_date__isnull=True)
+    Mandat.objects.update(
+        active_autorisation_count=Coalesce(
+            Subquery(active_autorisations.annotate(count=Count("pk")).values("count")),
+            0,
+        ),
+        revoked_at=Case(
+            When(Exists(active_autorisations), then=None),
+            default=Subquery(
+                autorisations.annotate(
+                    last_revocation=Max("revocation_date")
+                ).values("last_revocation")
+            ),
+            output_field=models.DateTimeField(),
+        ),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('aidants_connect_web', '0015_statisticssnapshot'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='mandat',
+            name='active_autorisation_count',
+            field=models.PositiveSmallIntegerField(default=0, editable=False, verbose_name="Nombre d'autorisations actives"),
+        ),
+        migrations.AddField(
+            model_name='mandat',
+            name='revoked_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True, verbose_name='Date de révocation'),
+        ),
+        migrations.RunPython(populate_autorisation_state, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='mandat',
+            index=models.Index(condition=models.Q(('revoked_at__isnull', True)), fields=['organisation', 'expiration_date'], name='mandat_active_organisation_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='mandat',
+            index=models.Index(condition=models.Q(('revoked_at__isnull', True)), fields=['usager', 'expiration_date'], name='mandat_active_usager_idx'),
+        ),
+    ]
@@ -0,0 +1,112 @@
+# Generated by Django 4.0.10 on 2026-10-18 20:55
+
+from django.db import migrations, models
+from django.utils import timezone
+
+from aidants_connect_web.journal_partitions import (
+    JOURNAL_TABLE,
+    add_months,
+    create_default_partition,
+    create_journal_partition,
+    month_start,
+)
+
+PARTITIONS_AHEAD = 3
+
+
+def rebuild_journal_table(cursor, partitioned):
+    """Recreates the journal table, with the same indexes and constraints, and
+    copies the entries over."""
+    old_table = f"{JOURNAL_TABLE}_old"
+
+    cursor.execute(
+        "SELECT conname, contype, pg_get_constraintdef(oid) FROM pg_constraint "
+        "WHERE conrelid = %s::regclass",
+        [JOURNAL_TABLE],
+    )
+    constraints = cursor.fetchall()
+    cursor.execute(
+        "SELECT indexname, indexdef FROM pg_indexes "
+        "WHERE tablename = %s AND schemaname = current_schema()",
+        [JOURNAL_TABLE],
+    )
+    constraint_names = {name for name, _, _ in constraints}
+    indexes = [
+        (name, definition)
+        for name, definition in cursor.fetchall()
+        if name not in constraint_names
+    ]
+
+    # Free the names so that the new table can use them
+    for name, _ in indexes:
+        cursor.execute(f"DROP INDEX {name}")
+    for name, _, _ in constraints:
+        cursor.execute(f"ALTER TABLE {JOURNAL_TABLE} DROP CONSTRAINT {name}")
+    cursor.execute(f"ALTER TABLE {JOURNAL_TABLE} RENAME TO {old_table}")
+
+    cursor.execute(
+        f"CREATE TABLE {JOURNAL_TABLE} (LIKE {old_table} INCLUDING DEFAULTS)"
+        + (" PARTITION BY RANGE (creation_date)" if partitioned else "")
+    )
+    cursor.execute(f"ALTER SEQUENCE {JOURNAL_TABLE}_id_seq OWNED BY {JOURNAL_TABLE}.id")
+
+    if partitioned:
+        cursor.execute(f"SELECT min(creation_date) FROM {old_table}")
+        first_entry_date = cursor.fetchone()[0]
+        now = timezone.now()
+        month = month_start(first_entry_date or now)
+        last_month = add_months(month_start(now), PARTITIONS_AHEAD)
+        create_default_partition(cursor)
+        while month <= last_month:
+            create_journal_partition(cursor, month)
+            month = add_months(month, 1)
+
+    cursor.execute(f"INSERT INTO {JOURNAL_TABLE} SELECT * FROM {old_table}")
+    cursor.execute(f"DROP TABLE {old_table}")
+
+    for name, constraint_type, definition in constraints:
+        if constraint_type == "p":
+            # The partition key has to be part of the primary key
+            definition = (
+                "PRIMARY KEY (id, creation_date)" if partitioned else "PRIMARY KEY (id)"
+            )
+        cursor.execute(f"ALTER TABLE {JOURNAL_TABLE} ADD CONSTRAINT {name} {definition}")
+    for _, definition in indexes:
+        cursor.execute(definition)
+
+
+def partition_journal(apps, schema_editor):
+    with schema_editor.connection.cursor() as cursor:
+        rebuild_journal_table(cursor, partitioned=True)
+
+
+def unpartition_journal(apps, schema_editor):
+    with schema_editor.connection.cursor() as cursor:
+        rebuild_journal_table(cursor, partitioned=False)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('aidants_connect_web', '0016_mandat_autorisation_state'),
+    ]
+
+    operations = [
+        migrations.RunPython(partition_journal, unpartition_journal),
+        migrations.AddIndex(
+            model_name='journal',
+            index=models.Index(fields=['action', 'aidant', 'creation_date'], name='journal_action_aidant_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='journal',
+            index=models.Index(fields=['action', 'mandat'], name='journal_action_mandat_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='journal',
+            index=models.Index(fields=['action', 'usager', 'creation_date'], name='journal_action_usager_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='journal',
+            index=models.Index(fields=['aidant', 'creation_date'], name='journal_aidant_date_idx'),
+        ),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 4.0.10 on 2026-10-18 21:03
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models import Q
+
+
+def populate_aidant_stats(apps, schema_editor):
+    Journal = apps.get_model("aidants_connect_web", "Journal")
+    AidantStats = apps.get_model("aidants_connect_web", "AidantStats")
+
+    is_connection = Q(action="connect_aidant")
+    is_attestation = Q(action="create_attestation")
+    rows = (
+        Journal.objects.filter(
+            aidant__isnull=False,
+            action__in=["connect_aidant", "create_attestation", "use_autorisation"],
+        )
+        .order_by()
+        .values("aidant")
+        .annotate(
+            mandats_created_count=models.Count("pk", filter=is_attestation),
+            autorisation_use_count=models.Count(
+                "pk", filter=Q(action="use_autorisation")
+            ),
+            last_connection_date=models.Max("creation_date", filter=is_connection),
+            last_mandat_date=models.Max("creation_date", filter=is_attestation),
+        )
+    )
+    AidantStats.objects.bulk_create(
+        (AidantStats(aidant_id=row.pop("aidant"), **row) for row in rows.iterator()),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('aidants_connect_web', '0017_journal_partitioning'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AidantStats',
+            fields=[
+                ('aidant', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('mandats_created_count', models.PositiveIntegerField(default=0, verbose_name='Nombre de mandats créés')),
+                ('autorisation_use_count', models.PositiveIntegerField(default=0, verbose_name="Nombre d'utilisations d'autorisations")),
+                ('last_connection_date', models.DateTimeField(null=True, verbose_name='Date de dernière connexion')),
+                ('last_mandat_date', models.DateTimeField(null=True, verbose_name='Date du dernier mandat créé')),
+            ],
+            options={
+                'verbose_name': "statistiques d'un aidant",
+                'verbose_name_plural': 'statistiques des aidants',
+            },
+        ),
+        migrations.RunPython(populate_aidant_stats, migrations.RunPython.noop),
+    ]
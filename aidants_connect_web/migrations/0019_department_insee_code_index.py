@@ -0,0 +1,35 @@
+# Generated by Django 4.0.10 on 2026-10-18 21:08
+
+from django.db import migrations, models
+from django.db.models import Q
+
+from aidants_connect_common.models import Department
+
+
+def populate_department_insee_code(apps, schema_editor):
+    Organisation = apps.get_model("aidants_connect_web", "Organisation")
+
+    # Codes set from the address API are kept, only missing ones are guessed
+    batch = []
+    for item in Organisation.objects.filter(Q(department_insee_code__isnull=True) | Q(department_insee_code="")).only("zipcode", "department_insee_code").iterator():
+        item.department_insee_code = Department.insee_code_from_zipcode(item.zipcode)
+        if item.department_insee_code is not None:
+            batch.append(item)
+
+    Organisation.objects.bulk_update(batch, ["department_insee_code"], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('aidants_connect_web', '0018_aidantstats'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='organisation',
+            name='department_insee_code',
+            field=models.CharField(blank=True, db_index=True, max_length=5, null=True, verbose_name='Code INSEE du département'),
+        ),
+        migrations.RunPython(populate_department_insee_code, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 4.0.10 on 2026-10-18 21:20
+
+import django.contrib.postgres.fields
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('aidants_connect_web', '0019_department_insee_code_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OutgoingEmail',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('from_email', models.CharField(max_length=254, verbose_name='Expéditeur')),
+                ('recipients', django.contrib.postgres.fields.ArrayField(base_field=models.CharField(max_length=254), size=None, verbose_name='Destinataires')),
+                ('subject', models.TextField(verbose_name='Objet')),
+                ('body', models.TextField(verbose_name='Message')),
+                ('html_body', models.TextField(blank=True, default='', verbose_name='Message HTML')),
+                ('status', models.CharField(choices=[('pending', 'En attente'), ('sent', 'Envoyé'), ('failed', 'Échec')], default='pending', max_length=10, verbose_name='État')),
+                ('creation_date', models.DateTimeField(auto_now_add=True, verbose_name='Date de création')),
+                ('next_attempt_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Prochaine tentative')),
+                ('attempts', models.PositiveSmallIntegerField(default=0, verbose_name='Tentatives')),
+                ('last_error', models.TextField(blank=True, default='', verbose_name='Dernière erreur')),
+                ('sent_at', models.DateTimeField(blank=True, null=True, verbose_name="Date d'envoi")),
+            ],
+            options={
+                'verbose_name': 'email en attente',
+                'verbose_name_plural': 'emails en attente',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='outgoingemail',
+            index=models.Index(condition=models.Q(('status', 'pending')), fields=['next_attempt_at'], name='outgoing_email_pending_idx'),
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 4.0.10 on 2026-10-18 21:28
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import migrations, models
+from django.utils import timezone
+
+from aidants_connect_common.utils.constants import AuthorizationDurations
+
+
+def mark_already_notified_mandates(apps, schema_editor):
+    # Mandates which entered the notice window before the last daily run of
+    # notify_soon_expired_mandates were already notified
+    Mandat = apps.get_model("aidants_connect_web", "Mandat")
+    now = timezone.now()
+    Mandat.objects.filter(
+        duree_keyword__in=(
+            AuthorizationDurations.LONG,
+            AuthorizationDurations.SEMESTER,
+        ),
+        expiration_date__range=(
+            now, now + timedelta(days=settings.MANDAT_EXPIRED_SOON - 1)
+        ),
+    ).update(expiration_notified_at=now)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('aidants_connect_web', '0020_outgoingemail'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='mandat',
+            name='expiration_notified_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True, verbose_name="Date de notification de l'expiration"),
+        ),
+        migrations.AddIndex(
+            model_name='mandat',
+            index=models.Index(condition=models.Q(('expiration_notified_at__isnull', True)), fields=['duree_keyword', 'expiration_date'], name='mandat_expiration_notice_idx'),
+        ),
+        migrations.RunPython(mark_already_notified_mandates, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 4.0.10 on 2026-10-18 21:36
+
+from django.conf import settings
+import django.contrib.postgres.fields
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('aidants_connect_web', '0021_mandat_expiration_notified_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MandatTransfer',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('mandat_ids', django.contrib.postgres.fields.ArrayField(base_field=models.PositiveIntegerField(), size=None, verbose_name='Mandats')),
+                ('status', models.CharField(choices=[('pending', 'En attente'), ('running', 'En cours'), ('done', 'Terminé'), ('failed', 'Échec')], default='pending', max_length=10, verbose_name='État')),
+                ('transferred_count', models.PositiveIntegerField(default=0, verbose_name='Mandats transférés')),
+                ('failures', models.JSONField(default=dict, verbose_name='Échecs')),
+                ('creation_date', models.DateTimeField(auto_now_add=True, verbose_name='Date de création')),
+                ('end_date', models.DateTimeField(blank=True, null=True, verbose_name='Date de fin')),
+                ('organisation', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='aidants_connect_web.organisation', verbose_name='Organisation de destination')),
+                ('requested_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Demandé par')),
+            ],
+            options={
+                'verbose_name': 'transfert de mandats',
+                'verbose_name_plural': 'transferts de mandats',
+            },
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 4.0.10 on 2026-10-19 09:12
+
+from django.db import migrations, models
+from django.utils import timezone
+
+from aidants_connect_common.utils.constants import AuthorizationDurations
+
+
+def mark_expired_mandates_as_notified(apps, schema_editor):
+    # Mandates which expired before `expiration_notified_at` was added were notified
+    # by the daily runs of notify_soon_expired_mandates while they were in the window
+    Mandat = apps.get_model("aidants_connect_web", "Mandat")
+    Mandat.objects.filter(
+        duree_keyword__in=(
+            AuthorizationDurations.LONG,
+            AuthorizationDurations.SEMESTER,
+        ),
+        expiration_date__lt=timezone.now(),
+        expiration_notified_at__isnull=True,
+    ).update(expiration_notified_at=timezone.now())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('aidants_connect_web', '0022_mandattransfer'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='mandat',
+            name='mandat_expiration_notice_idx',
+        ),
+        migrations.RunPython(mark_expired_mandates_as_notified, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='mandat',
+            index=models.Index(condition=models.Q(('duree_keyword__in', ('LONG', 'SEMESTER')), ('expiration_notified_at__isnull', True)), fields=['expiration_date'], name='mandat_expiration_notice_idx'),
+        ),
+    ]
@@ -1,22 +1,24 @@
 from __future__ import annotations
 
 import logging
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
 from datetime import datetime, timedelta
-from os import walk as os_walk
-from os.path import dirname
-from os.path import join as path_join
 from re import sub as regex_sub
-from typing import Collection, Optional, Union
+from typing import Callable, Collection, Dict, Optional, Union
 
 from django.conf import settings
 from django.contrib import messages as django_messages
+from django.contrib.auth.hashers import make_password
 from django.contrib.auth.models import AbstractUser, UserManager
 from django.contrib.postgres.fields import ArrayField
-from django.db import models, transaction
+from django.core.mail import EmailMultiAlternatives
+from django.db import connection, models, transaction
 from django.db.models import SET_NULL, Q, QuerySet, Value
-from django.db.models.functions import Concat
+from django.db.models.functions import Coalesce, Concat
 from django.dispatch import Signal
-from django.template import defaultfilters, loader
+from django.template import defaultfilters
 from django.urls import reverse
 from django.utils import timezone
 from django.utils.functional import cached_property
@@ -24,6 +26,7 @@ from django.utils.functional import cached_property
 from django_otp.plugins.otp_totp.models import TOTPDevice
 from phonenumber_field.modelfields import PhoneNumberField
 
+from aidants_connect_common.models import DepartmentInseeCodeMixin
 from aidants_connect_common.utils.constants import (
     JOURNAL_ACTIONS,
     AuthorizationDurationChoices,
@@ -31,7 +34,13 @@ from aidants_connect_common.utils.constants import (
     JournalActionKeywords,
 )
 from aidants_connect_web.utilities import (
+    find_mandat_template_path,
     generate_attestation_hash,
+    generate_token_digest,
+    get_attestation_data,
+    get_mandat_template_digest,
+    get_mandat_template_digests,
+    hash_attestation_data,
     mandate_template_path,
 )
 
@@ -61,7 +70,22 @@ class OrganisationType(models.Model):
         return f"{self.name}"
 
 
-class OrganisationManager(models.Manager):
+def _count_per_organisation(queryset: QuerySet, count=None) -> Coalesce:
+    """Returns a subquery counting the rows of `queryset` that belong to the
+    organisation of the outer query, to be used in `annotate`."""
+    return Coalesce(
+        models.Subquery(
+            queryset.filter(organisation=models.OuterRef("pk"))
+            .order_by()
+            .values("organisation")
+            .annotate(count=count or models.Count("pk"))
+            .values("count")
+        ),
+        0,
+    )
+
+
+class OrganisationQuerySet(models.QuerySet):
     def accredited(self):
         return self.filter(
             aidants__is_active=True,
@@ -78,8 +102,23 @@ class OrganisationManager(models.Manager):
             is_active=True,
         ).distinct()
 
+    def with_counters(self):
+        """Annotates `num_active_aidants`, `num_mandats`, `num_active_mandats` and
+        `num_usagers`, so that reading them on the returned organisations does not
+        run a query per organisation."""
+        return self.annotate(
+            num_active_aidants=_count_per_organisation(
+                Aidant.organisations.through.objects.filter(aidant__is_active=True)
+            ),
+            num_mandats=_count_per_organisation(Mandat.objects.all()),
+            num_active_mandats=_count_per_organisation(Mandat.objects.active()),
+            num_usagers=_count_per_organisation(
+                Mandat.objects.all(), models.Count("usager", distinct=True)
+            ),
+        )
+
 
-class Organisation(models.Model):
+class Organisation(DepartmentInseeCodeMixin, models.Model):
     data_pass_id = models.PositiveIntegerField("Datapass ID", null=True, unique=True)
     name = models.TextField("Nom", default="No name provided")
     type = models.ForeignKey(
@@ -94,13 +133,19 @@ class Organisation(models.Model):
         "Code INSEE de la ville", max_length=5, null=True, blank=True
     )
 
+    # Set from the address API or guessed from `zipcode`, see
+    # `DepartmentInseeCodeMixin`
     department_insee_code = models.CharField(
-        "Code INSEE du département", max_length=5, null=True, blank=True
+        "Code INSEE du département",
+        max_length=5,
+        null=True,
+        blank=True,
+        db_index=True,
     )
 
     is_active = models.BooleanField("Est active", default=True, editable=False)
 
-    objects = OrganisationManager()
+    objects = OrganisationQuerySet.as_manager()
 
     def __str__(self):
         return f"{self.name}"
@@ -108,6 +153,8 @@ class Organisation(models.Model):
     class AlreadyExists(Exception):
         pass
 
+    # The `num_*` properties are computed for a batch of organisations by
+    # `OrganisationQuerySet.with_counters()`
     @cached_property
     def num_active_aidants(self):
         return self.aidants.active().count()
@@ -116,6 +163,7 @@ class Organisation(models.Model):
         return self.num_active_aidants
 
     admin_num_active_aidants.short_description = "Nombre d'aidants actifs"
+    admin_num_active_aidants.admin_order_field = "num_active_aidants"
 
     @cached_property
     def num_mandats(self):
@@ -124,17 +172,18 @@ class Organisation(models.Model):
     def admin_num_mandats(self):
         return self.num_mandats
 
+    admin_num_mandats.short_description = "Nombre de mandats"
+    admin_num_mandats.admin_order_field = "num_mandats"
+
     @cached_property
     def num_active_mandats(self):
-        return (
-            Mandat.objects.filter(
-                expiration_date__gte=timezone.now(),
-                organisation=self,
-                autorisations__revocation_date__isnull=True,
-            )
-            .distinct()
-            .count()
-        )
+        return Mandat.objects.filter(organisation=self).active().count()
+
+    def admin_num_active_mandats(self):
+        return self.num_active_mandats
+
+    admin_num_active_mandats.short_description = "Nombre de mandats actifs"
+    admin_num_active_mandats.admin_order_field = "num_active_mandats"
 
     @cached_property
     def aidants_not_responsables(self):
@@ -144,12 +193,16 @@ class Organisation(models.Model):
     def num_usagers(self):
         return Mandat.objects.filter(organisation=self).distinct("usager").count()
 
+    def admin_num_usagers(self):
+        return self.num_usagers
+
+    admin_num_usagers.short_description = "Nombre d'usagers"
+    admin_num_usagers.admin_order_field = "num_usagers"
+
     @property
     def display_address(self):
         return self.address if self.address != "No address provided" else ""
 
-    admin_num_mandats.short_description = "Nombre de mandats"
-
     def set_empty_zipcode_from_address(self):
         if self.zipcode != "0":
             return
@@ -265,6 +318,9 @@ class Aidant(AbstractUser):
         ),
     )
     validated_cgu_version = models.TextField(null=True)
+    last_action_date = models.DateTimeField(
+        "Date de la dernière action", null=True, blank=True, editable=False
+    )
 
     objects = AidantManager()
 
@@ -370,11 +426,11 @@ class Aidant(AbstractUser):
     def get_last_action_timestamp(self):
         """
         :return: the timestamp of this aidant's last logged action or `None`.
+
+        The value is maintained on each `Journal` write (see
+        `Journal.record_last_actions`) so reading it never hits the journal table.
         """
-        try:
-            return Journal.objects.filter(aidant=self).last().creation_date
-        except AttributeError:
-            return None
+        return self.last_action_date
 
     def get_journal_create_attestation(self, access_token):
         """
@@ -590,10 +646,8 @@ class HabilitationRequest(models.Model):
 
 class UsagerQuerySet(models.QuerySet):
     def active(self):
-        return (
-            self.filter(mandats__expiration_date__gt=timezone.now())
-            .filter(mandats__autorisations__revocation_date__isnull=True)
-            .distinct()
+        return self.filter(
+            models.Exists(Mandat.objects.active().filter(usager=models.OuterRef("pk")))
         )
 
     def visible_by(self, aidant):
@@ -717,21 +771,13 @@ class MandatQuerySet(models.QuerySet):
             | Q(autorisations__revocation_date__lt=timezone.now() - timedelta(365))
         )
 
+    # A mandate without any autorisation is not considered revoked by those filters
     def active(self):
-        return (
-            self.exclude(expiration_date__lt=timezone.now())
-            .filter(autorisations__revocation_date__isnull=True)
-            .distinct()
-        )
+        return self.filter(expiration_date__gte=timezone.now(), revoked_at__isnull=True)
 
     def inactive(self):
-        return (
-            self.exclude_outdated()
-            .filter(
-                Q(expiration_date__lt=timezone.now())
-                | ~Q(autorisations__revocation_date__isnull=True)
-            )
-            .distinct()
+        return self.exclude_outdated().filter(
+            Q(expiration_date__lt=timezone.now()) | Q(revoked_at__isnull=False)
         )
 
     def for_usager(self, usager):
@@ -739,8 +785,40 @@ class MandatQuerySet(models.QuerySet):
 
     def renewable(self):
         return self.exclude_outdated().filter(
-            ~Q(expiration_date__gt=timezone.now())
-            | Q(autorisations__revocation_date__isnull=True)
+            Q(expiration_date__lte=timezone.now()) | Q(revoked_at__isnull=True)
+        )
+
+    def update_autorisation_state(self) -> int:
+        """Recomputes `active_autorisation_count` and `revoked_at` from the
+        autorisations of the mandates, in a single UPDATE statement.
+
+        :return: the number of updated mandates
+        """
+        autorisations = (
+            Autorisation.objects.filter(mandat=models.OuterRef("pk"))
+            .order_by()
+            .values("mandat")
+        )
+        active_autorisations = autorisations.filter(revocation_date__isnull=True)
+
+        return self.update(
+            active_autorisation_count=Coalesce(
+                models.Subquery(
+                    active_autorisations.annotate(count=models.Count("pk")).values(
+                        "count"
+                    )
+                ),
+                0,
+            ),
+            revoked_at=models.Case(
+                models.When(models.Exists(active_autorisations), then=None),
+                default=models.Subquery(
+                    autorisations.annotate(
+                        last_revocation=models.Max("revocation_date")
+                    ).values("last_revocation")
+                ),
+                output_field=models.DateTimeField(),
+            ),
         )
 
 
@@ -767,8 +845,48 @@ class Mandat(models.Model):
         editable=False,
     )
 
+    # Maintained by `Autorisation.save()` and `Autorisation.delete()`, see
+    # `MandatQuerySet.update_autorisation_state()`
+    active_autorisation_count = models.PositiveSmallIntegerField(
+        "Nombre d'autorisations actives", default=0, editable=False
+    )
+    revoked_at = models.DateTimeField(
+        "Date de révocation", null=True, blank=True, editable=False
+    )
+    # Set by `notify_soon_expired_mandates` so that every mandate is notified once
+    expiration_notified_at = models.DateTimeField(
+        "Date de notification de l'expiration", null=True, blank=True, editable=False
+    )
+
     objects = MandatQuerySet.as_manager()
 
+    class Meta:
+        indexes = [
+            # Only holds the mandates whose expiration notice is still to be sent,
+            # see `Mandat.find_soon_expired`
+            models.Index(
+                fields=["expiration_date"],
+                condition=Q(
+                    expiration_notified_at__isnull=True,
+                    duree_keyword__in=(
+                        AuthorizationDurations.LONG,
+                        AuthorizationDurations.SEMESTER,
+                    ),
+                ),
+                name="mandat_expiration_notice_idx",
+            ),
+            models.Index(
+                fields=["organisation", "expiration_date"],
+                condition=Q(revoked_at__isnull=True),
+                name="mandat_active_organisation_idx",
+            ),
+            models.Index(
+                fields=["usager", "expiration_date"],
+                condition=Q(revoked_at__isnull=True),
+                name="mandat_active_usager_idx",
+            ),
+        ]
+
     def __str__(self):
         return f"#{self.id}"
 
@@ -782,7 +900,7 @@ class Mandat(models.Model):
             return False
         # A `mandat` is considered `active` if it contains
         # at least one active `autorisation`.
-        return self.autorisations.active().exists()
+        return self.active_autorisation_count > 0
 
     @property
     def can_renew(self):
@@ -790,17 +908,13 @@ class Mandat(models.Model):
             not self.is_expired or self.objects.renewable().filter(mandat=self).exists()
         )
 
-    @cached_property
+    @property
     def revocation_date(self) -> Optional[datetime]:
         """
         Returns the date of the most recently revoked authorization if all them
         were revoked, ``None``, otherwise.
         """
-        return (
-            self.autorisations.order_by("-revocation_date").first().revocation_date
-            if self.was_explicitly_revoked and self.autorisations.exists()
-            else None
-        )
+        return self.revoked_at
 
     @cached_property
     def template_repr(self):
@@ -817,13 +931,13 @@ class Mandat(models.Model):
         )
         return f"signé avec {self.usager}{creation_date_repr}{duree_keyword_repr}"
 
-    @cached_property
+    @property
     def was_explicitly_revoked(self) -> bool:
         """
         Returns whether the mandate was explicitely revoked, independently of it's
         expiration date.
         """
-        return not self.autorisations.exclude(revocation_date__isnull=False)
+        return self.active_autorisation_count == 0
 
     def get_absolute_url(self):
         path = reverse("mandat_visualisation", kwargs={"mandat_id": self.pk})
@@ -834,14 +948,20 @@ class Mandat(models.Model):
         """Returns the template file path of the consent document that was presented
         to the user when the mandate was issued.
 
+        Legacy mandates with no recorded template path get it persisted once it was
+        found from the journal (see the `backfill_mandat_template_path` command).
+
         :return: the template file relative path as can be used on Django's
         template engine (without `templates` prepended), otherwise `None`
         """
-        return (
-            self.template_path
-            if self.template_path is not None
-            else self._get_mandate_template_path_from_journal_hash()
-        )
+        if self.template_path is None:
+            template_path = self._get_mandate_template_path_from_journal_hash()
+            if template_path is not None and self.pk is not None:
+                Mandat.objects.filter(pk=self.pk).update(template_path=template_path)
+                self.template_path = template_path
+            return template_path
+
+        return self.template_path
 
     def _get_mandate_template_path_from_journal_hash(self) -> Union[None, str]:
         """Legacy mode for `models.Mandat.text()`
@@ -855,34 +975,42 @@ class Mandat(models.Model):
         the template file relative path as can be used on Django's template engine
         (without `templates` prepended`) otherwise
         """
-
-        journal_entries = Journal.find_attestation_creation_entries(self)
-
-        if journal_entries.count() == 0:
-            return None
-
-        template_dir = dirname(
-            loader.get_template(settings.MANDAT_TEMPLATE_PATH).origin.name
+        return find_mandat_template_path(
+            self._get_attestation_candidates(), get_mandat_template_digests()
         )
 
-        demarches = [it.demarche for it in self.autorisations.all()]
+    def _get_attestation_candidates(
+        self, journal_entries: Optional[Collection[Journal]] = None
+    ) -> list:
+        """Returns the `(attestation_data, attestation_hash)` pairs of every journal
+        entry that may record the attestation of this mandate.
 
-        for journal_entry in journal_entries:
-            for _, _, filenames in os_walk(template_dir):
-                for filename in filenames:
-                    file_hash = generate_attestation_hash(
-                        journal_entry.aidant,
-                        self.usager,
-                        demarches,
-                        self.expiration_date,
-                        journal_entry.creation_date.date().isoformat(),
-                        path_join(settings.MANDAT_TEMPLATE_DIR, filename),
-                    )
+        See `utilities.find_mandat_template_path`.
 
-                    if file_hash == journal_entry.attestation_hash:
-                        return path_join(settings.MANDAT_TEMPLATE_DIR, filename)
+        :param journal_entries: the entries returned by
+            `Journal.find_attestation_creation_entries`, when they were loaded for
+            several mandates at once
+        """
+        if journal_entries is None:
+            journal_entries = Journal.find_attestation_creation_entries(
+                self
+            ).select_related("aidant")
+        demarches = [it.demarche for it in self.autorisations.all()]
 
-        return None
+        return [
+            (
+                get_attestation_data(
+                    journal_entry.aidant.id,
+                    journal_entry.aidant.organisation_id,
+                    self.usager.sub,
+                    demarches,
+                    self.expiration_date,
+                    journal_entry.creation_date.date().isoformat(),
+                ),
+                journal_entry.attestation_hash,
+            )
+            for journal_entry in journal_entries
+        ]
 
     def admin_is_active(self):
         return self.is_active
@@ -893,7 +1021,7 @@ class Mandat(models.Model):
     @classmethod
     def get_attestation_or_none(cls, mandate_id):
         try:
-            mandate = Mandat.objects.get(mandate_id)
+            mandate = Mandat.objects.get(pk=mandate_id)
             journal = Journal.find_attestation_creation_entries(mandate)
             # If the journal count is 1, let's use this, otherwise, we don't consider
             # the results to be sufficiently specific to display a hash
@@ -923,42 +1051,259 @@ class Mandat(models.Model):
         ).order_by("organisation", "expiration_date")
 
     @classmethod
-    def transfer_to_organisation(cls, organisation: Organisation, ids: Collection[str]):
-        failed_updates = []
+    def create_with_autorisations(
+        cls,
+        aidant: Aidant,
+        usager: Usager,
+        demarches: Collection[str],
+        duree_keyword: str,
+        is_remote: bool,
+        access_token: str,
+    ) -> Mandat:
+        """Creates a mandate with one autorisation per démarche.
 
-        for mandate_id in ids:
-            try:
-                mandate = Mandat.objects.get(pk=mandate_id)
-                journal = Mandat.get_attestation_or_none(mandate_id)
+        Active autorisations of the usager with the aidant's organisation for the same
+        démarches are revoked. This is done with a constant number of queries,
+        whatever the number of démarches, and in a single transaction.
+        """
+        now = timezone.now()
+        expiration_date = AuthorizationDurations.expiration(duree_keyword, now)
+        duree = AuthorizationDurations.duration(duree_keyword, now)
+
+        with transaction.atomic():
+            mandat = cls.objects.create(
+                organisation=aidant.organisation,
+                usager=usager,
+                duree_keyword=duree_keyword,
+                expiration_date=expiration_date,
+                is_remote=is_remote,
+            )
 
-                with transaction.atomic():
-                    mandate.organisation = organisation
-                    mandate.save()
+            superseded_autorisations = list(
+                Autorisation.objects.active()
+                .filter(
+                    mandat__organisation=aidant.organisation,
+                    mandat__usager=usager,
+                    demarche__in=demarches,
+                )
+                .select_related("mandat__usager")
+                .order_by("pk")
+            )
+            for autorisation in superseded_autorisations:
+                autorisation.revocation_date = now
+            Autorisation.objects.filter(
+                pk__in=[autorisation.pk for autorisation in superseded_autorisations]
+            ).update(revocation_date=now)
+
+            autorisations = Autorisation.objects.bulk_create(
+                Autorisation(
+                    mandat=mandat, demarche=demarche, last_renewal_token=access_token
+                )
+                for demarche in demarches
+            )
 
-                    Journal.log_transfert_mandat(
-                        mandate,
-                        mandate.organisation,
-                        getattr(journal, "attestation_hash", None),
-                    )
-                    if journal is not None:
-                        journal.attestation_hash = generate_attestation_hash(
-                            aidant=journal.aidant,
-                            usager=mandate.usager,
-                            demarches=journal.demarche,
-                            expiration_date=mandate.expiration_date,
-                            creation_date=mandate.expiration_date.date().isoformat(),
-                            mandat_template_path=mandate.get_mandate_template_path(),
-                            organisation_id=organisation.id,
-                        )
-                        journal.save()
+            cls.objects.filter(
+                pk__in={mandat.pk}
+                | {autorisation.mandat_id for autorisation in superseded_autorisations}
+            ).update_autorisation_state()
+            mandat.active_autorisation_count = len(autorisations)
+
+            # Same entries, in the same order, as when autorisations were revoked and
+            # created one by one
+            journal_entries = [
+                Journal.attestation_creation_entry(
+                    aidant=aidant,
+                    usager=usager,
+                    demarches=demarches,
+                    duree=duree,
+                    is_remote_mandat=is_remote,
+                    access_token=access_token,
+                    attestation_hash=generate_attestation_hash(
+                        aidant, usager, demarches, expiration_date
+                    ),
+                    mandat=mandat,
+                )
+            ]
+            for autorisation in autorisations:
+                journal_entries.extend(
+                    Journal.autorisation_cancel_entry(superseded, aidant)
+                    for superseded in superseded_autorisations
+                    if superseded.demarche == autorisation.demarche
+                )
+                journal_entries.append(
+                    Journal.autorisation_creation_entry(autorisation, aidant)
+                )
+            Journal.log_entries(journal_entries)
+
+        return mandat
+
+    @classmethod
+    def transfer_to_organisation(
+        cls,
+        organisation: Organisation,
+        ids: Collection[Union[int, str]],
+        *,
+        batch_size: Optional[int] = None,
+        on_progress: Optional[Callable[[int, Dict[str, str]], None]] = None,
+    ) -> Dict[str, str]:
+        """Moves mandates to `organisation`, `batch_size` mandates per transaction.
+
+        The mandates of a batch, their autorisations and their attestation creation
+        entries are loaded with a constant number of queries, then the mandates are
+        updated and a `TRANSFER_MANDAT` entry is logged for each of them with one
+        query each. Journal entries can't be modified: the attestation hash matching
+        the new organisation is recorded on the transfer entry. Mandates that already
+        belong to `organisation` are left untouched.
+
+        :param on_progress: called after each batch with the number of mandates
+            transferred so far and the failures so far
+        :return: the reason why each mandate that could not be transferred failed,
+            by mandate ID
+        """
+        batch_size = batch_size or settings.MANDATE_TRANSFER_BATCH_SIZE
+        template_digests = get_mandat_template_digests()
+
+        failures = {}
+        pks = []
+        for mandate_id in dict.fromkeys(ids):
+            try:
+                pks.append(int(mandate_id))
+            except (TypeError, ValueError):
+                failures[str(mandate_id)] = "Identifiant de mandat invalide"
+
+        transferred = 0
+        for start in range(0, len(pks), batch_size):
+            batch = pks[start : start + batch_size]
+            try:
+                batch_failures = cls._transfer_batch(
+                    organisation, batch, template_digests
+                )
             except Exception:
-                failed_updates.append(mandate_id)
                 logger.exception(
                     "An error happened while trying to transfer mandates to "
                     "another organisation"
                 )
+                batch_failures = {
+                    str(pk): "Erreur lors de l'enregistrement du transfert"
+                    for pk in batch
+                }
+
+            failures.update(batch_failures)
+            transferred += len(batch) - len(batch_failures)
+            if on_progress is not None:
+                on_progress(transferred, failures)
+
+        return failures
+
+    @classmethod
+    def _transfer_batch(
+        cls,
+        organisation: Organisation,
+        pks: Collection[int],
+        template_digests: Dict[str, str],
+    ) -> Dict[str, str]:
+        mandates = list(
+            cls.objects.filter(pk__in=pks)
+            .select_related("usager", "organisation")
+            .prefetch_related("autorisations")
+            .order_by("pk")
+        )
+        found = {mandate.pk for mandate in mandates}
+        failures = {str(pk): "Mandat introuvable" for pk in pks if pk not in found}
+
+        mandates = [
+            mandate
+            for mandate in mandates
+            if mandate.organisation_id != organisation.pk
+        ]
+        attestations = Journal.find_attestation_creation_entry_by_mandate(mandates)
+
+        transferred, journal_entries = [], []
+        for mandate in mandates:
+            attestation = attestations.get(mandate.pk)
+            try:
+                attestation_hash = (
+                    None
+                    if attestation is None
+                    else mandate._get_transferred_attestation_hash(
+                        attestation, organisation, template_digests
+                    )
+                )
+            except Exception as e:
+                logger.exception(
+                    f"Could not compute the attestation hash of mandate {mandate.pk}"
+                )
+                failures[
+                    str(mandate.pk)
+                ] = f"Impossible de calculer l'empreinte de l'attestation : {e}"
+                continue
+
+            previous_organisation = mandate.organisation
+            mandate.organisation = organisation
+            journal_entries.append(
+                Journal.transfert_mandat_entry(
+                    mandate,
+                    previous_organisation,
+                    getattr(attestation, "attestation_hash", None),
+                    attestation_hash,
+                )
+            )
+            transferred.append(mandate)
+
+        with transaction.atomic():
+            cls.objects.bulk_update(transferred, ["organisation", "template_path"])
+            Journal.log_entries(journal_entries)
+
+        return failures
 
-        return len(failed_updates) != 0, failed_updates
+    def _get_transferred_attestation_hash(
+        self,
+        attestation: Journal,
+        organisation: Organisation,
+        template_digests: Dict[str, str],
+    ) -> Optional[str]:
+        """Returns the hash `attestation` would have if this mandate had been issued
+        by `organisation`, `None` if the template of the mandate can't be found.
+
+        Legacy mandates get their template path set, not saved, when it is found.
+        """
+        demarches = [it.demarche for it in self.autorisations.all()]
+        creation_date = attestation.creation_date.date().isoformat()
+
+        if self.template_path is None:
+            self.template_path = find_mandat_template_path(
+                [
+                    (
+                        get_attestation_data(
+                            attestation.aidant.id,
+                            attestation.aidant.organisation_id,
+                            self.usager.sub,
+                            demarches,
+                            self.expiration_date,
+                            creation_date,
+                        ),
+                        attestation.attestation_hash,
+                    )
+                ],
+                template_digests,
+            )
+            if self.template_path is None:
+                return None
+
+        template_digest = template_digests.get(
+            self.template_path
+        ) or get_mandat_template_digest(self.template_path)
+        return hash_attestation_data(
+            get_attestation_data(
+                attestation.aidant.id,
+                organisation.pk,
+                self.usager.sub,
+                demarches,
+                self.expiration_date,
+                creation_date,
+            ),
+            template_digest,
+        )
 
 
 class AutorisationQuerySet(models.QuerySet):
@@ -1064,21 +1409,82 @@ class Autorisation(models.Model):
             seconds=15
         )
 
+    def save(self, *args, **kwargs):
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            self._update_mandat_autorisation_state()
+
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            result = super().delete(*args, **kwargs)
+            self._update_mandat_autorisation_state()
+        return result
+
+    def _update_mandat_autorisation_state(self):
+        if self.mandat_id is None:
+            return
+
+        Mandat.objects.filter(pk=self.mandat_id).update_autorisation_state()
+        if Autorisation.mandat.is_cached(self):
+            self.mandat.refresh_from_db(
+                fields=["active_autorisation_count", "revoked_at"]
+            )
+
     def revoke(self, aidant: Aidant, revocation_date=None):
         """
         revoke an autorisation and create the corresponding journal entry
         """
         if revocation_date is None:
             revocation_date = timezone.now()
-        self.revocation_date = revocation_date
-        self.save(update_fields=["revocation_date"])
-        Journal.log_autorisation_cancel(self, aidant)
+        with transaction.atomic():
+            self.revocation_date = revocation_date
+            self.save(update_fields=["revocation_date"])
+            Journal.log_autorisation_cancel(self, aidant)
 
 
 class ConnectionQuerySet(models.QuerySet):
     def expired(self):
         return self.filter(expires_on__lt=timezone.now())
 
+    def get_by_code(self, code: str) -> Connection:
+        """Finds the connection an authorization code was issued for.
+
+        :raise Connection.DoesNotExist: when no connection matches the code
+        """
+        return self.__get_by_digest("code", code)
+
+    def get_by_access_token(self, access_token: str) -> Connection:
+        """Finds the connection an access token was issued for.
+
+        :raise Connection.DoesNotExist: when no connection matches the token
+        """
+        return self.__get_by_digest("access_token", access_token)
+
+    def __get_by_digest(self, field: str, token: str) -> Connection:
+        try:
+            return self.get(**{f"{field}_digest": generate_token_digest(token)})
+        except self.model.DoesNotExist:
+            # Connections which were still in flight when digests were introduced
+            # only know the PBKDF2 hash of their token. This costly fallback only
+            # runs until FC_AS_FI_LEGACY_TOKEN_HASHES_UNTIL, the time the last of
+            # them expires.
+            cutoff = settings.FC_AS_FI_LEGACY_TOKEN_HASHES_UNTIL
+            now = timezone.now()
+            if cutoff is None or now > cutoff:
+                raise
+
+            in_flight_legacy = self.filter(
+                **{f"{field}_digest__isnull": True},
+                connection_type="FI",
+                complete=True,
+                expires_on__range=(now, cutoff),
+            )
+            if not in_flight_legacy.exists():
+                raise
+            return in_flight_legacy.get(
+                **{field: make_password(token, settings.FC_AS_FI_HASH_SALT)}
+            )
+
 
 def default_connection_expiration_date():
     now = timezone.now()
@@ -1106,10 +1512,18 @@ class Connection(models.Model):
         on_delete=models.CASCADE,
         related_name="connections",
     )  # FS
-    expires_on = models.DateTimeField(default=default_connection_expiration_date)  # FS
+    expires_on = models.DateTimeField(
+        default=default_connection_expiration_date, db_index=True
+    )  # FS
     access_token = models.TextField(default="No token provided")  # FS
+    access_token_digest = models.CharField(
+        max_length=64, null=True, unique=True, editable=False
+    )  # FI
 
     code = models.TextField()
+    code_digest = models.CharField(
+        max_length=64, null=True, unique=True, editable=False
+    )  # FI
     demarche = models.TextField(default="No demarche provided")
     aidant = models.ForeignKey(
         Aidant,
@@ -1163,6 +1577,10 @@ class JournalQuerySet(models.QuerySet):
         return self.exclude(aidant__organisation__name=settings.STAFF_ORGANISATION_NAME)
 
 
+# Entries logged inside `Journal.batch()`, not yet written
+_journal_batch: ContextVar[Optional[list]] = ContextVar("journal_batch", default=None)
+
+
 class Journal(models.Model):
     INFO_REMOTE_MANDAT = "Mandat conclu à distance pendant l'état d'urgence sanitaire (23 mars 2020)"  # noqa
 
@@ -1202,6 +1620,22 @@ class Journal(models.Model):
     class Meta:
         verbose_name = "entrée de journal"
         verbose_name_plural = "entrées de journal"
+        # The table is partitioned by month on `creation_date`, see
+        # `aidants_connect_web/journal_partitions.py`
+        indexes = [
+            models.Index(
+                fields=["action", "aidant", "creation_date"],
+                name="journal_action_aidant_idx",
+            ),
+            models.Index(fields=["action", "mandat"], name="journal_action_mandat_idx"),
+            models.Index(
+                fields=["action", "usager", "creation_date"],
+                name="journal_action_usager_idx",
+            ),
+            models.Index(
+                fields=["aidant", "creation_date"], name="journal_aidant_date_idx"
+            ),
+        ]
 
     def __str__(self):
         return f"Entrée #{self.id} : {self.action} - {self.aidant}"
@@ -1209,11 +1643,76 @@ class Journal(models.Model):
     def save(self, *args, **kwargs):
         if self.id:
             raise NotImplementedError("Editing is not allowed on journal entries")
+
+        batch = _journal_batch.get()
+        if batch is not None:
+            batch.append(self)
+            return
+
         super(Journal, self).save(*args, **kwargs)
+        Journal.record_last_actions([self])
+        AidantStats.record_entries([self])
 
     def delete(self, *args, **kwargs):
         raise NotImplementedError("Deleting is not allowed on journal entries")
 
+    @classmethod
+    @contextmanager
+    def batch(cls):
+        """Collects the entries logged inside the block, with the `log_*` methods or
+        `save()`, and inserts them with a single query when the block exits.
+
+        The block runs in a transaction: the entries are written if and only if the
+        writes made inside the block are committed. Until then, logged entries have
+        no id and queries on the journal don't return them. Nested blocks join the
+        outermost one.
+        """
+        if _journal_batch.get() is not None:
+            yield
+            return
+
+        with transaction.atomic():
+            entries = []
+            token = _journal_batch.set(entries)
+            try:
+                yield
+            finally:
+                _journal_batch.reset(token)
+
+            if entries:
+                cls.log_entries(entries)
+
+    @classmethod
+    def log_entries(cls, entries: Collection[Journal]) -> list[Journal]:
+        """Inserts unsaved entries, as built by the `*_entry` methods, in a single
+        query. Entries are written in the given order."""
+        entries = cls.objects.bulk_create(entries)
+        cls.record_last_actions(entries)
+        AidantStats.record_entries(entries)
+        return entries
+
+    @classmethod
+    def record_last_actions(cls, entries: Collection[Journal]):
+        """Reports the creation date of newly written entries on
+        `Aidant.last_action_date` so that `activity_required` does not need to
+        search the journal for the last action of an aidant.
+        """
+        last_actions = {}
+        for entry in entries:
+            if entry.aidant_id is None:
+                continue
+            last_action = last_actions.get(entry.aidant_id)
+            if last_action is None or last_action < entry.creation_date:
+                last_actions[entry.aidant_id] = entry.creation_date
+
+            # Keep the instance used by the caller (often `request.user`) in sync
+            # so that a later `aidant.save()` does not write back a stale value
+            if cls.aidant.is_cached(entry):
+                entry.aidant.last_action_date = last_actions[entry.aidant_id]
+
+        for aidant_id, last_action in last_actions.items():
+            Aidant.objects.filter(pk=aidant_id).update(last_action_date=last_action)
+
     @classmethod
     def log_connection(cls, aidant: Aidant):
         return cls.objects.create(
@@ -1322,7 +1821,32 @@ class Journal(models.Model):
         attestation_hash: str,
         mandat: Mandat,
     ):
-        return cls.objects.create(
+        entry = cls.attestation_creation_entry(
+            aidant=aidant,
+            usager=usager,
+            demarches=demarches,
+            duree=duree,
+            is_remote_mandat=is_remote_mandat,
+            access_token=access_token,
+            attestation_hash=attestation_hash,
+            mandat=mandat,
+        )
+        entry.save()
+        return entry
+
+    @classmethod
+    def attestation_creation_entry(
+        cls,
+        aidant: Aidant,
+        usager: Usager,
+        demarches: list,
+        duree: int,
+        is_remote_mandat: bool,
+        access_token: str,
+        attestation_hash: str,
+        mandat: Mandat,
+    ) -> Journal:
+        return cls(
             aidant=aidant,
             organisation=aidant.organisation,
             usager=usager,
@@ -1337,10 +1861,18 @@ class Journal(models.Model):
 
     @classmethod
     def log_autorisation_creation(cls, autorisation: Autorisation, aidant: Aidant):
+        entry = cls.autorisation_creation_entry(autorisation, aidant)
+        entry.save()
+        return entry
+
+    @classmethod
+    def autorisation_creation_entry(
+        cls, autorisation: Autorisation, aidant: Aidant
+    ) -> Journal:
         mandat = autorisation.mandat
         usager = mandat.usager
 
-        return cls.objects.create(
+        return cls(
             aidant=aidant,
             organisation=aidant.organisation,
             usager=usager,
@@ -1372,7 +1904,15 @@ class Journal(models.Model):
 
     @classmethod
     def log_autorisation_cancel(cls, autorisation: Autorisation, aidant: Aidant):
-        return cls.objects.create(
+        entry = cls.autorisation_cancel_entry(autorisation, aidant)
+        entry.save()
+        return entry
+
+    @classmethod
+    def autorisation_cancel_entry(
+        cls, autorisation: Autorisation, aidant: Aidant
+    ) -> Journal:
+        return cls(
             aidant=aidant,
             organisation=aidant.organisation,
             usager=autorisation.mandat.usager,
@@ -1408,11 +1948,27 @@ class Journal(models.Model):
         mandat: Mandat,
         previous_organisation: Organisation,
         previous_hash: Optional[str],
+        attestation_hash: Optional[str] = None,
     ):
-        return cls.objects.create(
+        entry = cls.transfert_mandat_entry(
+            mandat, previous_organisation, previous_hash, attestation_hash
+        )
+        entry.save()
+        return entry
+
+    @classmethod
+    def transfert_mandat_entry(
+        cls,
+        mandat: Mandat,
+        previous_organisation: Organisation,
+        previous_hash: Optional[str],
+        attestation_hash: Optional[str] = None,
+    ) -> Journal:
+        return cls(
             mandat=mandat,
             organisation=mandat.organisation,
             action=JournalActionKeywords.TRANSFER_MANDAT,
+            attestation_hash=attestation_hash,
             additional_information=(
                 f"previous_organisation = {previous_organisation.pk}, "
                 f"previous_hash = {previous_hash}"
@@ -1440,6 +1996,61 @@ class Journal(models.Model):
             creation_date__range=(start, end),
         )
 
+    @classmethod
+    def find_attestation_creation_entries_by_mandate(
+        cls, mandats: Collection[Mandat]
+    ) -> Dict[int, list[Journal]]:
+        """Bulk version of `find_attestation_creation_entries`, with at most two
+        queries: maps the ID of each mandate to the entries found for it."""
+        entries_by_mandat = defaultdict(list)
+        for entry in cls.objects.filter(
+            action=JournalActionKeywords.CREATE_ATTESTATION, mandat__in=mandats
+        ).select_related("aidant"):
+            entries_by_mandat[entry.mandat_id].append(entry)
+
+        legacy_mandats = [
+            mandat for mandat in mandats if len(entries_by_mandat[mandat.pk]) != 1
+        ]
+        if legacy_mandats:
+            margin = timedelta(hours=24)
+            candidates = list(
+                cls.objects.filter(
+                    action=JournalActionKeywords.CREATE_ATTESTATION,
+                    usager__in={mandat.usager_id for mandat in legacy_mandats},
+                    aidant__organisation__in={
+                        mandat.organisation_id for mandat in legacy_mandats
+                    },
+                    creation_date__range=(
+                        min(mandat.creation_date for mandat in legacy_mandats) - margin,
+                        max(mandat.creation_date for mandat in legacy_mandats) + margin,
+                    ),
+                ).select_related("aidant")
+            )
+            for mandat in legacy_mandats:
+                entries_by_mandat[mandat.pk] = [
+                    entry
+                    for entry in candidates
+                    if entry.usager_id == mandat.usager_id
+                    and entry.aidant.organisation_id == mandat.organisation_id
+                    and abs(entry.creation_date - mandat.creation_date) <= margin
+                ]
+
+        return {mandat.pk: entries_by_mandat[mandat.pk] for mandat in mandats}
+
+    @classmethod
+    def find_attestation_creation_entry_by_mandate(
+        cls, mandats: Collection[Mandat]
+    ) -> Dict[int, Journal]:
+        """Maps the ID of each mandate to its attestation creation entry when
+        exactly one entry was found, see `find_attestation_creation_entries`"""
+        return {
+            mandat_id: entries[0]
+            for mandat_id, entries in cls.find_attestation_creation_entries_by_mandate(
+                mandats
+            ).items()
+            if len(entries) == 1
+        }
+
     @classmethod
     def log_switch_organisation(cls, aidant: Aidant, previous: Organisation):
         more_info = (
@@ -1454,6 +2065,136 @@ class Journal(models.Model):
         )
 
 
+class AidantStats(models.Model):
+    """Figures about the activity of an aidant, derived from the journal.
+
+    They are updated as journal entries are written so that the admin does not
+    have to search the journal. `rebuild` recomputes them from the journal entries
+    still in the database.
+    """
+
+    aidant = models.OneToOneField(
+        Aidant, on_delete=models.CASCADE, primary_key=True, related_name="stats"
+    )
+    mandats_created_count = models.PositiveIntegerField(
+        "Nombre de mandats créés", default=0
+    )
+    autorisation_use_count = models.PositiveIntegerField(
+        "Nombre d'utilisations d'autorisations", default=0
+    )
+    last_connection_date = models.DateTimeField("Date de dernière connexion", null=True)
+    last_mandat_date = models.DateTimeField("Date du dernier mandat créé", null=True)
+
+    TRACKED_ACTIONS = (
+        JournalActionKeywords.CONNECT_AIDANT,
+        JournalActionKeywords.CREATE_ATTESTATION,
+        JournalActionKeywords.USE_AUTORISATION,
+    )
+
+    class Meta:
+        verbose_name = "statistiques d'un aidant"
+        verbose_name_plural = "statistiques des aidants"
+
+    def __str__(self):
+        return f"Statistiques de {self.aidant}"
+
+    @classmethod
+    def record_entries(cls, entries: Collection[Journal]):
+        """Adds newly written journal entries to the figures of their aidants."""
+        changes = {}
+        for entry in entries:
+            if entry.aidant_id is None or entry.action not in cls.TRACKED_ACTIONS:
+                continue
+
+            change = changes.setdefault(
+                entry.aidant_id,
+                {
+                    "mandats_created_count": 0,
+                    "autorisation_use_count": 0,
+                    "last_connection_date": None,
+                    "last_mandat_date": None,
+                },
+            )
+            if entry.action == JournalActionKeywords.CONNECT_AIDANT:
+                change["last_connection_date"] = max(
+                    filter(None, (change["last_connection_date"], entry.creation_date))
+                )
+            elif entry.action == JournalActionKeywords.CREATE_ATTESTATION:
+                change["mandats_created_count"] += 1
+                change["last_mandat_date"] = max(
+                    filter(None, (change["last_mandat_date"], entry.creation_date))
+                )
+            else:
+                change["autorisation_use_count"] += 1
+
+        if not changes:
+            return
+
+        # A single upsert for all aidants, whether they already have figures or not
+        table = cls._meta.db_table
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"INSERT INTO {table} AS stats (aidant_id, mandats_created_count, "
+                f"autorisation_use_count, last_connection_date, last_mandat_date) "
+                f"VALUES {', '.join(['(%s, %s, %s, %s, %s)'] * len(changes))} "
+                f"ON CONFLICT (aidant_id) DO UPDATE SET "
+                f"mandats_created_count = "
+                f"stats.mandats_created_count + EXCLUDED.mandats_created_count, "
+                f"autorisation_use_count = "
+                f"stats.autorisation_use_count + EXCLUDED.autorisation_use_count, "
+                # GREATEST ignores NULL values
+                f"last_connection_date = "
+                f"GREATEST(stats.last_connection_date, EXCLUDED.last_connection_date), "
+                f"last_mandat_date = "
+                f"GREATEST(stats.last_mandat_date, EXCLUDED.last_mandat_date)",
+                [
+                    value
+                    for aidant_id, change in changes.items()
+                    for value in (
+                        aidant_id,
+                        change["mandats_created_count"],
+                        change["autorisation_use_count"],
+                        change["last_connection_date"],
+                        change["last_mandat_date"],
+                    )
+                ],
+            )
+
+    @classmethod
+    def rebuild(cls, batch_size=1000) -> int:
+        """Recomputes the figures of every aidant from the journal.
+
+        Entries removed from the database by `archive_journal_partitions` are not
+        accounted for anymore.
+
+        :return: the number of aidants with figures
+        """
+        is_connection = Q(action=JournalActionKeywords.CONNECT_AIDANT)
+        is_attestation = Q(action=JournalActionKeywords.CREATE_ATTESTATION)
+        rows = (
+            Journal.objects.filter(aidant__isnull=False, action__in=cls.TRACKED_ACTIONS)
+            .order_by()
+            .values("aidant")
+            .annotate(
+                mandats_created_count=models.Count("pk", filter=is_attestation),
+                autorisation_use_count=models.Count(
+                    "pk", filter=Q(action=JournalActionKeywords.USE_AUTORISATION)
+                ),
+                last_connection_date=models.Max("creation_date", filter=is_connection),
+                last_mandat_date=models.Max("creation_date", filter=is_attestation),
+            )
+        )
+
+        with transaction.atomic():
+            cls.objects.all().delete()
+            stats = cls.objects.bulk_create(
+                (cls(aidant_id=row.pop("aidant"), **row) for row in rows.iterator()),
+                batch_size=batch_size,
+            )
+
+        return len(stats)
+
+
 class CarteTOTP(models.Model):
     serial_number = models.CharField(max_length=100, unique=True)
     seed = models.CharField(max_length=40)
@@ -1483,3 +2224,226 @@ class CarteTOTP(models.Model):
 class IdGenerator(models.Model):
     code = models.CharField(max_length=100, unique=True)
     last_id = models.PositiveIntegerField()
+
+
+class StatisticsSnapshot(models.Model):
+    """Figures displayed on the public statistics page.
+
+    Computing them scans the whole `Mandat` and `Journal` tables: they are refreshed
+    periodically by the `refresh_statistics_snapshot` task instead of on each hit.
+    """
+
+    creation_date = models.DateTimeField("Date de création", auto_now_add=True)
+
+    organisations_accredited_count = models.PositiveIntegerField(default=0)
+    organisations_not_accredited_count = models.PositiveIntegerField(default=0)
+    aidants_count = models.PositiveIntegerField(default=0)
+    aidants_accrediting_count = models.PositiveIntegerField(default=0)
+    mandats_count = models.PositiveIntegerField(default=0)
+    active_mandats_count = models.PositiveIntegerField(default=0)
+    usagers_with_mandat_count = models.PositiveIntegerField(default=0)
+    usagers_with_active_mandat_count = models.PositiveIntegerField(default=0)
+    autorisation_use_count = models.PositiveIntegerField(default=0)
+    autorisation_use_recent_count = models.PositiveIntegerField(default=0)
+    usagers_helped_count = models.PositiveIntegerField(default=0)
+    usagers_helped_recent_count = models.PositiveIntegerField(default=0)
+    # Number of autorisation uses, by démarche
+    demarches_count = models.JSONField(default=dict)
+
+    class Meta:
+        get_latest_by = "creation_date"
+        verbose_name = "instantané des statistiques"
+        verbose_name_plural = "instantanés des statistiques"
+
+    @classmethod
+    def take(cls) -> StatisticsSnapshot:
+        """Computes the statistics and replaces the previous snapshot."""
+        last_30_days = timezone.now() - timedelta(days=30)
+        stafforg = settings.STAFF_ORGANISATION_NAME
+
+        figures = {
+            "organisations_accredited_count": (
+                Organisation.objects.accredited().exclude(name=stafforg).count()
+            ),
+            "organisations_not_accredited_count": (
+                Organisation.objects.not_yet_accredited().exclude(name=stafforg).count()
+            ),
+        }
+
+        figures.update(
+            Aidant.objects.exclude(organisation__name=stafforg)
+            .filter(is_active=True, can_create_mandats=True)
+            .aggregate(
+                aidants_count=models.Count("pk", filter=Q(carte_totp__isnull=False)),
+                aidants_accrediting_count=models.Count(
+                    "pk", filter=Q(carte_totp__isnull=True)
+                ),
+            )
+        )
+
+        active_mandat = Q(expiration_date__gte=timezone.now(), revoked_at__isnull=True)
+        figures.update(
+            Mandat.objects.exclude(organisation__name=stafforg).aggregate(
+                mandats_count=models.Count("pk"),
+                active_mandats_count=models.Count("pk", filter=active_mandat),
+                usagers_with_mandat_count=models.Count("usager", distinct=True),
+                usagers_with_active_mandat_count=models.Count(
+                    "usager", distinct=True, filter=active_mandat
+                ),
+            )
+        )
+
+        autorisation_use = (
+            Journal.objects.excluding_staff()
+            .filter(action=JournalActionKeywords.USE_AUTORISATION)
+            .order_by()
+        )
+        recent_use = Q(creation_date__gte=last_30_days)
+        figures.update(
+            autorisation_use.aggregate(
+                autorisation_use_count=models.Count("pk"),
+                autorisation_use_recent_count=models.Count("pk", filter=recent_use),
+                usagers_helped_count=models.Count("usager", distinct=True),
+                usagers_helped_recent_count=models.Count(
+                    "usager", distinct=True, filter=recent_use
+                ),
+            )
+        )
+        figures["demarches_count"] = dict(
+            autorisation_use.values_list("demarche").annotate(models.Count("pk"))
+        )
+
+        with transaction.atomic():
+            snapshot = cls.objects.create(**figures)
+            cls.objects.exclude(pk=snapshot.pk).delete()
+
+        return snapshot
+
+
+class OutgoingEmailQuerySet(models.QuerySet):
+    def due(self):
+        return self.filter(
+            status=OutgoingEmail.Status.PENDING, next_attempt_at__lte=timezone.now()
+        )
+
+
+class OutgoingEmail(models.Model):
+    """An email waiting to be sent by the `send_queued_emails` task.
+
+    Emails are queued with `aidants_connect_web.mail.queue_mail` in the transaction
+    of the change they notify, so that they are sent if and only if it is committed
+    and the request never waits for the SMTP server.
+    """
+
+    class Status(models.TextChoices):
+        PENDING = "pending", "En attente"
+        SENT = "sent", "Envoyé"
+        FAILED = "failed", "Échec"
+
+    from_email = models.CharField("Expéditeur", max_length=254)
+    recipients = ArrayField(
+        models.CharField(max_length=254), verbose_name="Destinataires"
+    )
+    subject = models.TextField("Objet")
+    body = models.TextField("Message")
+    html_body = models.TextField("Message HTML", blank=True, default="")
+
+    status = models.CharField(
+        "État", max_length=10, choices=Status.choices, default=Status.PENDING
+    )
+    creation_date = models.DateTimeField("Date de création", auto_now_add=True)
+    next_attempt_at = models.DateTimeField("Prochaine tentative", default=timezone.now)
+    attempts = models.PositiveSmallIntegerField("Tentatives", default=0)
+    last_error = models.TextField("Dernière erreur", blank=True, default="")
+    sent_at = models.DateTimeField("Date d'envoi", null=True, blank=True)
+
+    objects = OutgoingEmailQuerySet.as_manager()
+
+    class Meta:
+        indexes = (
+            models.Index(
+                fields=("next_attempt_at",),
+                condition=Q(status="pending"),
+                name="outgoing_email_pending_idx",
+            ),
+        )
+        verbose_name = "email en attente"
+        verbose_name_plural = "emails en attente"
+
+    def __str__(self):
+        return f"{self.subject} ({', '.join(self.recipients)})"
+
+    def as_message(self, connection=None) -> EmailMultiAlternatives:
+        message = EmailMultiAlternatives(
+            subject=self.subject,
+            body=self.body,
+            from_email=self.from_email,
+            to=self.recipients,
+            connection=connection,
+        )
+        if self.html_body:
+            message.attach_alternative(self.html_body, "text/html")
+        return message
+
+
+class MandatTransfer(models.Model):
+    """A transfer of mandates to another organisation requested in the admin.
+
+    It is run by the `transfer_mandates` task, which reports its progress and the
+    mandates that could not be transferred on this model.
+    """
+
+    class Status(models.TextChoices):
+        PENDING = "pending", "En attente"
+        RUNNING = "running", "En cours"
+        DONE = "done", "Terminé"
+        FAILED = "failed", "Échec"
+
+    organisation = models.ForeignKey(
+        Organisation,
+        on_delete=models.CASCADE,
+        related_name="+",
+        verbose_name="Organisation de destination",
+    )
+    requested_by = models.ForeignKey(
+        Aidant,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="+",
+        verbose_name="Demandé par",
+    )
+    mandat_ids = ArrayField(models.PositiveIntegerField(), verbose_name="Mandats")
+
+    status = models.CharField(
+        "État", max_length=10, choices=Status.choices, default=Status.PENDING
+    )
+    transferred_count = models.PositiveIntegerField("Mandats transférés", default=0)
+    # Reason of each failure, by mandate ID
+    failures = models.JSONField("Échecs", default=dict)
+    creation_date = models.DateTimeField("Date de création", auto_now_add=True)
+    end_date = models.DateTimeField("Date de fin", null=True, blank=True)
+
+    class Meta:
+        verbose_name = "transfert de mandats"
+        verbose_name_plural = "transferts de mandats"
+
+    def __str__(self):
+        return f"Transfert de {self.total} mandats vers {self.organisation}"
+
+    @property
+    def total(self) -> int:
+        return len(self.mandat_ids)
+
+    @property
+    def processed_count(self) -> int:
+        return self.transferred_count + len(self.failures)
+
+    @property
+    def progress(self) -> int:
+        """Percentage of the mandates that were processed"""
+        return 100 * self.processed_count // self.total if self.total else 100
+
+    @property
+    def is_finished(self) -> bool:
+        return self.status in (self.Status.DONE, self.Status.FAILED)
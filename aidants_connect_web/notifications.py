@@ -0,0 +1,177 @@
+"""
+Bulk sending of the periodic notification emails.
+
+The periodic tasks gather their recipients and data with a few grouped queries and
+describe each email with a `Notification`. `dispatch_notifications` renders them,
+in worker processes if asked, and sends them by batches through a single connection
+to the mail server instead of opening one SMTP session per email.
+"""
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from itertools import islice, repeat
+from logging import Logger
+from time import monotonic
+from typing import Callable, Iterable, List, Optional, Tuple
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.template import loader
+from django.template.defaultfilters import pluralize
+
+DRY_RUN_EMAIL_BACKEND = "django.core.mail.backends.locmem.EmailBackend"
+
+
+@dataclass
+class Notification:
+    recipients: List[str]
+    context: dict = field(default_factory=dict)
+
+
+@dataclass
+class DispatchReport:
+    sent: int = 0
+    batches: int = 0
+    render_seconds: float = 0.0
+    send_seconds: float = 0.0
+
+    @property
+    def messages_per_second(self) -> float:
+        return self.sent / max(self.render_seconds + self.send_seconds, 0.001)
+
+    def __str__(self):
+        return (
+            f"{self.sent} email{pluralize(self.sent)} sent in {self.batches} "
+            f"batch{pluralize(self.batches, 'es')} "
+            f"(rendering: {self.render_seconds:.2f}s, "
+            f"sending: {self.send_seconds:.2f}s, "
+            f"{self.messages_per_second:.1f} emails/s)"
+        )
+
+
+def render_notification(template_name: str, context: dict) -> Tuple[str, str]:
+    """Renders the text and HTML bodies of a notification.
+
+    Runs in worker processes: the context must hold everything the templates
+    display, they must not query the database.
+    """
+    return (
+        loader.render_to_string(f"{template_name}.txt", context),
+        loader.render_to_string(f"{template_name}.html", context),
+    )
+
+
+def dispatch_notifications(
+    notifications: Iterable[Notification],
+    *,
+    template_name: str,
+    subject: str,
+    from_email: str,
+    batch_size: Optional[int] = None,
+    workers: Optional[int] = None,
+    dry_run: bool = False,
+    on_sent: Optional[Callable[[List[Notification]], None]] = None,
+    logger: Logger,
+) -> DispatchReport:
+    """Renders `template_name`.txt and `template_name`.html for each notification and
+    sends the emails `batch_size` at a time through one connection.
+
+    :param workers: number of processes rendering the emails, they are rendered in
+        this process if 1 or less
+    :param dry_run: send the emails to the in-memory backend instead of the
+        configured one, to measure the throughput of rendering and sending
+    :param on_sent: called with each batch of notifications once it is sent, so
+        that a run interrupted by an error can be resumed; never called on dry runs
+    """
+    batch_size = batch_size or settings.NOTIFICATIONS_BATCH_SIZE
+    if workers is None:
+        workers = settings.NOTIFICATIONS_RENDER_WORKERS
+
+    mail_connection = get_connection(
+        DRY_RUN_EMAIL_BACKEND if dry_run else None, fail_silently=False
+    )
+    if dry_run:
+        on_sent = None
+
+    # Daemonic processes, like Celery's or the test runner's workers, can't have
+    # children
+    if workers > 1 and not multiprocessing.current_process().daemon:
+        # Workers only render templates: they never touch the database connection
+        # inherited from this process
+        with ProcessPoolExecutor(
+            max_workers=workers, mp_context=multiprocessing.get_context("fork")
+        ) as executor:
+            return _dispatch(
+                executor.map,
+                mail_connection,
+                notifications,
+                template_name,
+                subject,
+                from_email,
+                batch_size,
+                on_sent,
+                logger,
+            )
+
+    return _dispatch(
+        map,
+        mail_connection,
+        notifications,
+        template_name,
+        subject,
+        from_email,
+        batch_size,
+        on_sent,
+        logger,
+    )
+
+
+def _dispatch(
+    map_func,
+    mail_connection,
+    notifications: Iterable[Notification],
+    template_name: str,
+    subject: str,
+    from_email: str,
+    batch_size: int,
+    on_sent: Optional[Callable[[List[Notification]], None]],
+    logger: Logger,
+) -> DispatchReport:
+    report = DispatchReport()
+    notifications = iter(notifications)
+
+    with mail_connection:
+        while True:
+            batch = list(islice(notifications, batch_size))
+            if not batch:
+                break
+
+            start = monotonic()
+            bodies = map_func(
+                render_notification,
+                repeat(template_name),
+                [notification.context for notification in batch],
+            )
+            messages = []
+            for notification, (text_message, html_message) in zip(batch, bodies):
+                message = EmailMultiAlternatives(
+                    subject=subject,
+                    body=text_message,
+                    from_email=from_email,
+                    to=notification.recipients,
+                    connection=mail_connection,
+                )
+                message.attach_alternative(html_message, "text/html")
+                messages.append(message)
+            report.render_seconds += monotonic() - start
+
+            start = monotonic()
+            report.sent += mail_connection.send_messages(messages) or 0
+            report.send_seconds += monotonic() - start
+            report.batches += 1
+            if on_sent is not None:
+                on_sent(batch)
+
+            logger.info(f"{template_name}: {report}")
+
+    return report
@@ -0,0 +1,115 @@
+"""
+Rendering of attestation QR codes.
+
+An attestation hash never changes once written, so the image of a given hash only
+has to be rendered once. Rendered images are kept in a bounded in-process LRU and,
+when ``settings.QRCODE_CACHE`` names one, in a cache shared between processes.
+"""
+import io
+import logging
+from functools import lru_cache
+from typing import Optional
+
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.core.cache import caches
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+
+from PIL import Image
+
+from aidants_connect_web.utilities import (
+    generate_qrcode_png,
+    generate_qrcode_svg,
+    generate_sha256_hash,
+)
+
+logger = logging.getLogger()
+
+PNG = "png"
+SVG = "svg"
+
+CONTENT_TYPES = {PNG: "image/png", SVG: "image/svg+xml"}
+RENDERERS = {PNG: generate_qrcode_png, SVG: generate_qrcode_svg}
+
+EMPTY_QRCODE_PATH = "images/empty_qr_code.png"
+
+SHARED_CACHE_TIMEOUT = 30 * 24 * 60 * 60
+
+# Hash-keyed URLs always serve the same bytes
+IMMUTABLE_CACHE_CONTROL = "private, max-age=31536000, immutable"
+# Session-keyed URLs may serve another image on the next request
+REVALIDATE_CACHE_CONTROL = "private, no-cache"
+
+
+def _shared_cache():
+    return caches[settings.QRCODE_CACHE] if settings.QRCODE_CACHE else None
+
+
+@lru_cache(maxsize=settings.QRCODE_LOCAL_CACHE_SIZE)
+def get_qrcode(value: str, image_format: str = PNG) -> bytes:
+    shared_cache = _shared_cache()
+    key = f"{image_format}:{value}"
+
+    if shared_cache is not None:
+        image = shared_cache.get(key)
+        if image is not None:
+            return image
+
+    image = RENDERERS[image_format](value)
+    if shared_cache is not None:
+        shared_cache.set(key, image, timeout=SHARED_CACHE_TIMEOUT)
+
+    return image
+
+
+@lru_cache(maxsize=None)
+def get_empty_qrcode() -> bytes:
+    """Returns the placeholder displayed when there is no attestation hash.
+
+    Read once per process, see `AidantConnectWebConfig.ready`. A blank image is
+    served if the static file can't be found.
+    """
+    path = finders.find(EMPTY_QRCODE_PATH)
+    if path is not None:
+        with open(path, "rb") as f:
+            return f.read()
+
+    logger.error(
+        f"Static file {EMPTY_QRCODE_PATH} not found: a blank image is used "
+        f"as the empty QR code"
+    )
+    stream = io.BytesIO()
+    Image.new("1", (290, 290), 1).save(stream, "PNG")
+    return stream.getvalue()
+
+
+def qrcode_response(
+    request, value: Optional[str], image_format: str = PNG, immutable: bool = False
+) -> HttpResponse:
+    """Serves the QR code of `value`, or the placeholder if it is `None`.
+
+    Responses carry a strong ETag so that a browser holding the image gets a
+    `304 Not Modified` instead.
+
+    :param immutable: whether the URL of the request only ever serves this image
+    """
+    if value is None:
+        image_format, image = PNG, get_empty_qrcode()
+        etag = f'"{generate_sha256_hash(image)}"'
+    else:
+        image = None
+        etag = f'"{generate_sha256_hash(f"{image_format}:{value}".encode())}"'
+
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = HttpResponse(
+            image if image is not None else get_qrcode(value, image_format),
+            CONTENT_TYPES[image_format],
+        )
+
+    response["ETag"] = etag
+    response["Cache-Control"] = (
+        IMMUTABLE_CACHE_CONTROL if immutable else REVALIDATE_CACHE_CONTROL
+    )
+    return response
@@ -1,7 +1,6 @@
 from django.apps import AppConfig
 from django.conf import settings
 from django.contrib.auth.signals import user_logged_in
-from django.core.mail import send_mail
 from django.db import connection
 from django.db.models.signals import post_migrate
 from django.dispatch import receiver
@@ -10,6 +9,7 @@ from django.template import loader
 from django_otp.plugins.otp_totp.models import TOTPDevice
 
 from aidants_connect_common.utils.constants import RequestOriginConstants
+from aidants_connect_web.mail import queue_mail
 from aidants_connect_web.models import Aidant, Journal, aidants__organisations_changed
 
 
@@ -40,7 +40,7 @@ def send_mail_aidant__organisations_changed(instance: Aidant, diff: dict, **_):
         "signals/aidant__organisations_changed.html", context
     )
 
-    send_mail(
+    queue_mail(
         from_email=settings.AIDANTS__ORGANISATIONS_CHANGED_EMAIL_FROM,
         recipient_list=[instance.email],
         subject=settings.AIDANTS__ORGANISATIONS_CHANGED_EMAIL_SUBJECT,
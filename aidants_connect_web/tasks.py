@@ -1,10 +1,15 @@
 from collections import defaultdict
+from dataclasses import asdict
 from datetime import timedelta
 from logging import Logger
+from time import monotonic
 from typing import List
 
-from django.core.mail import send_mail
-from django.db.models import Count, Q
+from django.conf import settings
+from django.core.mail import get_connection, send_mail
+from django.db import connection, transaction
+from django.db.models import Count, Exists, OuterRef, Q, Subquery
+from django.db.models.expressions import RawSQL
 from django.template import loader
 from django.template.defaultfilters import pluralize
 from django.urls import reverse
@@ -14,103 +19,270 @@ from celery import shared_task
 from celery.utils.log import get_task_logger
 from django_otp.plugins.otp_static.models import StaticDevice, StaticToken
 
-from aidants_connect import settings
 from aidants_connect_common.models import Department
+from aidants_connect_common.utils.maintenance import delete_in_batches
+from aidants_connect_web.journal_partitions import (
+    add_months,
+    create_journal_partition,
+    month_start,
+    partition_name,
+)
 from aidants_connect_web.models import (
     Aidant,
+    AidantStats,
     Connection,
     HabilitationRequest,
     Mandat,
+    MandatTransfer,
     Organisation,
+    OutgoingEmail,
+    StatisticsSnapshot,
 )
+from aidants_connect_web.notifications import Notification, dispatch_notifications
 
 
 @shared_task
-def delete_expired_connections(*, logger=None):
+def delete_expired_connections(*, batch_size=None, time_budget=None, logger=None):
+    """Deletes expired connections, `batch_size` primary keys per statement.
+
+    Every batch is committed on its own so that rows are never locked for long. The
+    task stops once `time_budget` seconds have elapsed: it can be interrupted at any
+    time and the next run picks up the connections left.
+    """
     logger: Logger = logger or get_task_logger(__name__)
+    if time_budget is None:
+        time_budget = settings.EXPIRED_CONNECTIONS_PURGE_TIME_BUDGET
 
     logger.info("Deleting expired connections...")
+    report = delete_in_batches(
+        Connection.objects.expired(),
+        name="expired connections",
+        batch_size=batch_size or settings.EXPIRED_CONNECTIONS_PURGE_BATCH_SIZE,
+        time_budget=time_budget,
+        logger=logger,
+    )
 
-    expired_connections = Connection.objects.expired()
-    deleted_connections_count, _ = expired_connections.delete()
-
-    if deleted_connections_count > 0:
+    if not report.complete:
         logger.info(
-            f"Successfully deleted {deleted_connections_count} "
-            f"connection{pluralize(deleted_connections_count)}!"
+            f"Stopping after {report.seconds:.1f}s, the remaining expired "
+            "connections will be deleted on next run."
         )
-    else:
-        logger.info("No connection to delete.")
+    logger.info(str(report))
 
-    return deleted_connections_count
+    # Task results are serialized to JSON
+    return asdict(report)
 
 
 @shared_task
-def delete_duplicated_static_tokens(*, logger=None):
+def send_queued_emails(*, batch_size=None, time_budget=None, logger=None):
+    """Sends the due emails of the outbox through a single connection to the mail
+    server.
+
+    Emails are locked `batch_size` at a time with ``SKIP LOCKED``, so concurrent
+    runs share the work. A failed email is retried later with an exponential backoff
+    until it reached ``settings.EMAIL_OUTBOX_MAX_ATTEMPTS`` attempts. The task stops
+    once `time_budget` seconds have elapsed, the next run sends the emails left.
+    """
     logger: Logger = logger or get_task_logger(__name__)
+    batch_size = batch_size or settings.EMAIL_OUTBOX_BATCH_SIZE
+    if time_budget is None:
+        time_budget = settings.EMAIL_OUTBOX_TIME_BUDGET
+
+    sent_count = failed_count = 0
+    start = monotonic()
+    with get_connection(fail_silently=False) as mail_connection:
+        while True:
+            with transaction.atomic():
+                batch = list(
+                    OutgoingEmail.objects.due()
+                    .order_by("next_attempt_at", "pk")
+                    .select_for_update(skip_locked=True)[:batch_size]
+                )
+                for email in batch:
+                    if _send_queued_email(email, mail_connection, logger):
+                        sent_count += 1
+                    else:
+                        failed_count += 1
+                OutgoingEmail.objects.bulk_update(
+                    batch,
+                    ["status", "attempts", "next_attempt_at", "last_error", "sent_at"],
+                )
+
+            elapsed = monotonic() - start
+            if batch:
+                logger.info(
+                    f"Sent {sent_count} email{pluralize(sent_count)} so far, "
+                    f"{failed_count} failed "
+                    f"({sent_count / max(elapsed, 0.001):.1f} emails/s)"
+                )
+
+            if len(batch) < batch_size:
+                break
+
+            if elapsed >= time_budget:
+                logger.info(
+                    f"Stopping after {elapsed:.1f}s, the remaining emails will be "
+                    "sent on next run."
+                )
+                break
+
+    OutgoingEmail.objects.filter(
+        status=OutgoingEmail.Status.SENT,
+        sent_at__lt=timezone.now()
+        - timedelta(days=settings.EMAIL_OUTBOX_RETENTION_DAYS),
+    ).delete()
+
+    return sent_count
+
+
+def _send_queued_email(email: OutgoingEmail, mail_connection, logger: Logger) -> bool:
+    email.attempts += 1
+    try:
+        if mail_connection.send_messages([email.as_message()]) != 1:
+            raise ValueError("The email backend did not send the email")
+    except Exception as e:
+        email.last_error = f"{e.__class__.__name__}: {e}"
+        if email.attempts >= settings.EMAIL_OUTBOX_MAX_ATTEMPTS:
+            email.status = OutgoingEmail.Status.FAILED
+            logger.error(f"Giving up sending email {email.pk}: {email.last_error}")
+        else:
+            email.next_attempt_at = timezone.now() + timedelta(
+                seconds=settings.EMAIL_OUTBOX_RETRY_DELAY * 2 ** (email.attempts - 1)
+            )
 
-    logger.info("Deleting static devices for confirmed aidants...")
-    obsolete_devices = (
-        StaticDevice.objects.filter(user__is_staff=False)
-        .filter(user__is_superuser=False)
-        .filter(user__totpdevice__confirmed=True)
-    )
-    deleted_obsolete_devices, _ = obsolete_devices.delete()
-    logger.info(f"Deleted {deleted_obsolete_devices} devices.")
-
-    logger.info("Deleting duplicated tokens...")
-    duplicated_tokens = (
-        StaticToken.objects.values("device", "token")
-        .annotate(id_count=Count("id"))
-        .filter(id_count__gte=2)
-    )
+        # The connection may be unusable after an error
+        mail_connection.close()
+        try:
+            mail_connection.open()
+        except Exception:
+            pass
+        return False
 
-    for token in duplicated_tokens:
-        device_id = token["device"]
-        token_value = token["token"]
-        token_count = token["id_count"]
-        tokens_to_delete = StaticToken.objects.filter(device__id=device_id).filter(
-            token=token_value
-        )[: token_count - 1]
-        for token in tokens_to_delete:
-            token.delete()
+    email.status = OutgoingEmail.Status.SENT
+    email.sent_at = timezone.now()
+    email.last_error = ""
+    return True
 
 
 @shared_task
-def notify_soon_expired_mandates():
+def delete_duplicated_static_tokens(*, batch_size=None, time_budget=None, logger=None):
+    """Deletes the static devices of confirmed aidants, then duplicated tokens.
 
-    mandates_qset = Mandat.find_soon_expired(settings.MANDAT_EXPIRED_SOON)
-    organisations: List[Organisation] = list(
-        Organisation.objects.filter(
-            pk__in=mandates_qset.values("organisation").distinct()
+    `time_budget` covers the whole task. Passes depend on the previous ones (tokens
+    reference their device), so once a pass stops early, the next ones are left for
+    the next run.
+    """
+    logger: Logger = logger or get_task_logger(__name__)
+    if time_budget is None:
+        time_budget = settings.MAINTENANCE_TIME_BUDGET
+    deadline = monotonic() + time_budget
+
+    confirmed_aidants = Aidant.objects.filter(
+        is_staff=False, is_superuser=False, totpdevice__confirmed=True
+    )
+    obsolete_devices = StaticDevice.objects.filter(user__in=confirmed_aidants)
+    # Keeps the oldest token of every value of a device
+    duplicated_tokens = StaticToken.objects.filter(
+        pk__in=RawSQL(
+            "SELECT id FROM ("
+            "SELECT id, row_number() OVER "
+            "(PARTITION BY device_id, token ORDER BY id) AS rank "
+            f"FROM {StaticToken._meta.db_table}"
+            ") AS ranked WHERE rank > 1",
+            [],
         )
     )
+    passes = [
+        (
+            StaticToken.objects.filter(device__in=obsolete_devices),
+            "tokens of obsolete static devices",
+        ),
+        # Only devices without tokens left can be deleted
+        (
+            obsolete_devices.filter(
+                ~Exists(StaticToken.objects.filter(device=OuterRef("pk")))
+            ),
+            "obsolete static devices",
+        ),
+        (duplicated_tokens, "duplicated static tokens"),
+    ]
 
-    for organisation in organisations:
-        recipient_list = list(organisation.aidants.values_list("email", flat=True))
-
-        org_mandates: List[Mandat] = list(
-            mandates_qset.filter(organisation=organisation)
+    logger.info(
+        "Deleting static devices for confirmed aidants and duplicated tokens..."
+    )
+    reports = []
+    for queryset, name in passes:
+        if reports and not reports[-1].complete:
+            break
+
+        reports.append(
+            delete_in_batches(
+                queryset,
+                name=name,
+                batch_size=batch_size,
+                time_budget=max(deadline - monotonic(), 0),
+                logger=logger,
+            )
         )
 
-        context = {"mandates": org_mandates}
+    for report in reports:
+        logger.info(str(report))
 
-        text_message = loader.render_to_string(
-            "aidants_connect_web/managment/notify_soon_expired_mandates.txt",
-            context,
-        )
-        html_message = loader.render_to_string(
-            "aidants_connect_web/managment/notify_soon_expired_mandates.html",
-            context,
-        )
+    # Task results are serialized to JSON
+    return [asdict(report) for report in reports]
 
-        send_mail(
-            from_email=settings.MANDAT_EXPIRED_SOON_EMAIL_FROM,
-            recipient_list=recipient_list,
-            subject=settings.MANDAT_EXPIRED_SOON_EMAIL_SUBJECT,
-            message=text_message,
-            html_message=html_message,
-        )
+
+@shared_task
+def notify_soon_expired_mandates(
+    *, batch_size=None, workers=None, dry_run=False, logger=None
+):
+    logger: Logger = logger or get_task_logger(__name__)
+
+    # Mandates are notified once, when they enter the window
+    mandates = (
+        Mandat.find_soon_expired(settings.MANDAT_EXPIRED_SOON)
+        .filter(expiration_notified_at__isnull=True)
+        .select_related("usager")
+        .annotate(autorisations_count=Count("autorisations"))
+    )
+    mandates_per_organisation = defaultdict(list)
+    for mandate in mandates:
+        mandates_per_organisation[mandate.organisation_id].append(mandate)
+
+    recipients_per_organisation = defaultdict(list)
+    for organisation_id, email in Aidant.objects.filter(
+        organisations__in=mandates_per_organisation.keys()
+    ).values_list("organisations", "email"):
+        recipients_per_organisation[organisation_id].append(email)
+
+    def mark_as_notified(notifications: List[Notification]):
+        Mandat.objects.filter(
+            pk__in=[
+                mandate.pk
+                for notification in notifications
+                for mandate in notification.context["mandates"]
+            ]
+        ).update(expiration_notified_at=timezone.now())
+
+    report = dispatch_notifications(
+        (
+            Notification(
+                recipients=recipients_per_organisation[organisation_id],
+                context={"mandates": org_mandates},
+            )
+            for organisation_id, org_mandates in mandates_per_organisation.items()
+        ),
+        template_name="aidants_connect_web/managment/notify_soon_expired_mandates",
+        subject=settings.MANDAT_EXPIRED_SOON_EMAIL_SUBJECT,
+        from_email=settings.MANDAT_EXPIRED_SOON_EMAIL_FROM,
+        batch_size=batch_size,
+        workers=workers,
+        dry_run=dry_run,
+        on_sent=mark_as_notified,
+        logger=logger,
+    )
+    # Task results are serialized to JSON
+    return asdict(report)
 
 
 @shared_task
@@ -130,43 +302,45 @@ def notify_new_habilitation_requests(*, logger=None):
         created_at__gt=created_from,
         origin=HabilitationRequest.ORIGIN_RESPONSABLE,
     ).count()
-    organisations = Organisation.objects.filter(
-        habilitation_requests__created_at__gte=created_from,
-        habilitation_requests__origin=HabilitationRequest.ORIGIN_RESPONSABLE,
-    ).annotate(
-        num_requests=Count(
-            "habilitation_requests",
-            filter=Q(
-                habilitation_requests__created_at__gt=created_from,
-                habilitation_requests__origin=HabilitationRequest.ORIGIN_RESPONSABLE,
+
+    # aidants à former test PIX
+    aidants_with_test_pix = list(
+        HabilitationRequest.objects.filter(date_test_pix__gt=created_from)
+    )
+    new_test_pix_count = len(aidants_with_test_pix)
+
+    if habilitation_requests_count == 0 and new_test_pix_count == 0:
+        return
+
+    # `department_insee_code` holds "20" for Corsican organisations whose
+    # department is unknown, see `Department.insee_code_from_zipcode`
+    region_name = Department.objects.filter(
+        Q(insee_code=OuterRef("department_insee_code"))
+        | Q(zipcode=OuterRef("department_insee_code"))
+    ).values("region__name")[:1]
+    organisations = list(
+        Organisation.objects.filter(
+            habilitation_requests__created_at__gte=created_from,
+            habilitation_requests__origin=HabilitationRequest.ORIGIN_RESPONSABLE,
+        ).annotate(
+            num_requests=Count(
+                "habilitation_requests",
+                filter=Q(
+                    habilitation_requests__created_at__gt=created_from,
+                    habilitation_requests__origin=(
+                        HabilitationRequest.ORIGIN_RESPONSABLE
+                    ),
+                ),
             ),
+            region_name=Subquery(region_name),
         )
     )
 
     orga_per_region = defaultdict(list)
     for org in organisations:
-        departement_query = Department.objects.filter(
-            insee_code=org.department_insee_code
-        )
-        if departement_query.exists():
-            dep = departement_query[0]
-            orga_per_region[dep.region.name] += [org]
-        else:
-            orga_per_region["Région non précisé"] += [org]
+        orga_per_region[org.region_name or "Région non précisé"].append(org)
     orga_per_region.default_factory = None
 
-    # aidants à former test PIX
-    new_test_pix_count = HabilitationRequest.objects.filter(
-        date_test_pix__gt=created_from
-    ).count()
-
-    aidants_with_test_pix = HabilitationRequest.objects.filter(
-        date_test_pix__gt=created_from
-    )
-
-    if habilitation_requests_count == 0 and new_test_pix_count == 0:
-        return
-
     context = {
         "organisations": organisations,
         "organisations_per_region": orga_per_region,
@@ -198,7 +372,11 @@ def notify_new_habilitation_requests(*, logger=None):
 
 
 @shared_task()
-def notify_no_totp_workers():
+def notify_no_totp_workers(
+    *, batch_size=None, workers=None, dry_run=False, logger=None
+):
+    logger: Logger = logger or get_task_logger(__name__)
+
     def none_if_blank(value):
         return (
             None
@@ -240,19 +418,157 @@ def notify_no_totp_workers():
 
             workers_without_totp_dict[manager_email]["users"].append(item)
 
-    for manager_email, context in workers_without_totp_dict.items():
-        text_message = loader.render_to_string(
-            "aidants_connect_web/managment/notify_no_totp_workers.txt", context
+    report = dispatch_notifications(
+        (
+            Notification(recipients=[manager_email], context=context)
+            for manager_email, context in workers_without_totp_dict.items()
+        ),
+        template_name="aidants_connect_web/managment/notify_no_totp_workers",
+        subject=settings.WORKERS_NO_TOTP_NOTIFY_EMAIL_SUBJECT,
+        from_email=settings.WORKERS_NO_TOTP_NOTIFY_EMAIL_FROM,
+        batch_size=batch_size,
+        workers=workers,
+        dry_run=dry_run,
+        logger=logger,
+    )
+    # Task results are serialized to JSON
+    return asdict(report)
+
+
+@shared_task
+def refresh_statistics_snapshot(*, only_if_missing=False, logger=None):
+    """
+    :param only_if_missing: do nothing if a snapshot was already taken, for the
+        runs scheduled by the statistics page before the first snapshot exists
+    """
+    logger: Logger = logger or get_task_logger(__name__)
+
+    if only_if_missing and StatisticsSnapshot.objects.exists():
+        logger.info("A statistics snapshot exists already.")
+        return None
+
+    logger.info("Refreshing statistics snapshot...")
+    snapshot = StatisticsSnapshot.take()
+    logger.info(f"Statistics snapshot #{snapshot.pk} taken.")
+
+    return snapshot.pk
+
+
+@shared_task
+def rebuild_aidant_stats(*, logger=None):
+    """Recomputes `AidantStats` from the journal.
+
+    They are kept up to date as journal entries are written; this is only needed
+    when entries were written or removed without going through the ORM.
+    """
+    logger: Logger = logger or get_task_logger(__name__)
+
+    logger.info("Rebuilding aidant statistics...")
+    count = AidantStats.rebuild()
+    logger.info(f"Statistics of {count} aidant{pluralize(count)} rebuilt")
+
+    return count
+
+
+@shared_task
+def update_mandats_autorisation_state(*, batch_size=1000, logger=None):
+    """Recomputes the denormalised autorisation state of every mandate.
+
+    Those columns are maintained when autorisations are saved; this is only needed
+    when autorisations were modified without going through the ORM.
+    """
+    logger: Logger = logger or get_task_logger(__name__)
+
+    logger.info("Updating the autorisation state of mandates...")
+
+    updated_count = 0
+    last_pk = 0
+    while True:
+        pks = list(
+            Mandat.objects.filter(pk__gt=last_pk)
+            .order_by("pk")
+            .values_list("pk", flat=True)[:batch_size]
         )
+        if not pks:
+            break
+
+        updated_count += Mandat.objects.filter(
+            pk__gte=pks[0], pk__lte=pks[-1]
+        ).update_autorisation_state()
+        last_pk = pks[-1]
+        logger.info(f"{updated_count} mandate{pluralize(updated_count)} updated")
+
+    return updated_count
 
-        html_message = loader.render_to_string(
-            "aidants_connect_web/managment/notify_no_totp_workers.html", context
+
+@shared_task
+def create_journal_partitions(*, months_ahead=3, logger=None):
+    """Creates the partitions of the journal up to `months_ahead` months from now.
+
+    Entries written in a month with no partition land in the default partition;
+    this is meant to be run periodically so that it does not happen.
+    """
+    logger: Logger = logger or get_task_logger(__name__)
+
+    this_month = month_start(timezone.now())
+    created = []
+    with transaction.atomic(), connection.cursor() as cursor:
+        for count in range(months_ahead + 1):
+            month = add_months(this_month, count)
+            if create_journal_partition(cursor, month):
+                created.append(partition_name(month))
+
+    logger.info(
+        f"{len(created)} journal partition{pluralize(len(created))} created"
+        + (f": {', '.join(created)}" if created else "")
+    )
+
+    return created
+
+
+@shared_task
+def transfer_mandates(*, transfer_id, batch_size=None, resume=False, logger=None):
+    """Runs a `MandatTransfer` requested in the admin and reports its progress on it
+    after each batch.
+
+    A transfer is only run once, even if the task is delivered several times.
+
+    :param resume: also run the transfer if it is still running, to resume it after
+        its worker was stopped. Mandates that were already moved are skipped.
+    """
+    logger: Logger = logger or get_task_logger(__name__)
+
+    transfers = MandatTransfer.objects.filter(pk=transfer_id)
+    runnable = [MandatTransfer.Status.PENDING]
+    if resume:
+        runnable.append(MandatTransfer.Status.RUNNING)
+    if not transfers.filter(status__in=runnable).update(
+        status=MandatTransfer.Status.RUNNING
+    ):
+        logger.info(f"Mandate transfer {transfer_id} was already run")
+        return None
+    transfer = transfers.select_related("organisation").get()
+
+    def on_progress(transferred_count, failures):
+        transfers.update(transferred_count=transferred_count, failures=failures)
+        logger.info(
+            f"Mandate transfer {transfer_id}: {transferred_count}/{transfer.total} "
+            f"mandate{pluralize(transferred_count)} transferred, "
+            f"{len(failures)} failure{pluralize(len(failures))}"
         )
 
-        send_mail(
-            from_email=settings.WORKERS_NO_TOTP_NOTIFY_EMAIL_FROM,
-            recipient_list=[manager_email],
-            subject=settings.WORKERS_NO_TOTP_NOTIFY_EMAIL_SUBJECT,
-            message=text_message,
-            html_message=html_message,
+    try:
+        failures = Mandat.transfer_to_organisation(
+            transfer.organisation,
+            transfer.mandat_ids,
+            batch_size=batch_size,
+            on_progress=on_progress,
         )
+    except Exception:
+        transfers.update(status=MandatTransfer.Status.FAILED, end_date=timezone.now())
+        raise
+
+    transfers.update(
+        status=MandatTransfer.Status.DONE, failures=failures, end_date=timezone.now()
+    )
+    return failures
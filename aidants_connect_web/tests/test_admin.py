@@ -2,6 +2,7 @@ from django.contrib.admin.sites import AdminSite
 from django.core import mail
 from django.test import TestCase, tag
 from django.test.client import RequestFactory
+from django.urls import reverse
 from django.utils.timezone import now
 
 from aidants_connect.admin import DepartmentFilter, RegionFilter
@@ -10,7 +11,9 @@ from aidants_connect_common.utils.constants import AuthorizationDurations
 from aidants_connect_web.admin import (
     AidantAdmin,
     AidantWithMandatsFilter,
+    HabilitationDepartmentFilter,
     HabilitationRequestAdmin,
+    MandatAdmin,
     OrganisationAdmin,
 )
 from aidants_connect_web.models import (
@@ -18,6 +21,7 @@ from aidants_connect_web.models import (
     HabilitationRequest,
     Journal,
     Mandat,
+    MandatTransfer,
     Organisation,
 )
 from aidants_connect_web.tests.factories import (
@@ -134,6 +138,9 @@ class DepartmentFilterTests(TestCase):
         OrganisationFactory(zipcode="13013")
         OrganisationFactory(zipcode="20000")
         OrganisationFactory(zipcode="0")
+        Organisation.objects.filter(pk=OrganisationFactory(zipcode="1").pk).update(
+            department_insee_code=""
+        )
         corse_filter = DepartmentFilter(
             self.rf.get("/"), {"department": "20"}, Organisation, OrganisationAdmin
         )
@@ -154,8 +161,37 @@ class DepartmentFilterTests(TestCase):
         queryset_other = other_filter.queryset(
             self.rf.get("/"), Organisation.objects.all()
         )
-        self.assertEqual(1, queryset_other.count())
-        self.assertEqual("0", queryset_other[0].zipcode)
+        self.assertEqual(
+            {"0", "1"}, set(queryset_other.values_list("zipcode", flat=True))
+        )
+
+    def test_queryset_corse(self):
+        OrganisationFactory(zipcode="20000")
+        OrganisationFactory(zipcode="20200", department_insee_code="2B")
+        haute_corse_filter = DepartmentFilter(
+            self.rf.get("/"), {"department": "2B"}, Organisation, OrganisationAdmin
+        )
+        self.assertEqual(
+            {"20000", "20200"},
+            set(
+                haute_corse_filter.queryset(
+                    None, Organisation.objects.all()
+                ).values_list("zipcode", flat=True)
+            ),
+        )
+
+    def test_queryset_through_organisation(self):
+        HabilitationRequestFactory(organisation=OrganisationFactory(zipcode="13013"))
+        HabilitationRequestFactory(organisation=OrganisationFactory(zipcode="75001"))
+        bdc_filter = HabilitationDepartmentFilter(
+            self.rf.get("/"),
+            {"department": "13"},
+            HabilitationRequest,
+            HabilitationRequestAdmin,
+        )
+        queryset = bdc_filter.queryset(None, HabilitationRequest.objects.all())
+        self.assertEqual(1, queryset.count())
+        self.assertEqual("13013", queryset[0].organisation.zipcode)
 
 
 @tag("admin")
@@ -253,3 +289,47 @@ class HabilitationRequestAdminTests(TestCase):
                 for manager in self.habilitation_request.organisation.responsables.all()
             )
         )
+
+
+@tag("admin")
+class MandatAdminTransferTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin_user = AidantFactory(is_staff=True, is_superuser=True)
+        cls.organisation = OrganisationFactory()
+        cls.mandates = [
+            MandatFactory(organisation=cls.admin_user.organisation) for _ in range(2)
+        ]
+        cls.mandat_admin = MandatAdmin(Mandat, AdminSite())
+
+    def test_transfer_runs_in_background_and_reports_failures(self):
+        ids = [str(mandate.pk) for mandate in self.mandates] + ["0"]
+        request = RequestFactory().post(
+            "/", {"ids": ",".join(ids), "organisation": self.organisation.pk}
+        )
+        request.user = self.admin_user
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.mandat_admin.mandate_transfer(request)
+
+        transfer = MandatTransfer.objects.get()
+        self.assertEqual(
+            response.url,
+            reverse(
+                "otpadmin:aidants_connect_web_mandat_transfer_progress",
+                kwargs={"transfer_id": transfer.pk},
+            ),
+        )
+        self.assertEqual(transfer.requested_by, self.admin_user)
+        self.assertEqual(
+            Mandat.objects.filter(organisation=self.organisation).count(), 2
+        )
+
+        request = RequestFactory().get(response.url)
+        request.user = self.admin_user
+        response = self.mandat_admin.mandate_transfer_progress(request, transfer.pk)
+
+        self.assertContains(response, "2 transférés")
+        self.assertContains(response, "1 échec")
+        self.assertContains(response, "<td>Mandat introuvable</td>", html=True)
+        self.assertNotContains(response, 'http-equiv="refresh"')
@@ -1,17 +1,26 @@
+import csv
+import gzip
 import os
 from datetime import datetime, timedelta, timezone
+from io import StringIO
+from smtplib import SMTPException
+from tempfile import TemporaryDirectory
 from unittest.mock import patch
 
 from django.core import mail
+from django.core.mail import get_connection
 from django.core.management import CommandError, call_command
-from django.test import TestCase, tag
+from django.db import connection
+from django.test import TestCase, override_settings, tag
+from django.test.utils import CaptureQueriesContext
 
 from django_otp.plugins.otp_static.lib import add_static_token
-from django_otp.plugins.otp_static.models import StaticToken
+from django_otp.plugins.otp_static.models import StaticDevice, StaticToken
 from django_otp.plugins.otp_totp.models import TOTPDevice
 from freezegun import freeze_time
 
 from aidants_connect import settings
+from aidants_connect_common.utils.constants import JournalActionKeywords
 from aidants_connect_overrides.management.commands.createsuperuser import (
     ERROR_MSG,
     ORGANISATION_ID_ARG,
@@ -19,15 +28,31 @@ from aidants_connect_overrides.management.commands.createsuperuser import (
     ORGANISATION_NAME_ARG,
     ORGANISATION_NAME_ENV,
 )
-from aidants_connect_web.models import Aidant, Connection, HabilitationRequest
+from aidants_connect_web.journal_partitions import list_journal_partitions
+from aidants_connect_web.mail import queue_mail
+from aidants_connect_web.models import (
+    Aidant,
+    Autorisation,
+    Connection,
+    HabilitationRequest,
+    Journal,
+    Mandat,
+    MandatTransfer,
+    OutgoingEmail,
+)
 from aidants_connect_web.tests.factories import (
     AidantFactory,
+    AttestationJournalFactory,
+    AutorisationFactory,
     CarteTOTPFactory,
     ConnectionFactory,
     HabilitationRequestFactory,
+    JournalFactory,
     MandatFactory,
     OrganisationFactory,
+    UsagerFactory,
 )
+from aidants_connect_web.utilities import generate_attestation_hash
 
 TZ_PARIS = timezone(offset=timedelta(hours=1), name="Europe/Paris")
 
@@ -79,6 +104,349 @@ class DeleteExpiredConnectionsTests(TestCase):
         self.assertEqual(remaining_connections.count(), 1)
         self.assertEqual(remaining_connections.first().id, self.conn_2.id)
 
+    @freeze_time("2020-01-01 07:00:00")
+    def test_delete_expired_connections_by_batches(self):
+        ConnectionFactory.create_batch(
+            4, expires_on=datetime(2020, 1, 1, 5, 0, 0, tzinfo=timezone.utc)
+        )
+
+        with CaptureQueriesContext(connection) as queries:
+            call_command("delete_expired_connections", batch_size=2)
+        # One DELETE statement per batch of 2 of the 5 expired connections
+        self.assertEqual(
+            [query["sql"].startswith("DELETE") for query in queries].count(True), 3
+        )
+        remaining_connections = Connection.objects.all()
+        self.assertEqual(remaining_connections.count(), 1)
+        self.assertEqual(remaining_connections.first().id, self.conn_2.id)
+
+    @freeze_time("2020-01-01 07:00:00")
+    def test_delete_expired_connections_stops_when_time_budget_is_spent(self):
+        ConnectionFactory.create_batch(
+            4, expires_on=datetime(2020, 1, 1, 5, 0, 0, tzinfo=timezone.utc)
+        )
+
+        call_command("delete_expired_connections", batch_size=2, time_budget=0)
+        self.assertEqual(Connection.objects.count(), 4)
+
+        # The next run resumes where the previous one stopped
+        call_command("delete_expired_connections", batch_size=2, time_budget=0)
+        self.assertEqual(Connection.objects.count(), 2)
+
+
+@tag("commands")
+class SendQueuedEmailsTests(TestCase):
+    def queue_emails(self, count):
+        return [
+            queue_mail(
+                subject=f"Objet {i}",
+                message=f"Message {i}",
+                from_email="expediteur@example.com",
+                recipient_list=[f"destinataire{i}@example.com"],
+                html_message=f"<p>Message {i}</p>",
+            )
+            for i in range(count)
+        ]
+
+    def test_queued_email_is_sent_once_committed(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            email = self.queue_emails(1)[0]
+        self.assertEqual(len(mail.outbox), 0)
+
+        for callback in callbacks:
+            callback()
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].subject, "Objet 0")
+        self.assertEqual(mail.outbox[0].to, ["destinataire0@example.com"])
+        self.assertEqual(
+            mail.outbox[0].alternatives, [("<p>Message 0</p>", "text/html")]
+        )
+
+        email.refresh_from_db()
+        self.assertEqual(email.status, OutgoingEmail.Status.SENT)
+        self.assertEqual(email.attempts, 1)
+        self.assertIsNotNone(email.sent_at)
+
+    def test_emails_are_sent_by_batches_through_one_connection(self):
+        self.queue_emails(5)
+
+        with patch(
+            "aidants_connect_web.tasks.get_connection", wraps=get_connection
+        ) as get_connection_mock:
+            call_command("send_queued_emails", batch_size=2)
+
+        get_connection_mock.assert_called_once()
+        self.assertEqual(len(mail.outbox), 5)
+        self.assertEqual(
+            [message.subject for message in mail.outbox],
+            [f"Objet {i}" for i in range(5)],
+        )
+        self.assertFalse(OutgoingEmail.objects.due().exists())
+
+    def test_emails_are_sent_by_batches_until_time_budget_is_spent(self):
+        self.queue_emails(5)
+
+        call_command("send_queued_emails", batch_size=2, time_budget=0)
+        self.assertEqual(len(mail.outbox), 2)
+
+        # The next run resumes where the previous one stopped
+        call_command("send_queued_emails", batch_size=2, time_budget=0)
+        self.assertEqual(len(mail.outbox), 4)
+
+    @override_settings(EMAIL_OUTBOX_RETRY_DELAY=60, EMAIL_OUTBOX_MAX_ATTEMPTS=3)
+    def test_failed_email_is_retried_with_backoff(self):
+        with freeze_time("2022-01-01 10:00:00"), patch(
+            "django.core.mail.backends.locmem.EmailBackend.send_messages",
+            side_effect=SMTPException("Service indisponible"),
+        ):
+            email = self.queue_emails(1)[0]
+            call_command("send_queued_emails")
+            email.refresh_from_db()
+            self.assertEqual(email.status, OutgoingEmail.Status.PENDING)
+            self.assertEqual(email.attempts, 1)
+            self.assertEqual(email.last_error, "SMTPException: Service indisponible")
+            self.assertEqual(
+                email.next_attempt_at, datetime(2022, 1, 1, 10, 1, tzinfo=timezone.utc)
+            )
+
+            # Not due yet
+            call_command("send_queued_emails")
+            email.refresh_from_db()
+            self.assertEqual(email.attempts, 1)
+
+        with freeze_time("2022-01-01 10:01:00"), patch(
+            "django.core.mail.backends.locmem.EmailBackend.send_messages",
+            side_effect=SMTPException("Service indisponible"),
+        ):
+            call_command("send_queued_emails")
+            email.refresh_from_db()
+            self.assertEqual(email.attempts, 2)
+            self.assertEqual(
+                email.next_attempt_at, datetime(2022, 1, 1, 10, 3, tzinfo=timezone.utc)
+            )
+
+        with freeze_time("2022-01-01 10:03:00"):
+            call_command("send_queued_emails")
+            email.refresh_from_db()
+            self.assertEqual(email.status, OutgoingEmail.Status.SENT)
+            self.assertEqual(email.attempts, 3)
+            self.assertEqual(email.last_error, "")
+            self.assertEqual(len(mail.outbox), 1)
+
+    @override_settings(EMAIL_OUTBOX_RETRY_DELAY=0, EMAIL_OUTBOX_MAX_ATTEMPTS=2)
+    def test_email_is_given_up_after_max_attempts(self):
+        failing, sent = self.queue_emails(2)
+
+        def fail_first_email(messages):
+            if messages[0].subject == failing.subject:
+                raise SMTPException("Destinataire refusé")
+            mail.outbox.extend(messages)
+            return len(messages)
+
+        with patch(
+            "django.core.mail.backends.locmem.EmailBackend.send_messages",
+            side_effect=fail_first_email,
+        ):
+            call_command("send_queued_emails")
+            call_command("send_queued_emails")
+            call_command("send_queued_emails")
+
+        failing.refresh_from_db()
+        self.assertEqual(failing.status, OutgoingEmail.Status.FAILED)
+        self.assertEqual(failing.attempts, 2)
+        sent.refresh_from_db()
+        self.assertEqual(sent.status, OutgoingEmail.Status.SENT)
+        self.assertEqual(len(mail.outbox), 1)
+
+    @override_settings(EMAIL_OUTBOX_RETENTION_DAYS=30)
+    def test_old_sent_emails_are_purged(self):
+        with freeze_time("2022-01-01 10:00:00"):
+            old, failed = self.queue_emails(2)
+            call_command("send_queued_emails")
+            OutgoingEmail.objects.filter(pk=failed.pk).update(
+                status=OutgoingEmail.Status.FAILED
+            )
+
+        with freeze_time("2022-02-01 10:00:00"):
+            recent = self.queue_emails(1)[0]
+            call_command("send_queued_emails")
+
+        self.assertEqual(
+            set(OutgoingEmail.objects.values_list("pk", flat=True)),
+            {failed.pk, recent.pk},
+        )
+
+
+@tag("commands")
+class BackfillMandatTemplatePathTests(TestCase):
+    def setUp(self):
+        self.aidant = AidantFactory()
+        self.usager = UsagerFactory()
+        self.template_path = os.path.join(
+            settings.MANDAT_TEMPLATE_DIR, "20200511_mandat.html"
+        )
+
+        self.legacy_mandate = self.create_legacy_mandate(self.usager)
+        AttestationJournalFactory(
+            aidant=self.aidant,
+            organisation=self.aidant.organisation,
+            usager=self.usager,
+            mandat=self.legacy_mandate,
+            demarche="logement,transports",
+            attestation_hash=generate_attestation_hash(
+                self.aidant,
+                self.usager,
+                ["transports", "logement"],
+                self.legacy_mandate.expiration_date,
+                mandat_template_path=self.template_path,
+            ),
+        )
+
+        # No journal entry for this one
+        self.unresolved_mandate = self.create_legacy_mandate(UsagerFactory())
+
+    def create_legacy_mandate(self, usager):
+        mandate = Mandat.objects.create(
+            organisation=self.aidant.organisation,
+            usager=usager,
+            duree_keyword="SHORT",
+            expiration_date=datetime.now(tz=timezone.utc) + timedelta(days=1),
+            template_path=None,
+        )
+        for procedure in ["transports", "logement"]:
+            Autorisation.objects.create(mandat=mandate, demarche=procedure)
+        return mandate
+
+    def test_resolves_legacy_mandates(self):
+        stdout = StringIO()
+        call_command("backfill_mandat_template_path", workers=1, stdout=stdout)
+
+        self.legacy_mandate.refresh_from_db()
+        self.assertEqual(self.legacy_mandate.template_path, self.template_path)
+        self.unresolved_mandate.refresh_from_db()
+        self.assertIsNone(self.unresolved_mandate.template_path)
+        self.assertEqual(stdout.getvalue().split(), [str(self.unresolved_mandate.pk)])
+
+    def test_resolves_legacy_mandates_in_worker_processes(self):
+        call_command(
+            "backfill_mandat_template_path", workers=2, batch_size=1, stdout=StringIO()
+        )
+
+        self.legacy_mandate.refresh_from_db()
+        self.assertEqual(self.legacy_mandate.template_path, self.template_path)
+
+    def test_loads_journal_entries_of_each_batch_at_once(self):
+        for _ in range(3):
+            self.create_legacy_mandate(UsagerFactory())
+
+        # Per batch: mandates, autorisations, entries linked to the mandates,
+        # entries of legacy attestations and the update. Then the query finding
+        # no mandate left.
+        with self.assertNumQueries(6):
+            call_command(
+                "backfill_mandat_template_path",
+                workers=1,
+                batch_size=10,
+                stdout=StringIO(),
+            )
+
+        self.legacy_mandate.refresh_from_db()
+        self.assertEqual(self.legacy_mandate.template_path, self.template_path)
+
+    def test_resumes_after_given_mandate(self):
+        call_command(
+            "backfill_mandat_template_path",
+            workers=1,
+            after=self.legacy_mandate.pk,
+            stdout=StringIO(),
+        )
+
+        self.legacy_mandate.refresh_from_db()
+        self.assertIsNone(self.legacy_mandate.template_path)
+
+
+@tag("commands")
+class JournalPartitionsTests(TestCase):
+    def setUp(self):
+        self.aidant = AidantFactory()
+
+    def get_partition(self, entry):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT tableoid::regclass::text FROM aidants_connect_web_journal "
+                "WHERE id = %s",
+                [entry.pk],
+            )
+            return cursor.fetchone()[0]
+
+    def create_entry(self, creation_date):
+        return JournalFactory(
+            aidant=self.aidant,
+            action=JournalActionKeywords.CONNECT_AIDANT,
+            creation_date=creation_date,
+        )
+
+    def test_create_journal_partitions(self):
+        entry = self.create_entry(datetime(2019, 2, 10, tzinfo=timezone.utc))
+        self.assertEqual(
+            self.get_partition(entry), "aidants_connect_web_journal_default"
+        )
+
+        with freeze_time(datetime(2019, 1, 15, tzinfo=timezone.utc)):
+            call_command("create_journal_partitions", months_ahead=2)
+
+        self.assertEqual(
+            self.get_partition(entry), "aidants_connect_web_journal_y2019m02"
+        )
+        self.assertEqual(
+            [name for name, month in list_journal_partitions() if month.year == 2019],
+            [
+                "aidants_connect_web_journal_y2019m01",
+                "aidants_connect_web_journal_y2019m02",
+                "aidants_connect_web_journal_y2019m03",
+            ],
+        )
+
+    def test_archive_journal_partitions(self):
+        with freeze_time(datetime(2019, 1, 15, tzinfo=timezone.utc)):
+            call_command("create_journal_partitions", months_ahead=1)
+        old_entry = self.create_entry(datetime(2019, 2, 10, tzinfo=timezone.utc))
+        recent_entry = self.create_entry(None)
+        # Foreign keys are checked when a transaction commits and a table can't be
+        # dropped before: entries are written in the transaction of the test here
+        with connection.cursor() as cursor:
+            cursor.execute("SET CONSTRAINTS ALL IMMEDIATE")
+
+        with TemporaryDirectory() as output_dir:
+            call_command(
+                "archive_journal_partitions",
+                retention_months=13,
+                output_dir=output_dir,
+            )
+
+            with gzip.open(
+                os.path.join(output_dir, "aidants_connect_web_journal_y2019m02.csv.gz"),
+                "rt",
+            ) as f:
+                rows = list(csv.DictReader(f))
+
+        self.assertEqual([row["id"] for row in rows], [str(old_entry.pk)])
+        self.assertFalse(Journal.objects.filter(pk=old_entry.pk).exists())
+        self.assertTrue(Journal.objects.filter(pk=recent_entry.pk).exists())
+        self.assertNotIn(
+            "aidants_connect_web_journal_y2019m01",
+            [name for name, _ in list_journal_partitions()],
+        )
+
+    def test_archive_journal_partitions_keeps_attestations_of_live_mandates(self):
+        with TemporaryDirectory() as output_dir:
+            with self.assertRaises(CommandError):
+                call_command(
+                    "archive_journal_partitions",
+                    retention_months=12,
+                    output_dir=output_dir,
+                )
+
 
 @tag("commands")
 class DeleteDuplicatedAndObsoleteTokensTests(TestCase):
@@ -103,6 +471,19 @@ class DeleteDuplicatedAndObsoleteTokensTests(TestCase):
         call_command(self.command_name)
         self.assertEqual(StaticToken.objects.count(), 2)
 
+    def test_keep_oldest_token_of_every_device_by_batches(self):
+        first_tokens = []
+        for aidant in AidantFactory.create_batch(2):
+            first_tokens.append(add_static_token(aidant.username, 123456))
+            for _ in range(3):
+                add_static_token(aidant.username, 123456)
+
+        call_command(self.command_name, batch_size=2)
+        self.assertEqual(
+            set(StaticToken.objects.values_list("pk", flat=True)),
+            {token.pk for token in first_tokens},
+        )
+
     def test_delete_static_device_for_confirmed_simple_aidants(self):
         aidants = [
             AidantFactory(),
@@ -121,6 +502,22 @@ class DeleteDuplicatedAndObsoleteTokensTests(TestCase):
         # only the first aidant's static device was deleted
         self.assertEqual(StaticToken.objects.count(), 2)
 
+    def test_keep_static_devices_with_tokens_left_when_time_budget_is_spent(self):
+        aidant = AidantFactory()
+        for _ in range(3):
+            add_static_token(aidant.username, 123456)
+        TOTPDevice(user=aidant, confirmed=True).save()
+
+        call_command(self.command_name, batch_size=1, time_budget=0)
+
+        self.assertEqual(StaticToken.objects.count(), 2)
+        self.assertEqual(StaticDevice.objects.filter(user=aidant).count(), 1)
+
+        call_command(self.command_name)
+
+        self.assertEqual(StaticToken.objects.count(), 0)
+        self.assertEqual(StaticDevice.objects.filter(user=aidant).count(), 0)
+
 
 @tag("commands")
 class CreateSuperUserTests(TestCase):
@@ -283,6 +680,45 @@ class NewHabilitationRequestsTests(TestCase):
         self.assertIn("4 nouveaux aidants à former", mail_content)
         self.assertIn("dans 2 structures différentes", mail_content)
 
+    def test_organisations_are_grouped_by_region(self):
+        for name, zipcode in (
+            ("Marseille", "13013"),
+            ("Ajaccio", "20000"),
+            ("Nowhere", "0"),
+        ):
+            HabilitationRequestFactory(
+                organisation=OrganisationFactory(name=name, zipcode=zipcode),
+                origin=HabilitationRequest.ORIGIN_RESPONSABLE,
+            )
+
+        call_command("notify_new_habilitation_requests")
+
+        html_message = mail.outbox[0].alternatives[0][0]
+        for region, organisation in (
+            ("Provence-Alpes-Côte d&#x27;Azur", "Marseille"),
+            ("Corse", "Ajaccio"),
+            ("Région non précisé", "Nowhere"),
+        ):
+            self.assertRegex(
+                html_message, rf"<b>{region}</b>\s*</p>\s*<li>{organisation} :"
+            )
+
+    def test_query_count_does_not_depend_on_organisations(self):
+        for organisations_count in (1, 5):
+            mail.outbox = []
+            for zipcode in ("13013", "75001", "97400", "0", "20000")[
+                :organisations_count
+            ]:
+                HabilitationRequestFactory(
+                    organisation=OrganisationFactory(zipcode=zipcode),
+                    origin=HabilitationRequest.ORIGIN_RESPONSABLE,
+                )
+            HabilitationRequestFactory(date_test_pix=datetime.now(timezone.utc))
+
+            with self.assertNumQueries(4):
+                call_command("notify_new_habilitation_requests")
+            self.assertEqual(len(mail.outbox), 1)
+
 
 @tag("commands")
 class NotifySoonExpiredMandatesTests(TestCase):
@@ -322,6 +758,113 @@ class NotifySoonExpiredMandatesTests(TestCase):
         self.assertNotIn(first_email.recipients()[0], second_email.recipients())
         self.assertNotIn(second_email.recipients()[0], first_email.recipients())
 
+    def test_queries_do_not_depend_on_mandates(self):
+        for _ in range(3):
+            aidant = AidantFactory()
+            for _ in range(2):
+                mandate = MandatFactory(
+                    duree_keyword="LONG", organisation=aidant.organisation
+                )
+                AutorisationFactory(mandat=mandate, demarche="papiers")
+                AutorisationFactory(mandat=mandate, demarche="famille")
+
+        # One query for the mandates, one for the recipients, one to mark the
+        # mandates as notified
+        with self.assertNumQueries(3):
+            call_command("notify_soon_expired_mandates")
+        self.assertEqual(len(mail.outbox), 3)
+        self.assertIn("(2 autorisations)", mail.outbox[0].body)
+
+    def test_emails_are_sent_by_batches_through_one_connection(self):
+        for _ in range(3):
+            aidant = AidantFactory()
+            MandatFactory(duree_keyword="LONG", organisation=aidant.organisation)
+
+        with patch(
+            "aidants_connect_web.notifications.get_connection", wraps=get_connection
+        ) as get_connection_mock, patch(
+            "django.core.mail.backends.locmem.EmailBackend.send_messages",
+            autospec=True,
+            side_effect=lambda backend, messages: len(messages),
+        ) as send_messages_mock:
+            call_command("notify_soon_expired_mandates", batch_size=2)
+
+        get_connection_mock.assert_called_once()
+        self.assertEqual(
+            [len(call.args[1]) for call in send_messages_mock.call_args_list], [2, 1]
+        )
+
+    def test_emails_are_rendered_in_worker_processes(self):
+        MandatFactory(organisation=self.orga, duree_keyword="LONG")
+        call_command("notify_soon_expired_mandates", workers=2)
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertIn(self.aidant.email, mail.outbox[0].recipients())
+
+    def test_mandates_are_notified_once(self):
+        notified = MandatFactory(organisation=self.orga, duree_keyword="LONG")
+        call_command("notify_soon_expired_mandates")
+        self.assertEqual(len(mail.outbox), 1)
+        notified.refresh_from_db()
+        self.assertIsNotNone(notified.expiration_notified_at)
+
+        call_command("notify_soon_expired_mandates")
+        self.assertEqual(len(mail.outbox), 1)
+
+        # Only the mandate which entered the window since the last run is notified
+        entering = MandatFactory(organisation=self.orga, duree_keyword="LONG")
+        call_command("notify_soon_expired_mandates")
+        self.assertEqual(len(mail.outbox), 2)
+        self.assertIn(entering.get_absolute_url(), mail.outbox[1].body)
+        self.assertNotIn(notified.get_absolute_url(), mail.outbox[1].body)
+
+    def test_mandates_of_unsent_batches_are_notified_on_next_run(self):
+        for _ in range(2):
+            aidant = AidantFactory()
+            MandatFactory(duree_keyword="LONG", organisation=aidant.organisation)
+
+        sent_batches = []
+
+        def fail_second_batch(backend, messages):
+            if sent_batches:
+                raise SMTPException("Service indisponible")
+            sent_batches.append(messages)
+            mail.outbox.extend(messages)
+            return len(messages)
+
+        with patch(
+            "django.core.mail.backends.locmem.EmailBackend.send_messages",
+            autospec=True,
+            side_effect=fail_second_batch,
+        ), self.assertRaises(SMTPException):
+            call_command("notify_soon_expired_mandates", batch_size=1)
+        self.assertEqual(len(mail.outbox), 1)
+
+        call_command("notify_soon_expired_mandates", batch_size=1)
+        self.assertEqual(len(mail.outbox), 2)
+        self.assertNotEqual(mail.outbox[0].recipients(), mail.outbox[1].recipients())
+        self.assertFalse(
+            Mandat.objects.filter(expiration_notified_at__isnull=True).exists()
+        )
+
+    @override_settings(EMAIL_BACKEND="django.core.mail.backends.smtp.EmailBackend")
+    def test_dry_run_reports_throughput(self):
+        MandatFactory(organisation=self.orga, duree_keyword="LONG")
+        stdout = StringIO()
+
+        # Nothing is sent to the SMTP server
+        with patch("smtplib.SMTP") as smtp_mock:
+            call_command("notify_soon_expired_mandates", dry_run=True, stdout=stdout)
+
+        smtp_mock.assert_not_called()
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertIn("1 email sent in 1 batch", stdout.getvalue())
+        self.assertIn("emails/s", stdout.getvalue())
+
+        # The mandates will be notified by the next actual run
+        self.assertFalse(
+            Mandat.objects.filter(expiration_notified_at__isnull=False).exists()
+        )
+
 
 @tag("commands")
 class NotifyNoTotpWorkersTests(TestCase):
@@ -364,3 +907,226 @@ class NotifyNoTotpWorkersTests(TestCase):
         self.assertIn(f"{aidant_without_carte}", message.body)
         self.assertNotIn(f"{aidant_with_carte}", message.body)
         self.assertNotIn("vous-même", message.body)
+
+
+@tag("commands")
+class TransferMandatesTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.aidant = AidantFactory()
+        cls.organisation = OrganisationFactory()
+        cls.template_path = os.path.join(
+            settings.MANDAT_TEMPLATE_DIR, "20200511_mandat.html"
+        )
+
+    def create_mandate(self, with_attestation=True, **kwargs):
+        mandate = MandatFactory(
+            organisation=self.aidant.organisation,
+            template_path=self.template_path,
+            post__create_authorisations=["transports", "logement"],
+            **kwargs,
+        )
+        if with_attestation:
+            AttestationJournalFactory(
+                aidant=self.aidant,
+                organisation=self.aidant.organisation,
+                usager=mandate.usager,
+                mandat=mandate,
+                demarche="logement,transports",
+                attestation_hash=self.attestation_hash(
+                    mandate, self.aidant.organisation
+                ),
+            )
+        return mandate
+
+    def attestation_hash(self, mandate, organisation):
+        return generate_attestation_hash(
+            self.aidant,
+            mandate.usager,
+            ["transports", "logement"],
+            mandate.expiration_date,
+            mandat_template_path=self.template_path,
+            organisation_id=organisation.pk,
+        )
+
+    def transfer(self, mandates, **kwargs):
+        transfer = MandatTransfer.objects.create(
+            organisation=self.organisation,
+            mandat_ids=[mandate.pk for mandate in mandates],
+        )
+        call_command("transfer_mandates", transfer.pk, **kwargs)
+        transfer.refresh_from_db()
+        return transfer
+
+    def test_transfers_mandates_and_logs_their_new_attestation_hash(self):
+        mandate = self.create_mandate()
+        previous_organisation = mandate.organisation
+
+        transfer = self.transfer([mandate])
+
+        self.assertEqual(transfer.status, MandatTransfer.Status.DONE)
+        self.assertEqual(transfer.transferred_count, 1)
+        self.assertEqual(transfer.failures, {})
+        self.assertIsNotNone(transfer.end_date)
+        mandate.refresh_from_db()
+        self.assertEqual(mandate.organisation, self.organisation)
+
+        entry = Journal.objects.get(
+            action=JournalActionKeywords.TRANSFER_MANDAT, mandat=mandate
+        )
+        self.assertEqual(entry.organisation, self.organisation)
+        self.assertEqual(
+            entry.attestation_hash, self.attestation_hash(mandate, self.organisation)
+        )
+        previous_hash = self.attestation_hash(mandate, previous_organisation)
+        self.assertEqual(
+            entry.additional_information,
+            f"previous_organisation = {previous_organisation.pk}, "
+            f"previous_hash = {previous_hash}",
+        )
+        # The attestation itself is left untouched
+        self.assertEqual(
+            Journal.objects.get(
+                action=JournalActionKeywords.CREATE_ATTESTATION, mandat=mandate
+            ).attestation_hash,
+            previous_hash,
+        )
+
+    def test_finds_template_of_legacy_mandates(self):
+        mandate = self.create_mandate()
+        Mandat.objects.filter(pk=mandate.pk).update(template_path=None)
+        # Attestations used not to be linked to their mandate
+        Journal.objects.filter(mandat=mandate).update(mandat=None)
+
+        self.transfer([mandate])
+
+        mandate.refresh_from_db()
+        self.assertEqual(mandate.template_path, self.template_path)
+        self.assertEqual(
+            Journal.objects.get(
+                action=JournalActionKeywords.TRANSFER_MANDAT, mandat=mandate
+            ).attestation_hash,
+            self.attestation_hash(mandate, self.organisation),
+        )
+
+    def test_number_of_queries_does_not_depend_on_number_of_mandates(self):
+        def count_queries(mandates):
+            with CaptureQueriesContext(connection) as queries:
+                failures = Mandat.transfer_to_organisation(
+                    self.organisation, [mandate.pk for mandate in mandates]
+                )
+            self.assertEqual(failures, {})
+            return len(queries)
+
+        self.assertEqual(
+            count_queries([self.create_mandate()]),
+            count_queries([self.create_mandate() for _ in range(5)]),
+        )
+
+    def test_transfers_mandates_by_batches(self):
+        mandates = [self.create_mandate() for _ in range(3)]
+        progress = []
+
+        Mandat.transfer_to_organisation(
+            self.organisation,
+            [mandate.pk for mandate in mandates],
+            batch_size=2,
+            on_progress=lambda transferred, _: progress.append(transferred),
+        )
+
+        self.assertEqual(progress, [2, 3])
+        self.assertEqual(
+            Mandat.objects.filter(organisation=self.organisation).count(), 3
+        )
+
+    def test_reports_failure_of_each_mandate(self):
+        mandate = self.create_mandate()
+        failing_mandate = self.create_mandate()
+        original_hash = Mandat._get_transferred_attestation_hash
+
+        def get_transferred_attestation_hash(mandate, *args):
+            if mandate.pk == failing_mandate.pk:
+                raise ValueError("Oopsie")
+            return original_hash(mandate, *args)
+
+        with patch.object(
+            Mandat,
+            "_get_transferred_attestation_hash",
+            get_transferred_attestation_hash,
+        ):
+            failures = Mandat.transfer_to_organisation(
+                self.organisation, [mandate.pk, failing_mandate.pk, 0, "invalid"]
+            )
+
+        self.assertEqual(
+            failures,
+            {
+                str(failing_mandate.pk): (
+                    "Impossible de calculer l'empreinte de l'attestation : Oopsie"
+                ),
+                "0": "Mandat introuvable",
+                "invalid": "Identifiant de mandat invalide",
+            },
+        )
+        mandate.refresh_from_db()
+        self.assertEqual(mandate.organisation, self.organisation)
+        failing_mandate.refresh_from_db()
+        self.assertEqual(failing_mandate.organisation, self.aidant.organisation)
+        self.assertFalse(
+            Journal.objects.filter(
+                action=JournalActionKeywords.TRANSFER_MANDAT, mandat=failing_mandate
+            ).exists()
+        )
+
+    def test_mandate_without_attestation_is_transferred(self):
+        mandate = self.create_mandate(with_attestation=False)
+
+        transfer = self.transfer([mandate])
+
+        self.assertEqual(transfer.transferred_count, 1)
+        self.assertIsNone(
+            Journal.objects.get(
+                action=JournalActionKeywords.TRANSFER_MANDAT, mandat=mandate
+            ).attestation_hash
+        )
+
+    def test_transfer_is_only_run_once(self):
+        mandate = self.create_mandate()
+        transfer = self.transfer([mandate])
+
+        call_command("transfer_mandates", transfer.pk)
+
+        self.assertEqual(
+            Journal.objects.filter(
+                action=JournalActionKeywords.TRANSFER_MANDAT, mandat=mandate
+            ).count(),
+            1,
+        )
+
+    def test_interrupted_transfer_can_be_resumed(self):
+        transferred, left = self.create_mandate(), self.create_mandate()
+        transfer = MandatTransfer.objects.create(
+            organisation=self.organisation,
+            mandat_ids=[transferred.pk, left.pk],
+            status=MandatTransfer.Status.RUNNING,
+        )
+        # The worker was stopped after the first batch
+        Mandat.transfer_to_organisation(self.organisation, [transferred.pk])
+
+        call_command("transfer_mandates", transfer.pk)
+        left.refresh_from_db()
+        self.assertEqual(left.organisation, self.aidant.organisation)
+
+        call_command("transfer_mandates", transfer.pk, resume=True)
+
+        transfer.refresh_from_db()
+        self.assertEqual(transfer.status, MandatTransfer.Status.DONE)
+        self.assertEqual(transfer.transferred_count, 2)
+        left.refresh_from_db()
+        self.assertEqual(left.organisation, self.organisation)
+        self.assertEqual(
+            Journal.objects.filter(
+                action=JournalActionKeywords.TRANSFER_MANDAT, mandat=transferred
+            ).count(),
+            1,
+        )
@@ -1,9 +1,12 @@
 from django.conf import settings
-from django.test import TestCase, tag
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, tag
 from django.utils import timezone
 
 from freezegun import freeze_time
 
+from aidants_connect_web.decorators import activity_required
+from aidants_connect_web.models import Aidant, Journal
 from aidants_connect_web.tests.factories import AidantFactory, OrganisationFactory
 
 fc_callback_url = settings.FC_AS_FI_CALLBACK_URL
@@ -32,6 +35,32 @@ class ActivityRequiredTests(TestCase):
             self.assertEqual(response.status_code, 302)
             self.assertEqual(response.url, "/activity_check/?next=/creation_mandat/")
 
+    def test_activity_required_does_not_query_the_database(self):
+        Journal.log_connection(self.aidant_thierry)
+        request = RequestFactory().get("/creation_mandat/")
+        # Fetch the aidant like the authentication middleware would
+        request.user = Aidant.objects.get(pk=self.aidant_thierry.pk)
+        view = activity_required(lambda _: HttpResponse())
+
+        with self.assertNumQueries(0):
+            response = view(request)
+
+        self.assertEqual(response.status_code, 200)
+
+    def test_activity_required_uses_latest_journal_entry(self):
+        with freeze_time(timezone.now() - settings.ACTIVITY_CHECK_DURATION):
+            Journal.log_connection(self.aidant_thierry)
+        request = RequestFactory().get("/creation_mandat/")
+        request.user = Aidant.objects.get(pk=self.aidant_thierry.pk)
+        view = activity_required(lambda _: HttpResponse())
+
+        self.assertEqual(view(request).status_code, 302)
+
+        Journal.log_activity_check(self.aidant_thierry)
+        request.user = Aidant.objects.get(pk=self.aidant_thierry.pk)
+
+        self.assertEqual(view(request).status_code, 200)
+
 
 @tag("decorators")
 class AidantRequiredTests(TestCase):
@@ -1,6 +1,6 @@
 from django.test import TestCase, tag
 
-from aidants_connect_web.models import Aidant, Autorisation, Usager
+from aidants_connect_web.models import Aidant, Autorisation, Mandat, Usager
 
 
 @tag("fixtures")
@@ -14,3 +14,14 @@ class FixturesTests(TestCase):
         self.assertEqual(Aidant.objects.count(), 1)
         self.assertEqual(Usager.objects.count(), 1)
         self.assertEqual(Autorisation.objects.count(), 2)
+
+    def test_fixtures_mandates_state_matches_their_autorisations(self):
+        # `loaddata` does not run `Autorisation.save()` which maintains it
+        fields = ("pk", "active_autorisation_count", "revoked_at")
+        loaded = list(Mandat.objects.order_by("pk").values_list(*fields))
+
+        Mandat.objects.update_autorisation_state()
+
+        self.assertEqual(
+            loaded, list(Mandat.objects.order_by("pk").values_list(*fields))
+        )
@@ -37,11 +37,11 @@ class ViewAutorisationsTests(FunctionalTestCase):
             [self.mandate_1, self.mandate_2], self.aidante_fatimah.organisation.pk
         )
 
-        wait = WebDriverWait(self.selenium, 10)
-        wait.until(
-            url_matches(
-                f"^.+{reverse('otpadmin:aidants_connect_web_mandat_changelist')}$"
-            )
+        self.__wait_for_progress_page()
+        self.assertEqual(
+            self.selenium.find_element(By.CSS_SELECTOR, "#content h1").text.strip(),
+            "Les mandats ont été transférés vers l'organisation "
+            f"{self.aidante_fatimah.organisation}",
         )
 
         self.assertEqual(
@@ -90,25 +90,18 @@ class ViewAutorisationsTests(FunctionalTestCase):
             [self.mandate_1, self.mandate_2], self.aidante_fatimah.organisation.pk
         )
 
+        self.__wait_for_progress_page()
         transfer_to_organisation.stop()
 
-        self.assertTrue(
-            self.selenium.current_url.endswith(
-                f"{reverse('otpadmin:aidants_connect_web_mandat_changelist')}"
-            )
-        )
-
         self.assertEqual(
-            self.selenium.find_element(
-                By.CSS_SELECTOR, "ul.messagelist > li.error"
-            ).text.strip(),
-            "Les mandats n'ont pas pu être tansférés à cause d'une erreur.",
+            self.selenium.find_element(By.CSS_SELECTOR, "#content h1").text.strip(),
+            "⚠ Les mandats n'ont pas pu être tansférés à cause d'une erreur.",
         )
 
     @mock.patch("aidants_connect_web.models.Mandat.transfer_to_organisation")
     def test_some_mandates_can_t_be_transferred(self, transfer_to_organisation: Mock):
-        def side_effect(_, ids: Collection):
-            return len(ids) != 0, ids
+        def side_effect(_, ids: Collection, **kwargs):
+            return {str(pk): "Mandat introuvable" for pk in ids}
 
         transfer_to_organisation.side_effect = side_effect
 
@@ -118,14 +111,9 @@ class ViewAutorisationsTests(FunctionalTestCase):
             [self.mandate_1, self.mandate_2], self.aidante_fatimah.organisation.pk
         )
 
+        self.__wait_for_progress_page()
         transfer_to_organisation.stop()
 
-        self.assertTrue(
-            self.selenium.current_url.endswith(
-                f"{reverse('otpadmin:aidants_connect_web_mandat_transfer')}"
-            )
-        )
-
         self.assertEqual(
             self.selenium.find_element(By.CSS_SELECTOR, "#content h1").text.strip(),
             "⚠ Certains mandats n'ont pas pu être "
@@ -133,13 +121,16 @@ class ViewAutorisationsTests(FunctionalTestCase):
         )
 
         mandates = [
-            item.text for item in self.selenium.find_elements(By.TAG_NAME, "li")
+            item.text
+            for item in self.selenium.find_elements(
+                By.CSS_SELECTOR, "#result_list tbody td:nth-child(2)"
+            )
         ]
         self.assertEqual(
             mandates,
             [
-                f"le mandat {self.mandate_1.template_repr},",
-                f"le mandat {self.mandate_2.template_repr}.",
+                f"le mandat {self.mandate_1.template_repr}",
+                f"le mandat {self.mandate_2.template_repr}",
             ],
         )
 
@@ -175,6 +166,13 @@ class ViewAutorisationsTests(FunctionalTestCase):
         field.send_keys(organisation)
         self.selenium.find_element(By.XPATH, "//input[@type='submit']").click()
 
+    def __wait_for_progress_page(self):
+        path = reverse(
+            "otpadmin:aidants_connect_web_mandat_transfer_progress",
+            kwargs={"transfer_id": 0},
+        ).replace("/0/", "/\\d+/")
+        WebDriverWait(self.selenium, 10).until(url_matches(f"^.+{path}$"))
+
     def __login(self):
         field = self.selenium.find_element(By.ID, "id_username")
         field.send_keys(self.aidant_thierry.username)
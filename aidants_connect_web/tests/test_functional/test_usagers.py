@@ -1,4 +1,6 @@
 from selenium.webdriver.common.by import By
+from selenium.webdriver.support.expected_conditions import url_matches
+from selenium.webdriver.support.wait import WebDriverWait
 
 from aidants_connect_common.tests.testcases import FunctionalTestCase
 from aidants_connect_web.tests.factories import (
@@ -62,11 +64,13 @@ class UsagersTest(FunctionalTestCase):
         self.assertEqual(len(user_without_valid_mandate), 1)
 
         self.selenium.find_element(By.ID, "filter-input").send_keys("Anne")
+        self.selenium.find_element(By.ID, "filter-input").submit()
+        WebDriverWait(self.selenium, 10).until(url_matches(r"^.+/usagers/\?q=Anne$"))
 
         anne_result = self.selenium.find_element(
             By.XPATH, "//*[normalize-space()='Anne Cécile Gertrude']"
         )
-        josephine_result = self.selenium.find_element(
+        josephine_results = self.selenium.find_elements(
             By.XPATH, "//*[normalize-space()='Joséphine']"
         )
         corentin_result = self.selenium.find_element(
@@ -74,5 +78,5 @@ class UsagersTest(FunctionalTestCase):
         )
 
         self.assertTrue(anne_result.is_displayed())
-        self.assertFalse(josephine_result.is_displayed())
+        self.assertEqual(josephine_results, [])
         self.assertTrue(corentin_result.is_displayed())
@@ -4,8 +4,11 @@ from unittest.mock import Mock, patch
 from zoneinfo import ZoneInfo
 
 from django.conf import settings
+from django.core.management import call_command
+from django.db import connection
 from django.db.utils import IntegrityError
 from django.test import TestCase, tag
+from django.test.utils import CaptureQueriesContext
 from django.utils import timezone
 
 from django_otp.plugins.otp_totp.models import TOTPDevice
@@ -13,6 +16,7 @@ from freezegun import freeze_time
 
 from aidants_connect_web.models import (
     Aidant,
+    AidantStats,
     Autorisation,
     Connection,
     HabilitationRequest,
@@ -364,6 +368,116 @@ class MandatModelTests(TestCase):
 
         self.assertEqual(mandate.was_explicitly_revoked, True)
 
+    def test_autorisation_state_is_maintained_on_revocation_and_deletion(self):
+        mandate = MandatFactory(
+            organisation=self.aidant_1.organisation,
+            usager=self.usager_1,
+            expiration_date=timezone.now() + timedelta(days=6),
+        )
+        transports = AutorisationFactory(mandat=mandate, demarche="transports")
+        logement = AutorisationFactory(mandat=mandate, demarche="logement")
+        self.assertEqual(mandate.active_autorisation_count, 2)
+        self.assertIsNone(mandate.revoked_at)
+
+        transports.revoke(self.aidant_1)
+        self.assertEqual(mandate.active_autorisation_count, 1)
+        self.assertIsNone(mandate.revoked_at)
+
+        logement.revoke(self.aidant_1)
+        mandate.refresh_from_db()
+        self.assertEqual(mandate.active_autorisation_count, 0)
+        self.assertEqual(mandate.revoked_at, logement.revocation_date)
+        self.assertNotIn(mandate, Mandat.objects.active())
+
+        logement.delete()
+        mandate.refresh_from_db()
+        self.assertEqual(mandate.revoked_at, transports.revocation_date)
+
+    def test_active_queryset_method_does_not_use_distinct(self):
+        self.assertFalse(Mandat.objects.active().query.distinct)
+        self.assertFalse(Usager.objects.active().query.distinct)
+
+    def test_create_with_autorisations_revokes_similar_autorisations(self):
+        previous_mandate = MandatFactory(
+            organisation=self.aidant_1.organisation,
+            usager=self.usager_1,
+            expiration_date=timezone.now() + timedelta(days=6),
+        )
+        previous_papiers = AutorisationFactory(
+            mandat=previous_mandate, demarche="papiers"
+        )
+
+        mandate = Mandat.create_with_autorisations(
+            aidant=self.aidant_1,
+            usager=self.usager_1,
+            demarches=["logement", "papiers"],
+            duree_keyword="LONG",
+            is_remote=False,
+            access_token="test_token",
+        )
+
+        self.assertEqual(mandate.autorisations.active().count(), 2)
+        previous_papiers.refresh_from_db()
+        self.assertTrue(previous_papiers.is_revoked)
+        previous_mandate.refresh_from_db()
+        self.assertEqual(previous_mandate.revoked_at, previous_papiers.revocation_date)
+        self.assertEqual(
+            [
+                (entry.action, entry.demarche)
+                for entry in Journal.objects.filter(aidant=self.aidant_1).order_by("pk")
+            ],
+            [
+                ("create_attestation", "logement,papiers"),
+                ("create_autorisation", "logement"),
+                ("cancel_autorisation", "papiers"),
+                ("create_autorisation", "papiers"),
+            ],
+        )
+
+    def test_create_with_autorisations_query_count_does_not_depend_on_demarches(self):
+        def count_queries(demarches):
+            for demarche in demarches:
+                AutorisationFactory(
+                    mandat=MandatFactory(
+                        organisation=self.aidant_1.organisation,
+                        usager=self.usager_1,
+                        expiration_date=timezone.now() + timedelta(days=6),
+                    ),
+                    demarche=demarche,
+                )
+            with CaptureQueriesContext(connection) as queries:
+                Mandat.create_with_autorisations(
+                    aidant=self.aidant_1,
+                    usager=self.usager_1,
+                    demarches=demarches,
+                    duree_keyword="SHORT",
+                    is_remote=False,
+                    access_token="test_token",
+                )
+            return len(queries)
+
+        self.assertEqual(
+            count_queries(["papiers"]),
+            count_queries(["argent", "famille", "logement", "papiers", "social"]),
+        )
+
+    def test_update_mandats_autorisation_state_command(self):
+        mandate = MandatFactory(
+            organisation=self.aidant_1.organisation,
+            usager=self.usager_1,
+            expiration_date=timezone.now() + timedelta(days=6),
+        )
+        AutorisationFactory(mandat=mandate, demarche="transports")
+        Autorisation.objects.filter(mandat=mandate).update(
+            revocation_date=timezone.now()
+        )
+
+        call_command("update_mandats_autorisation_state", batch_size=1)
+
+        mandate.refresh_from_db()
+        self.assertEqual(mandate.active_autorisation_count, 0)
+        self.assertIsNotNone(mandate.revoked_at)
+
     def test__get_template_path_from_journal_hash_nominal(self):
         tpl_name = "20200511_mandat.html"
         procedures = ["transports", "logement"]
@@ -698,6 +812,65 @@ class OrganisationModelTests(TestCase):
             organisation_address.display_address, organisation_address.address
         )
 
+    def test_department_insee_code_is_guessed_from_zipcode_when_unknown(self):
+        organisation = OrganisationFactory(zipcode="13013")
+        self.assertEqual(organisation.department_insee_code, "13")
+
+        Organisation.objects.filter(pk=organisation.pk).update(
+            department_insee_code=None
+        )
+        organisation.refresh_from_db()
+        organisation.zipcode = "97411"
+        organisation.save(update_fields=["zipcode"])
+        organisation.refresh_from_db()
+        self.assertEqual(organisation.department_insee_code, "974")
+
+        self.assertIsNone(OrganisationFactory(zipcode="0").department_insee_code)
+        # Corsican departments can't be told apart from the zipcode
+        self.assertEqual(
+            OrganisationFactory(zipcode="20000").department_insee_code, "20"
+        )
+
+    def test_department_insee_code_from_address_api_is_kept(self):
+        # Saint-Barthélemy shares the zipcodes of Guadeloupe
+        organisation = OrganisationFactory(zipcode="97133", department_insee_code="977")
+        self.assertEqual(organisation.department_insee_code, "977")
+
+        organisation.zipcode = "97133"
+        organisation.save(update_fields=["zipcode"])
+        organisation.refresh_from_db()
+        self.assertEqual(organisation.department_insee_code, "977")
+
+        self.assertEqual(
+            OrganisationFactory(
+                zipcode="20200", department_insee_code="2B"
+            ).department_insee_code,
+            "2B",
+        )
+
+    def test_department_insee_code_follows_zipcode_changes(self):
+        organisation = OrganisationFactory(zipcode="97133", department_insee_code="977")
+
+        organisation = Organisation.objects.get(pk=organisation.pk)
+        organisation.zipcode = "13013"
+        organisation.save(update_fields=["zipcode"])
+        organisation.refresh_from_db()
+        self.assertEqual(organisation.department_insee_code, "13")
+
+        # Set by the address API along with the zipcode
+        organisation = Organisation.objects.get(pk=organisation.pk)
+        organisation.zipcode = "20200"
+        organisation.department_insee_code = "2B"
+        organisation.save()
+        organisation.refresh_from_db()
+        self.assertEqual(organisation.department_insee_code, "2B")
+
+        organisation = Organisation.objects.get(pk=organisation.pk)
+        organisation.zipcode = "20600"
+        organisation.save()
+        organisation.refresh_from_db()
+        self.assertEqual(organisation.department_insee_code, "2B")
+
     def test_deactivate_organisation(self):
         orga_one = OrganisationFactory(name="L'Internationale")
         orga_two = OrganisationFactory()
@@ -835,6 +1008,43 @@ class OrganisationModelTests(TestCase):
             aidant_c.organisations.set((orga_a, orga_b))
         self.assertEqual(orga_a.num_active_aidants, 5)
 
+    def test_with_counters(self):
+        organisation = OrganisationFactory()
+        for is_active in (True, True, False):
+            AidantFactory(organisation=organisation, is_active=is_active)
+        usager = UsagerFactory()
+        MandatFactory(organisation=organisation, usager=usager)
+        MandatFactory(
+            organisation=organisation,
+            usager=usager,
+            expiration_date=timezone.now() - timedelta(days=6),
+        )
+        MandatFactory(organisation=organisation)
+        OrganisationFactory()
+
+        with self.assertNumQueries(1):
+            counters = {
+                org.pk: (
+                    org.num_active_aidants,
+                    org.num_mandats,
+                    org.num_active_mandats,
+                    org.num_usagers,
+                )
+                for org in Organisation.objects.with_counters()
+            }
+
+        self.assertEqual(counters[organisation.pk], (2, 3, 2, 2))
+        self.assertEqual(
+            [
+                organisation.num_active_aidants,
+                organisation.num_mandats,
+                organisation.num_active_mandats,
+                organisation.num_usagers,
+            ],
+            [2, 3, 2, 2],
+        )
+        self.assertIn((0, 0, 0, 0), counters.values())
+
 
 @tag("models", "aidant")
 class AidantModelTests(TestCase):
@@ -1458,6 +1668,36 @@ class JournalModelTests(TestCase):
         # Aidant connects and first autorisation is created
         self.assertEqual(len(Journal.objects.all()), 2)
 
+    def test_batch_writes_entries_in_one_query(self):
+        with CaptureQueriesContext(connection) as queries:
+            with Journal.batch():
+                first = Journal.log_connection(aidant=self.aidant_thierry)
+                with Journal.batch():
+                    second = Journal.log_franceconnection_usager(
+                        aidant=self.aidant_thierry, usager=self.usager_ned
+                    )
+                self.assertIsNone(first.id)
+                self.assertEqual(len(Journal.objects.all()), 2)
+
+        inserts = [
+            query
+            for query in queries.captured_queries
+            if query["sql"].startswith('INSERT INTO "aidants_connect_web_journal"')
+        ]
+        self.assertEqual(len(inserts), 1)
+        self.assertLess(first.id, second.id)
+        self.assertEqual(len(Journal.objects.all()), 4)
+        self.aidant_thierry.refresh_from_db()
+        self.assertEqual(self.aidant_thierry.last_action_date, second.creation_date)
+
+    def test_batch_writes_nothing_on_error(self):
+        with self.assertRaises(ValueError):
+            with Journal.batch():
+                Journal.log_connection(aidant=self.aidant_thierry)
+                raise ValueError()
+
+        self.assertEqual(len(Journal.objects.all()), 2)
+
     def test_logging_of_aidant_conection(self):
         entry = Journal.log_connection(aidant=self.aidant_thierry)
         self.assertEqual(len(Journal.objects.all()), 3)
@@ -1727,3 +1967,77 @@ class OrganisationDeleteTests(TestCase):
         self.assertEqual(len(Organisation.objects.all()), 1)
         self.assertEqual(len(Mandat.objects.all()), 0)
         self.assertEqual(len(Journal.objects.all()), 4)
+
+
+@tag("models", "aidant")
+class AidantStatsTests(TestCase):
+    def setUp(self):
+        self.aidant = AidantFactory()
+        self.usager = UsagerFactory()
+        self.mandat = MandatFactory(organisation=self.aidant.organisation)
+        self.autorisation = AutorisationFactory(mandat=self.mandat)
+
+    def log_activity(self):
+        with freeze_time("2021-06-01"):
+            Journal.log_connection(aidant=self.aidant)
+        for _ in range(2):
+            Journal.log_attestation_creation(
+                aidant=self.aidant,
+                usager=self.usager,
+                demarches=["argent"],
+                duree=6,
+                is_remote_mandat=False,
+                access_token="",
+                attestation_hash="",
+                mandat=self.mandat,
+            )
+        Journal.log_autorisation_use(
+            aidant=self.aidant,
+            usager=self.usager,
+            demarche="argent",
+            access_token="",
+            autorisation=self.autorisation,
+        )
+        # Not tracked
+        Journal.log_franceconnection_usager(aidant=self.aidant, usager=self.usager)
+
+    def assert_stats(self):
+        stats = AidantStats.objects.get(aidant=self.aidant)
+        last_attestation = Journal.objects.filter(
+            action="create_attestation", aidant=self.aidant
+        ).latest("creation_date")
+        self.assertEqual(stats.mandats_created_count, 2)
+        self.assertEqual(stats.autorisation_use_count, 1)
+        self.assertEqual(
+            stats.last_connection_date,
+            datetime(2021, 6, 1, tzinfo=ZoneInfo("UTC")),
+        )
+        self.assertEqual(stats.last_mandat_date, last_attestation.creation_date)
+
+    def test_stats_are_updated_when_entries_are_written(self):
+        self.log_activity()
+        self.assert_stats()
+
+        # Older entries don't move the last dates back
+        with freeze_time("2020-01-01"):
+            Journal.log_connection(aidant=self.aidant)
+        self.assertEqual(
+            AidantStats.objects.get(aidant=self.aidant).last_connection_date,
+            datetime(2021, 6, 1, tzinfo=ZoneInfo("UTC")),
+        )
+
+    def test_stats_are_updated_by_batches(self):
+        # Entries of a batch are dated when it is written
+        with freeze_time("2021-06-01"), Journal.batch():
+            self.log_activity()
+        self.assert_stats()
+
+    def test_rebuild(self):
+        self.log_activity()
+        AidantStats.objects.all().delete()
+        AidantStats.objects.create(aidant=AidantFactory(), mandats_created_count=3)
+
+        call_command("rebuild_aidant_stats")
+
+        self.assert_stats()
+        self.assertEqual(AidantStats.objects.count(), 1)
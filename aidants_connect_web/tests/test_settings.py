@@ -1,8 +1,9 @@
 import os
 import uuid
+from datetime import datetime, timedelta, timezone
 from unittest import TestCase
 
-from aidants_connect.settings import getenv_bool
+from aidants_connect.settings import getenv_bool, getenv_datetime
 
 
 class Test(TestCase):
@@ -48,3 +49,19 @@ class Test(TestCase):
         os.environ[self.env_key] = "-1"
         self.assertRaises(ValueError, getenv_bool, self.env_key)
         self.assertIs(True, getenv_bool(self.env_key, True))
+
+    def test_getenv_datetime_env_is_not_set(self):
+        self.assertIsNone(getenv_datetime(self.env_key))
+
+    def test_getenv_datetime_aware_value(self):
+        os.environ[self.env_key] = "2026-11-01T00:00+01:00"
+        self.assertEqual(
+            datetime(2026, 11, 1, tzinfo=timezone(timedelta(hours=1))),
+            getenv_datetime(self.env_key),
+        )
+
+    def test_getenv_datetime_invalid_value(self):
+        os.environ[self.env_key] = "2026-11-01T00:00"
+        self.assertRaises(ValueError, getenv_datetime, self.env_key)
+        os.environ[self.env_key] = "not a date"
+        self.assertRaises(ValueError, getenv_datetime, self.env_key)
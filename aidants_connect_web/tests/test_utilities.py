@@ -1,8 +1,19 @@
+from io import StringIO
+from unittest.mock import patch
+
 from django.conf import settings
+from django.core.management import call_command
 from django.test import TestCase, TransactionTestCase, tag
 
+from aidants_connect_web import utilities
 from aidants_connect_web.models import IdGenerator
-from aidants_connect_web.utilities import generate_new_datapass_id, generate_sha256_hash
+from aidants_connect_web.utilities import (
+    MandatTemplateChangedError,
+    generate_file_sha256_hash,
+    generate_new_datapass_id,
+    generate_sha256_hash,
+    get_mandat_template_digest,
+)
 
 
 @tag("utilities")
@@ -22,6 +33,52 @@ class UtilitiesTests(TestCase):
         self.assertEqual(len(generate_sha256_hash("123salt".encode())), 64)
 
 
+@tag("utilities")
+class MandatTemplateDigestTests(TestCase):
+    def setUp(self):
+        utilities._mandat_template_digests.clear()
+
+    def tearDown(self):
+        utilities._mandat_template_digests.clear()
+
+    def test_template_is_hashed_once(self):
+        with patch(
+            "aidants_connect_web.utilities.generate_file_sha256_hash",
+            wraps=generate_file_sha256_hash,
+        ) as hash_mock:
+            digest = get_mandat_template_digest(settings.MANDAT_TEMPLATE_PATH)
+            get_mandat_template_digest(settings.MANDAT_TEMPLATE_PATH)
+
+        hash_mock.assert_called_once()
+        self.assertEqual(
+            digest,
+            generate_file_sha256_hash(f"templates/{settings.MANDAT_TEMPLATE_PATH}"),
+        )
+
+    def test_modified_template_raises(self):
+        get_mandat_template_digest(settings.MANDAT_TEMPLATE_PATH)
+        # Simulates a modification of the file since it was first hashed
+        utilities._mandat_template_digests[settings.MANDAT_TEMPLATE_PATH] = (
+            0,
+            0,
+            "a previous digest",
+        )
+
+        with self.assertRaises(MandatTemplateChangedError):
+            get_mandat_template_digest(settings.MANDAT_TEMPLATE_PATH)
+
+    def test_template_not_matching_recorded_digest_raises(self):
+        with patch(
+            "aidants_connect_web.utilities.load_mandat_template_digests_file",
+            return_value={settings.MANDAT_TEMPLATE_PATH: "a recorded digest"},
+        ):
+            with self.assertRaises(MandatTemplateChangedError):
+                get_mandat_template_digest(settings.MANDAT_TEMPLATE_PATH)
+
+    def test_all_mandat_templates_are_registered_and_unchanged(self):
+        call_command("check_mandat_templates", stdout=StringIO())
+
+
 @tag("utilities")
 class GenerateDatapassIdTests(TransactionTestCase):
     def test_generate_new_datapass_id(self):
@@ -9,8 +9,14 @@ from django.urls import reverse
 
 import jwt
 from freezegun import freeze_time
+from requests.exceptions import Timeout
 
 from aidants_connect_common.utils.constants import AuthorizationDurationChoices
+from aidants_connect_web.fc_handshakes import (
+    end_fs_state,
+    find_fs_connection_id,
+    register_fs_state,
+)
 from aidants_connect_web.models import Connection, Journal, Usager
 from aidants_connect_web.tests.factories import AidantFactory, UsagerFactory
 from aidants_connect_web.utilities import generate_sha256_hash
@@ -35,6 +41,7 @@ class FCAuthorize(TestCase):
         self.client.get("/fc_authorize/")
         connection = Connection.objects.get(pk=1)
         self.assertNotEqual(connection.state, "")
+        self.assertEqual(find_fs_connection_id(connection.state), 1)
 
 
 DATE = datetime(2019, 1, 14, 3, 20, 34, 0, tzinfo=ZoneInfo("Europe/Paris"))
@@ -63,12 +70,14 @@ class FCCallback(TestCase):
             aidant=self.aidant,
             organisation=self.aidant.organisation,
         )
-        Connection.objects.create(
+        another_connection = Connection.objects.create(
             state="test_another_state",
             connection_type="FS",
             nonce="test_another_nonce",
             id=2,
         )
+        register_fs_state(self.connection)
+        register_fs_state(another_connection)
         self.usager_sub_fc = "123"
         self.usager_sub = generate_sha256_hash(
             f"{self.usager_sub_fc}{settings.FC_AS_FI_HASH_SALT}".encode()
@@ -92,6 +101,19 @@ class FCCallback(TestCase):
         )
         self.check_fc_error_with_message(response)
 
+    @freeze_time(date)
+    @mock.patch("aidants_connect_web.views.FC_as_FS.franceconnect.post")
+    def test_state_missing_from_handshake_store_triggers_fc_error(self, mock_post):
+        # Also covers replays: the state is dropped once the connection is complete
+        end_fs_state("test_state")
+
+        response = self.client.get(
+            "/callback/", data={"state": "test_state", "code": "test_code"}
+        )
+
+        self.check_fc_error_with_message(response)
+        mock_post.assert_not_called()
+
     date_expired = DATE + timedelta(seconds=TEST_FC_CONNECTION_AGE + 1)
 
     def check_fc_error_with_message(self, response):
@@ -109,7 +131,7 @@ class FCCallback(TestCase):
         self.check_fc_error_with_message(response)
 
     @freeze_time(date)
-    @mock.patch("aidants_connect_web.views.FC_as_FS.python_request.post")
+    @mock.patch("aidants_connect_web.views.FC_as_FS.franceconnect.post")
     def test_wrong_nonce_when_decoding_returns_403(self, mock_post):
         mock_response = mock.Mock()
         mock_response.status_code = 200
@@ -133,7 +155,16 @@ class FCCallback(TestCase):
         self.check_fc_error_with_message(response)
 
     @freeze_time(date)
-    @mock.patch("aidants_connect_web.views.FC_as_FS.python_request.post")
+    @mock.patch("aidants_connect_web.views.FC_as_FS.franceconnect.post")
+    def test_token_request_failure_triggers_fc_error(self, mock_post):
+        mock_post.side_effect = Timeout()
+        response = self.client.get(
+            "/callback/", data={"state": "test_another_state", "code": "test_code"}
+        )
+        self.check_fc_error_with_message(response)
+
+    @freeze_time(date)
+    @mock.patch("aidants_connect_web.views.FC_as_FS.franceconnect.post")
     @mock.patch("aidants_connect_web.views.FC_as_FS.get_user_info")
     def test_request_existing_user_redirects_to_recap(
         self, mock_get_user_info, mock_post
@@ -197,7 +228,7 @@ class FCCallback(TestCase):
         self.assertEqual(last_journal_entry.action, "franceconnect_usager")
 
     @freeze_time(date)
-    @mock.patch("aidants_connect_web.views.FC_as_FS.python_request.post")
+    @mock.patch("aidants_connect_web.views.FC_as_FS.franceconnect.post")
     @mock.patch("aidants_connect_web.views.FC_as_FS.get_user_info")
     def test_request_new_user_redirects_to_recap(self, mock_get_user_info, mock_post):
         connection_number = 1
@@ -295,7 +326,7 @@ class GetUserInfoTests(TestCase):
             user_phone="0 800 840 800",
         )
 
-    @mock.patch("aidants_connect_web.views.FC_as_FS.python_request.get")
+    @mock.patch("aidants_connect_web.views.FC_as_FS.franceconnect.get")
     def test_well_formatted_new_user_info_outputs_usager(self, mock_get):
         mock_response = mock.Mock()
         mock_response.status_code = 200
@@ -322,7 +353,7 @@ class GetUserInfoTests(TestCase):
         self.assertEqual(usager.preferred_username, "TROIS")
         self.assertIsNone(error)
 
-    @mock.patch("aidants_connect_web.views.FC_as_FS.python_request.get")
+    @mock.patch("aidants_connect_web.views.FC_as_FS.franceconnect.get")
     def test_badly_formatted_new_user_info_outputs_error(self, mock_get):
         mock_response = mock.Mock()
         mock_response.status_code = 200
@@ -345,7 +376,7 @@ class GetUserInfoTests(TestCase):
         self.assertIsNone(usager)
         self.assertIn("The FranceConnect ID is not complete:", error)
 
-    @mock.patch("aidants_connect_web.views.FC_as_FS.python_request.get")
+    @mock.patch("aidants_connect_web.views.FC_as_FS.franceconnect.get")
     def test_empty_response_does_not_fail_badly(self, mock_get):
         mock_response = mock.Mock()
         mock_response.status_code = 200
@@ -357,7 +388,7 @@ class GetUserInfoTests(TestCase):
         self.assertIsNone(usager)
         self.assertIn("Unable to find sub in FC user info", error)
 
-    @mock.patch("aidants_connect_web.views.FC_as_FS.python_request.get")
+    @mock.patch("aidants_connect_web.views.FC_as_FS.franceconnect.get")
     def test_formatted_new_user_without_birthplace_outputs_usager(self, mock_get):
         mock_response = mock.Mock()
         mock_response.status_code = 200
@@ -382,7 +413,7 @@ class GetUserInfoTests(TestCase):
         self.assertEqual(usager.given_name, "Fabrice")
         self.assertIsNone(error)
 
-    @mock.patch("aidants_connect_web.views.FC_as_FS.python_request.get")
+    @mock.patch("aidants_connect_web.views.FC_as_FS.franceconnect.get")
     def test_formatted_existing_user_with_email_change_outputs_usager(self, mock_get):
         mock_response = mock.Mock()
         mock_response.status_code = 200
@@ -413,7 +444,7 @@ class GetUserInfoTests(TestCase):
         last_journal_entry = Journal.objects.last()
         self.assertEqual(last_journal_entry.action, "update_email_usager")
 
-    @mock.patch("aidants_connect_web.views.FC_as_FS.python_request.get")
+    @mock.patch("aidants_connect_web.views.FC_as_FS.franceconnect.get")
     def test_formatted_existing_user_with_phone_change_outputs_usager(self, mock_get):
         mock_response = mock.Mock()
         mock_response.status_code = 200
@@ -1,7 +1,9 @@
 from django.conf import settings
 from django.contrib.auth.models import AnonymousUser
+from django.db import connection
 from django.test import RequestFactory, TestCase, tag
 from django.test.client import Client
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
 from admin_honeypot.models import LoginAttempt
@@ -30,6 +32,8 @@ from aidants_connect_web.tests.factories import (
     AidantFactory,
     CarteTOTPFactory,
     HabilitationRequestFactory,
+    MandatFactory,
+    OrganisationFactory,
     TOTPDeviceFactory,
     UsagerFactory,
 )
@@ -238,6 +242,54 @@ class JournalAdminPageTests(TestCase):
         cls.assertEqual(response.status_code, 403)
 
 
+@tag("admin")
+class OrganisationAdminPageTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.atac_user = AidantFactory(
+            is_staff=True,
+            is_superuser=True,
+        )
+        cls.atac_device = StaticDevice.objects.create(user=cls.atac_user, name="Device")
+        cls.url = reverse("admin:aidants_connect_web_organisation_changelist")
+
+    def setUp(self):
+        self.atac_client = Client()
+        self.atac_client.force_login(self.atac_user)
+        atac_session = self.atac_client.session
+        atac_session[DEVICE_ID_SESSION_KEY] = self.atac_device.persistent_id
+        atac_session.save()
+
+    def create_organisations(self, count):
+        for _ in range(count):
+            organisation = OrganisationFactory()
+            AidantFactory(organisation=organisation)
+            MandatFactory(organisation=organisation)
+
+    def test_changelist_runs_a_constant_number_of_queries(self):
+        self.create_organisations(2)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.atac_client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+
+        self.create_organisations(5)
+        with self.assertNumQueries(len(queries)):
+            response = self.atac_client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+
+    def test_changelist_can_be_sorted_by_counters(self):
+        busy_organisation = OrganisationFactory(name="Busy")
+        for _ in range(3):
+            MandatFactory(organisation=busy_organisation)
+        OrganisationFactory(name="Quiet")
+
+        # Index of the counter of mandates in `list_display`, after the checkbox
+        response = self.atac_client.get(self.url, {"o": "-6"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context["cl"].result_list[0].pk, busy_organisation.pk)
+        self.assertEqual(response.context["cl"].result_list[0].num_mandats, 3)
+
+
 @tag("admin")
 class UsagerAdminPageTests(TestCase):
     @classmethod
@@ -101,7 +101,8 @@ class OrganisationDatapass(DatapassMixin, TestCase):
             self.assertEqual(response.status_code, 400)
 
     def test_good_data_creates_email(self):
-        self.datapass_request(data=self.good_data_from_datapass)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.datapass_request(data=self.good_data_from_datapass)
 
         self.assertEqual(len(mail.outbox), 1)
         email = mail.outbox[0]
@@ -236,6 +236,7 @@ class MandatCancellationConfirmPageTests(TestCase):
             f"/mandats/{self.valid_mandat.id}/cancel_success",
             fetch_redirect_response=False,
         )
+        self.valid_mandat.refresh_from_db()
         self.assertFalse(self.valid_mandat.is_active)
 
     def test_incomplete_post_triggers_error(self):
@@ -37,9 +37,10 @@ class EspaceResponsableRemoveAidantOrganisationsTest(TestCase):
         self.client.force_login(responsable)
 
         self.assertEqual(len(aidant.organisations.all()), 3)
-        response = self.client.post(
-            self.get_form_url(aidant, responsable.organisation),
-        )
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                self.get_form_url(aidant, responsable.organisation),
+            )
         self.assertRedirects(
             response, self.get_organisation_url(responsable.organisation)
         )
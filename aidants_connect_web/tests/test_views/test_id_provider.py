@@ -13,6 +13,7 @@ from django.utils import timezone
 
 from freezegun import freeze_time
 
+from aidants_connect_web.fc_handshakes import get_fi_handshake, start_fi_handshake
 from aidants_connect_web.models import Aidant, Connection, Journal, Usager
 from aidants_connect_web.tests.factories import (
     AidantFactory,
@@ -20,6 +21,7 @@ from aidants_connect_web.tests.factories import (
     MandatFactory,
     UsagerFactory,
 )
+from aidants_connect_web.utilities import generate_token_digest
 from aidants_connect_web.views import id_provider
 
 
@@ -71,11 +73,13 @@ class AuthorizeTests(TestCase):
         date_further_away_minus_one_hour = datetime(
             2019, 1, 9, 8, tzinfo=ZoneInfo("Europe/Paris")
         )
-        cls.connection = Connection.objects.create(
-            state="test_expiration_date_triggered",
-            nonce="avalidnonce456",
-            usager=cls.usager,
-            expires_on=date_further_away_minus_one_hour,
+        cls.connection_id = start_fi_handshake(
+            Connection(
+                state="test_expiration_date_triggered",
+                nonce="avalidnonce456",
+                usager=cls.usager,
+                expires_on=date_further_away_minus_one_hour,
+            )
         )
 
     def test_authorize_url_triggers_the_authorize_view(self):
@@ -188,33 +192,53 @@ class AuthorizeTests(TestCase):
             },
         )
 
-        self.assertIsInstance(response.context["connection_id"], int)
+        self.assertIsInstance(response.context["connection_id"], str)
         self.assertIsInstance(response.context["usagers"], QuerySet)
         self.assertEqual(len(response.context["usagers"]), 1)
         self.assertIsInstance(response.context["aidant"], Aidant)
 
+    def test_authorize_does_not_persist_the_connection(self):
+        self.client.force_login(self.aidant_thierry)
+
+        response = self.client.get(
+            "/authorize/",
+            data={
+                "state": "avalidstate123",
+                "nonce": "avalidnonce456",
+                "response_type": "code",
+                "client_id": settings.FC_AS_FI_ID,
+                "redirect_uri": settings.FC_AS_FI_CALLBACK_URL,
+                "scope": "openid profile email address phone birth",
+                "acr_values": "eidas1",
+            },
+        )
+
+        self.assertEqual(Connection.objects.count(), 0)
+        connection = get_fi_handshake(response.context["connection_id"])
+        self.assertEqual(connection.state, "avalidstate123")
+        self.assertEqual(connection.nonce, "avalidnonce456")
+
     def test_sending_user_information_triggers_callback(self):
         self.client.force_login(self.aidant_thierry)
 
-        connection = Connection.objects.create(
-            state="avalidstate123", nonce="avalidnonce456", usager=self.usager
+        connection_id = start_fi_handshake(
+            Connection(state="avalidstate123", nonce="avalidnonce456")
         )
 
         response = self.client.post(
             "/authorize/",
             data={
-                "connection_id": connection.id,
-                "chosen_usager": connection.usager.id,
+                "connection_id": connection_id,
+                "chosen_usager": self.usager.id,
             },
         )
 
-        saved_items = Connection.objects.all().order_by("pk")
-        self.assertEqual(saved_items.count(), 2)
-        connection = saved_items[1]
+        self.assertEqual(Connection.objects.count(), 0)
+        connection = get_fi_handshake(connection_id)
         self.assertEqual(connection.usager.sub, "123")
         self.assertNotEqual(connection.nonce, "No Nonce Provided")
 
-        url = reverse("fi_select_demarche") + "?connection_id=" + str(connection.id)
+        url = reverse("fi_select_demarche") + "?connection_id=" + connection_id
         self.assertRedirects(response, url, fetch_redirect_response=False)
 
     date_further_away = datetime(2019, 1, 9, 9, tzinfo=ZoneInfo("Europe/Paris"))
@@ -226,7 +250,7 @@ class AuthorizeTests(TestCase):
         self.client.force_login(self.aidant_thierry)
         response = self.client.post(
             "/authorize/",
-            data={"connection_id": self.connection.id, "chosen_usager": 1},
+            data={"connection_id": self.connection_id, "chosen_usager": 1},
         )
         self.assertEqual(response.status_code, 408)
 
@@ -234,7 +258,7 @@ class AuthorizeTests(TestCase):
         self.client.force_login(self.aidant_thierry)
         response = self.client.post(
             "/authorize/",
-            data={"connection_id": (self.connection.id + 1), "chosen_usager": 1},
+            data={"connection_id": "unknown", "chosen_usager": 1},
         )
         self.assertEqual(response.status_code, 403)
 
@@ -249,20 +273,6 @@ class FISelectDemarcheTests(TestCase):
             organisation=cls.aidant_thierry.organisation,
         )
         cls.usager = UsagerFactory(given_name="Joséphine")
-        cls.connection = Connection.objects.create(
-            state="avalidstate123",
-            nonce="avalidnonce456",
-            usager=cls.usager,
-        )
-        date_further_away_minus_one_hour = datetime(
-            2019, 1, 9, 8, tzinfo=ZoneInfo("Europe/Paris")
-        )
-        cls.connection_2 = Connection.objects.create(
-            state="test_expiration_date_triggered",
-            nonce="test_nonce",
-            usager=cls.usager,
-            expires_on=date_further_away_minus_one_hour,
-        )
         mandat_creation_date = datetime(
             2019, 1, 5, 3, 20, 34, 0, tzinfo=ZoneInfo("Europe/Paris")
         )
@@ -293,6 +303,23 @@ class FISelectDemarcheTests(TestCase):
             demarche="logement",
         )
 
+    def setUp(self):
+        self.connection_id = start_fi_handshake(
+            Connection(
+                state="avalidstate123",
+                nonce="avalidnonce456",
+                usager=self.usager,
+            )
+        )
+        self.connection_2_id = start_fi_handshake(
+            Connection(
+                state="test_expiration_date_triggered",
+                nonce="test_nonce",
+                usager=self.usager,
+                expires_on=datetime(2019, 1, 9, 8, tzinfo=ZoneInfo("Europe/Paris")),
+            )
+        )
+
     def test_FI_select_demarche_url_triggers_the_fi_select_demarche_view(self):
         self.client.force_login(self.aidant_thierry)
         found = resolve("/select_demarche/")
@@ -301,7 +328,7 @@ class FISelectDemarcheTests(TestCase):
     def test_FI_select_demarche_triggers_FI_select_demarche_template(self):
         self.client.force_login(self.aidant_thierry)
         response = self.client.get(
-            "/select_demarche/", data={"connection_id": self.connection.id}
+            "/select_demarche/", data={"connection_id": self.connection_id}
         )
         self.assertTemplateUsed(
             response, "aidants_connect_web/id_provider/fi_select_demarche.html"
@@ -313,7 +340,7 @@ class FISelectDemarcheTests(TestCase):
     def test_get_demarches_for_one_usager_and_two_autorisations(self):
         self.client.force_login(self.aidant_thierry)
         response = self.client.get(
-            "/select_demarche/", data={"connection_id": self.connection.id}
+            "/select_demarche/", data={"connection_id": self.connection_id}
         )
         demarches = response.context["demarches"]
         autorisations = [demarche for demarche in demarches]
@@ -327,16 +354,35 @@ class FISelectDemarcheTests(TestCase):
         self.client.force_login(self.aidant_thierry)
         response = self.client.post(
             "/select_demarche/",
-            data={"connection_id": self.connection.id, "chosen_demarche": "famille"},
+            data={"connection_id": self.connection_id, "chosen_demarche": "famille"},
         )
         self.assertEqual(response.status_code, 302)
 
+    @freeze_time(date_close)
+    def test_post_to_select_demarche_persists_complete_connection(self):
+        self.client.force_login(self.aidant_thierry)
+        connection_id = start_fi_handshake(
+            Connection(
+                state="avalidstate789", nonce="avalidnonce789", usager=self.usager
+            )
+        )
+        self.client.post(
+            "/select_demarche/",
+            data={"connection_id": connection_id, "chosen_demarche": "famille"},
+        )
+
+        connection = Connection.objects.get(state="avalidstate789")
+        self.assertTrue(connection.complete)
+        self.assertEqual(connection.aidant, self.aidant_thierry)
+        self.assertEqual(connection.demarche, "famille")
+        self.assertIsNone(get_fi_handshake(connection_id))
+
     @freeze_time(date_close)
     def test_with_another_aidant_from_the_organisation(self):
         self.client.force_login(self.aidant_yasmina)
         response = self.client.post(
             "/select_demarche/",
-            data={"connection_id": self.connection.id, "chosen_demarche": "famille"},
+            data={"connection_id": self.connection_id, "chosen_demarche": "famille"},
         )
         self.assertEqual(response.status_code, 302)
 
@@ -346,7 +392,7 @@ class FISelectDemarcheTests(TestCase):
     def test_expired_autorisation_does_not_appear(self):
         self.client.force_login(self.aidant_thierry)
         response = self.client.get(
-            "/select_demarche/", data={"connection_id": self.connection.id}
+            "/select_demarche/", data={"connection_id": self.connection_id}
         )
         demarches = response.context["demarches"]
         autorisations = [demarche for demarche in demarches]
@@ -360,7 +406,7 @@ class FISelectDemarcheTests(TestCase):
         self.client.force_login(self.aidant_thierry)
         response = self.client.post(
             "/select_demarche/",
-            data={"connection_id": self.connection.id, "chosen_demarche": "logement"},
+            data={"connection_id": self.connection_id, "chosen_demarche": "logement"},
         )
         self.assertEqual(response.status_code, 403)
 
@@ -369,7 +415,7 @@ class FISelectDemarcheTests(TestCase):
         self.client.force_login(self.aidant_thierry)
         response = self.client.post(
             "/select_demarche/",
-            data={"connection_id": self.connection_2.id, "chosen_demarche": "famille"},
+            data={"connection_id": self.connection_2_id, "chosen_demarche": "famille"},
         )
         self.assertEqual(response.status_code, 408)
 
@@ -379,7 +425,7 @@ class FISelectDemarcheTests(TestCase):
         response = self.client.post(
             "/select_demarche/",
             data={
-                "connection_id": (self.connection_2.id + 1),
+                "connection_id": "unknown",
                 "chosen_demarche": "famille",
             },
         )
@@ -402,13 +448,13 @@ class TokenTests(TestCase):
     @classmethod
     def setUpTestData(cls):
         cls.code = "test_code"
-        cls.code_hash = make_password(cls.code, settings.FC_AS_FI_HASH_SALT)
+        cls.code_hash = generate_token_digest(cls.code)
         cls.usager = UsagerFactory(given_name="Joséphine")
         cls.usager.sub = "avalidsub789"
         cls.usager.save()
         cls.connection = Connection()
         cls.connection.state = "avalidstate123"
-        cls.connection.code = cls.code_hash
+        cls.connection.code_digest = cls.code_hash
         cls.connection.nonce = "avalidnonce456"
         cls.connection.usager = cls.usager
         cls.connection.expires_on = datetime(
@@ -441,10 +487,10 @@ class TokenTests(TestCase):
         response_content = response.content.decode("utf-8")
         self.assertEqual(response.status_code, 200)
         response_json = json.loads(response_content)
-        response_json["access_token"] = make_password(
-            response_json["access_token"], settings.FC_AS_FI_HASH_SALT
+        response_json["access_token"] = generate_token_digest(
+            response_json["access_token"]
         )
-        connection = Connection.objects.get(code=self.code_hash)
+        connection = Connection.objects.get(code_digest=self.code_hash)
         awaited_response = {
             "access_token": connection.access_token,
             "expires_in": 3600,
@@ -489,6 +535,57 @@ class TokenTests(TestCase):
         response = self.client.post("/token/", fc_request)
         self.assertEqual(response.status_code, 403)
 
+    def create_legacy_connection(self):
+        return Connection.objects.create(
+            state="avalidstate456",
+            code=make_password("legacy_code", settings.FC_AS_FI_HASH_SALT),
+            nonce="avalidnonce789",
+            usager=self.usager,
+            complete=True,
+            expires_on=datetime(
+                2012, 1, 14, 3, 21, 34, tzinfo=ZoneInfo("Europe/Paris")
+            ),
+        )
+
+    @freeze_time(date)
+    @override_settings(
+        FC_AS_FI_LEGACY_TOKEN_HASHES_UNTIL=datetime(
+            2012, 1, 14, 3, 30, tzinfo=ZoneInfo("Europe/Paris")
+        )
+    )
+    def test_connection_issued_with_legacy_hash_is_found(self):
+        self.create_legacy_connection()
+        fc_request = dict(self.fc_request)
+        fc_request["code"] = "legacy_code"
+
+        response = self.client.post("/token/", fc_request)
+        self.assertEqual(response.status_code, 200)
+
+        connection = Connection.objects.get(state="avalidstate456")
+        self.assertEqual(
+            connection.access_token_digest,
+            generate_token_digest(response.json()["access_token"]),
+        )
+
+    @freeze_time(date)
+    @override_settings(
+        FC_AS_FI_LEGACY_TOKEN_HASHES_UNTIL=datetime(
+            2012, 1, 14, 3, 0, tzinfo=ZoneInfo("Europe/Paris")
+        )
+    )
+    def test_legacy_hashes_are_not_searched_after_cutoff(self):
+        self.create_legacy_connection()
+        fc_request = dict(self.fc_request)
+        fc_request["code"] = "legacy_code"
+
+        with mock.patch(
+            "aidants_connect_web.models.make_password"
+        ) as make_password_mock:
+            response = self.client.post("/token/", fc_request)
+
+        self.assertEqual(response.status_code, 403)
+        make_password_mock.assert_not_called()
+
     def test_missing_parameters_triggers_bad_request(self):
         for parameter in self.fc_request:
             bad_request = dict(self.fc_request)
@@ -539,15 +636,14 @@ class UserInfoTests(TestCase):
         )
 
         cls.access_token = "test_access_token"
-        cls.access_token_hash = make_password(
-            cls.access_token, settings.FC_AS_FI_HASH_SALT
-        )
+        cls.access_token_hash = generate_token_digest(cls.access_token)
         cls.connection = Connection.objects.create(
             state="avalidstate123",
             code="test_code",
             nonce="avalidnonde456",
             usager=cls.usager,
             access_token=cls.access_token_hash,
+            access_token_digest=cls.access_token_hash,
             expires_on=datetime(
                 2012, 1, 14, 3, 21, 34, 0, tzinfo=ZoneInfo("Europe/Paris")
             ),
@@ -623,6 +719,15 @@ class UserInfoTests(TestCase):
         )
         self.assertEqual(response.status_code, 403)
 
+    @freeze_time(date)
+    def test_well_formatted_access_token_costs_a_single_lookup(self):
+        # Connection lookup, then the journal entry with its aidant and stats updates
+        with self.assertNumQueries(4):
+            response = self.client.get(
+                "/userinfo/", **{"HTTP_AUTHORIZATION": f"Bearer {self.access_token}"}
+            )
+        self.assertEqual(response.status_code, 200)
+
 
 @tag("id_provider")
 class EndSessionEndpointTests(TestCase):
@@ -653,15 +758,14 @@ class EndSessionEndpointTests(TestCase):
         )
 
         cls.access_token = "test_access_token"
-        cls.access_token_hash = make_password(
-            cls.access_token, settings.FC_AS_FI_HASH_SALT
-        )
+        cls.access_token_hash = generate_token_digest(cls.access_token)
         cls.connection = Connection.objects.create(
             state="avalidstate123",
             code="test_code",
             nonce="avalidnonde456",
             usager=cls.usager,
             access_token=cls.access_token_hash,
+            access_token_digest=cls.access_token_hash,
             expires_on=datetime(
                 2012, 1, 14, 3, 21, 34, 0, tzinfo=ZoneInfo("Europe/Paris")
             ),
@@ -1,19 +1,22 @@
 from datetime import datetime, timedelta
+from unittest import mock
 from zoneinfo import ZoneInfo
 
 from django.conf import settings
 from django.contrib import messages as django_messages
 from django.test import TestCase, override_settings, tag
 from django.test.client import Client
-from django.urls import resolve
+from django.urls import resolve, reverse
 from django.utils import timezone
 
 from freezegun import freeze_time
 
 from aidants_connect_web.forms import MandatForm
 from aidants_connect_web.models import Autorisation, Connection, Journal, Usager
+from aidants_connect_web.qrcodes import get_empty_qrcode
 from aidants_connect_web.tests.factories import (
     AidantFactory,
+    AttestationJournalFactory,
     MandatFactory,
     OrganisationFactory,
     UsagerFactory,
@@ -600,6 +603,90 @@ class GenerateAttestationTests(TestCase):
         response = self.client.get("/creation_mandat/qrcode/")
         self.assertEqual(response.status_code, 200)
 
+    def test_autorisation_qrcode_is_revalidated(self):
+        self.client.force_login(self.aidant_thierry)
+
+        response = self.client.get("/creation_mandat/qrcode/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "image/png")
+        self.assertIn("no-cache", response["Cache-Control"])
+
+        response = self.client.get(
+            "/creation_mandat/qrcode/", HTTP_IF_NONE_MATCH=response["ETag"]
+        )
+        self.assertEqual(response.status_code, 304)
+
+    def test_attestation_qrcode_image_is_immutable(self):
+        self.client.force_login(self.aidant_thierry)
+        attestation_hash = "a" * 64
+
+        response = self.client.get(f"/attestation/qrcode/{attestation_hash}.png")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "image/png")
+        self.assertIn("immutable", response["Cache-Control"])
+
+        response = self.client.get(
+            f"/attestation/qrcode/{attestation_hash}.png",
+            HTTP_IF_NONE_MATCH=response["ETag"],
+        )
+        self.assertEqual(response.status_code, 304)
+
+        response = self.client.get("/attestation/qrcode/not_a_hash.png")
+        self.assertEqual(response.status_code, 404)
+
+    @mock.patch("aidants_connect_web.qrcodes.finders.find", return_value=None)
+    def test_empty_qrcode_falls_back_to_a_blank_image(self, _):
+        image = get_empty_qrcode.__wrapped__()
+        self.assertTrue(image.startswith(b"\x89PNG"))
+
+    def test_attestation_qrcode_svg_is_immutable(self):
+        self.client.force_login(self.aidant_thierry)
+        attestation_hash = "a" * 64
+
+        response = self.client.get(f"/attestation/qrcode/{attestation_hash}.svg")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "image/svg+xml")
+        self.assertTrue(response.content.startswith(b"<svg"))
+        self.assertIn("immutable", response["Cache-Control"])
+
+        png_response = self.client.get(f"/attestation/qrcode/{attestation_hash}.png")
+        self.assertNotEqual(response["ETag"], png_response["ETag"])
+
+        response = self.client.get(
+            f"/attestation/qrcode/{attestation_hash}.svg",
+            HTTP_IF_NONE_MATCH=response["ETag"],
+        )
+        self.assertEqual(response.status_code, 304)
+
+    def test_autorisation_qrcode_redirects_to_immutable_image(self):
+        mandat = MandatFactory(
+            organisation=self.aidant_thierry.organisation,
+            usager=self.test_usager,
+        )
+        attestation_hash = "b" * 64
+        AttestationJournalFactory(
+            aidant=self.aidant_thierry,
+            organisation=self.aidant_thierry.organisation,
+            usager=self.test_usager,
+            mandat=mandat,
+            attestation_hash=attestation_hash,
+        )
+
+        self.client.force_login(self.aidant_thierry)
+        session = self.client.session
+        session["qr_code_mandat_id"] = mandat.pk
+        session.save()
+
+        response = self.client.get("/creation_mandat/qrcode/")
+        self.assertRedirects(
+            response,
+            reverse(
+                "attestation_qrcode_image",
+                kwargs={"attestation_hash": attestation_hash, "image_format": "png"},
+            ),
+        )
+        self.assertIn("no-cache", response["Cache-Control"])
+
     def test_response_is_the_print_page(self):
         self.client.force_login(self.aidant_thierry)
 
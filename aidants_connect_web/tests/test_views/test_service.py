@@ -1,7 +1,10 @@
 import os
 from datetime import datetime
+from unittest import mock
 
 from django.conf import settings
+from django.core.cache import cache
+from django.core.management import call_command
 from django.test import TestCase, tag
 from django.test.client import Client
 from django.urls import resolve
@@ -9,7 +12,8 @@ from django.utils import timezone
 
 from freezegun import freeze_time
 
-from aidants_connect_web.models import Journal, Organisation
+from aidants_connect_web.models import Journal, Organisation, StatisticsSnapshot
+from aidants_connect_web.tasks import refresh_statistics_snapshot
 from aidants_connect_web.tests.factories import (
     AidantFactory,
     AutorisationFactory,
@@ -247,6 +251,8 @@ class StatistiquesTests(TestCase):
             creation_date=datetime(year=2000, month=1, day=1, tzinfo=timezone.utc)
         )
 
+        StatisticsSnapshot.take()
+
     def test_stats_url_triggers_the_statistiques_view(self):
         found = resolve("/stats/")
         self.assertEqual(found.func, service.statistiques)
@@ -292,6 +298,44 @@ class StatistiquesTests(TestCase):
         self.assertEqual(response.context["demarches_count"][0]["value"], 3)
         self.assertEqual(response.context["demarches_count"][1]["value"], 0)
 
+    def test_stats_are_read_from_the_latest_snapshot(self):
+        StatisticsSnapshot.take()
+        snapshot = StatisticsSnapshot.take()
+        self.assertEqual(StatisticsSnapshot.objects.count(), 1)
+
+        with self.assertNumQueries(1):
+            response = self.client.get("/stats/")
+
+        self.assertEqual(response.context["mandats_count"], snapshot.mandats_count)
+        self.assertEqual(response.context["snapshot_date"], snapshot.creation_date)
+        self.assertEqual(response["Cache-Control"], "public, max-age=3600")
+        self.assertIn("Last-Modified", response)
+
+    @mock.patch("aidants_connect_web.views.service.refresh_statistics_snapshot")
+    def test_first_snapshot_is_taken_in_the_background(self, refresh_task):
+        StatisticsSnapshot.objects.all().delete()
+        cache.delete("statistics_snapshot_scheduled")
+
+        response = self.client.get("/stats/")
+        self.client.get("/stats/")
+
+        refresh_task.delay.assert_called_once_with(only_if_missing=True)
+        self.assertFalse(StatisticsSnapshot.objects.exists())
+        self.assertTrue(response.context["snapshot_pending"])
+        self.assertEqual(response.context["mandats_count"], 0)
+        self.assertIn("no-cache", response["Cache-Control"])
+
+    def test_refresh_statistics_snapshot_only_if_missing(self):
+        snapshot = StatisticsSnapshot.objects.get()
+        self.assertIsNone(refresh_statistics_snapshot(only_if_missing=True))
+        self.assertEqual(StatisticsSnapshot.objects.get(), snapshot)
+
+    def test_refresh_statistics_snapshot_command(self):
+        call_command("refresh_statistics_snapshot")
+        snapshot = StatisticsSnapshot.objects.get()
+        self.assertEqual(snapshot.autorisation_use_count, 3)
+        self.assertEqual(snapshot.demarches_count, {"justice": 3})
+
 
 @tag("service")
 class MentionsLegalesTests(TestCase):
@@ -1,6 +1,6 @@
 from datetime import timedelta
 
-from django.test import TestCase, tag
+from django.test import TestCase, override_settings, tag
 from django.urls import reverse
 from django.utils import timezone
 
@@ -15,6 +15,7 @@ from aidants_connect_web.tests.factories import (
 from aidants_connect_web.views.usagers import (
     _get_mandats_for_usagers_index,
     _get_usagers_dict_from_mandats,
+    _get_usagers_for_usagers_index,
 )
 
 
@@ -176,6 +177,72 @@ class ViewAutorisationsTests(TestCase):
             usagers_without_valid_mandate, {self.usager_alice, self.usager_philomene}
         )
 
+    def test__get_usagers_dict_from_mandats_query_count(self):
+        for _ in range(5):
+            mandat = MandatFactory(
+                organisation=self.aidant.organisation,
+                expiration_date=timezone.now() + timedelta(days=10),
+            )
+            AutorisationFactory(mandat=mandat, demarche="famille")
+            AutorisationFactory(mandat=mandat, demarche="papiers")
+
+        # One query for the mandates and their usagers, one for the autorisations,
+        # whatever the number of mandates
+        with self.assertNumQueries(2):
+            usagers = _get_usagers_dict_from_mandats(
+                _get_mandats_for_usagers_index(self.aidant)
+            )
+        self.assertEqual(9, usagers["total"])
+
+    @override_settings(USAGERS_INDEX_PAGE_SIZE=2)
+    def test_usagers_index_is_paginated(self):
+        self.client.force_login(self.aidant)
+        response = self.client.get(reverse("usagers"), data={"page": 2})
+
+        usagers_dict = response.context["usagers_dict"]
+        self.assertEqual(4, usagers_dict["total"])
+        self.assertEqual({}, usagers_dict["with_valid_mandate"])
+        self.assertSetEqual(
+            set(usagers_dict["without_valid_mandate"].keys()),
+            {self.usager_alice, self.usager_philomene},
+        )
+        self.assertEqual(2, response.context["page"].paginator.num_pages)
+
+    def test__get_usagers_for_usagers_index(self):
+        self.assertEqual(
+            list(_get_usagers_for_usagers_index(self.aidant)),
+            [
+                self.usager_corentin,
+                self.usager_josephine,
+                self.usager_alice,
+                self.usager_philomene,
+            ],
+        )
+        self.assertEqual(
+            list(_get_usagers_for_usagers_index(self.aidant, "dupont")),
+            [self.usager_corentin, self.usager_josephine],
+        )
+
+    def test__get_mandats_for_usagers_index_of_some_usagers(self):
+        mandats = _get_mandats_for_usagers_index(
+            self.aidant, usagers=[self.usager_josephine]
+        )
+        self.assertEqual(
+            list(mandats),
+            [self.mandat_aidant_josephine_1, self.mandat_aidant_josephine_6],
+        )
+
+    def test_usagers_index_search(self):
+        self.client.force_login(self.aidant)
+        response = self.client.get(reverse("usagers"), data={"q": "Astro"})
+
+        usagers_dict = response.context["usagers_dict"]
+        self.assertEqual(4, usagers_dict["total"])
+        self.assertEqual(
+            list(usagers_dict["with_valid_mandate"].keys()), [self.usager_corentin]
+        )
+        self.assertEqual({}, usagers_dict["without_valid_mandate"])
+
 
 @tag("usagers")
 class ViewCancelMandatTests(TestCase):
@@ -1,4 +1,4 @@
-from django.urls import path
+from django.urls import path, re_path
 
 from magicauth.urls import urlpatterns as magicauth_urls
 
@@ -110,6 +110,11 @@ urlpatterns = [
         mandat.attestation_qrcode,
         name="new_attestation_qrcode",
     ),
+    re_path(
+        r"^attestation/qrcode/(?P<attestation_hash>[0-9a-f]{64})\.(?P<image_format>png|svg)$",  # noqa
+        mandat.attestation_qrcode_image,
+        name="attestation_qrcode_image",
+    ),
     # id_provider
     path("authorize/", id_provider.authorize, name="authorize"),
     path("token/", id_provider.token, name="token"),
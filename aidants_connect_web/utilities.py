@@ -1,13 +1,18 @@
 import hashlib
 import io
+import json
+import os
 from datetime import date, datetime
+from functools import lru_cache
 from pathlib import Path
-from typing import TYPE_CHECKING, Optional, Union
+from threading import Lock
+from typing import TYPE_CHECKING, Dict, Iterable, Optional, Tuple, Union
 from urllib.parse import quote, urlencode
 
 from django.conf import settings
 from django.db import transaction
 from django.db.models import F
+from django.utils.crypto import salted_hmac
 
 import qrcode
 
@@ -43,6 +48,21 @@ def generate_sha256_hash(value: bytes):
     return hashlib.sha256(value).hexdigest()
 
 
+def generate_token_digest(token: str) -> str:
+    """
+    Generate a keyed digest (HMAC-SHA256) of a token issued by Aidants Connect
+    as a FranceConnect identity provider (authorization code or access token).
+
+    Unlike `make_password`, this is cheap to compute and deterministic, so the
+    digest can be stored in an indexed column and used to find the connection.
+    :param token: str
+    :return: a hash (string) of 64 characters
+    """
+    return salted_hmac(
+        settings.FC_AS_FI_HASH_SALT, token, algorithm="sha256"
+    ).hexdigest()
+
+
 def generate_file_sha256_hash(filename):
     """
     Generate a SHA-256 hash of a file
@@ -55,6 +75,69 @@ def generate_file_sha256_hash(filename):
         return file_readable_hash
 
 
+MANDAT_TEMPLATE_DIGESTS_FILE = Path(__file__).resolve().parent / "mandat_templates.json"
+
+
+class MandatTemplateChangedError(RuntimeError):
+    """A mandate template was modified on disk.
+
+    Mandate templates are immutable by design: the template hash is part of every
+    attestation hash and is used to find which template a mandate was signed with.
+    """
+
+
+# Maps a template path to `(mtime_ns, size, digest)`
+_mandat_template_digests = {}
+_mandat_template_digests_lock = Lock()
+
+
+def load_mandat_template_digests_file() -> dict:
+    try:
+        with open(MANDAT_TEMPLATE_DIGESTS_FILE) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def get_mandat_template_digest(mandat_template_path: str) -> str:
+    """Returns the SHA-256 digest of a mandate template.
+
+    Each template is only hashed once per process. The file metadata is checked on
+    every call and the template is hashed again if it changed: if its digest differs
+    from the one previously computed or from the one recorded in
+    `MANDAT_TEMPLATE_DIGESTS_FILE`, `MandatTemplateChangedError` is raised.
+
+    :param mandat_template_path: path of the template as used by Django's template
+        engine (without `templates` prepended)
+    """
+    file_path = f"templates/{mandat_template_path}"
+    stat = os.stat(Path(__file__).resolve().parent / file_path)
+
+    known = _mandat_template_digests.get(mandat_template_path)
+    if known is not None and known[:2] == (stat.st_mtime_ns, stat.st_size):
+        return known[2]
+
+    with _mandat_template_digests_lock:
+        digest = generate_file_sha256_hash(file_path)
+        expected = (
+            known[2]
+            if known is not None
+            else load_mandat_template_digests_file().get(mandat_template_path)
+        )
+        if expected is not None and expected != digest:
+            raise MandatTemplateChangedError(
+                f"Mandate template {mandat_template_path} was modified: its SHA-256 "
+                f"digest is {digest} instead of {expected}"
+            )
+
+        _mandat_template_digests[mandat_template_path] = (
+            stat.st_mtime_ns,
+            stat.st_size,
+            digest,
+        )
+        return digest
+
+
 def validate_attestation_hash(attestation_string, attestation_hash):
     attestation_string_with_salt = attestation_string + settings.ATTESTATION_SALT
     new_attestation_hash = generate_sha256_hash(
@@ -70,34 +153,66 @@ def generate_qrcode_png(string: str):
     return stream.getvalue()
 
 
-def generate_attestation_hash(
-    aidant: "Aidant",
-    usager: "Usager",
+def generate_qrcode_svg(string: str) -> bytes:
+    """Generates a QR code as a single SVG path, one rectangle per run of modules.
+
+    Unlike `generate_qrcode_png`, nothing is rasterized: this is cheaper to produce
+    and prints sharply at any size.
+    """
+    qr = qrcode.QRCode()
+    qr.add_data(string)
+    qr.make(fit=True)
+    matrix = qr.get_matrix()
+    size = len(matrix)
+
+    path = []
+    for y, row in enumerate(matrix):
+        x = 0
+        while x < size:
+            if not row[x]:
+                x += 1
+                continue
+            start = x
+            while x < size and row[x]:
+                x += 1
+            path.append(f"M{start} {y}h{x - start}v1h-{x - start}z")
+
+    return (
+        f'<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 {size} {size}" '
+        f'shape-rendering="crispEdges">'
+        f'<path fill="#fff" d="M0 0h{size}v{size}H0z"/>'
+        f'<path d="{"".join(path)}"/>'
+        f"</svg>"
+    ).encode()
+
+
+def get_attestation_data(
+    aidant_id: int,
+    organisation_id: int,
+    usager_sub: str,
     demarches: Union[str, list],
     expiration_date: datetime,
-    creation_date: str = date.today().isoformat(),
-    mandat_template_path: str = settings.MANDAT_TEMPLATE_PATH,
-    organisation_id: Optional[int] = None,
-):
-    organisation_id = (
-        aidant.organisation.id if organisation_id is None else organisation_id
-    )
-
+    creation_date: str,
+) -> dict:
+    """Returns the data signed by an attestation hash, except the template digest"""
     if isinstance(demarches, str):
         demarches_list = demarches
     else:
         demarches.sort()
         demarches_list = ",".join(demarches)
 
-    attestation_data = {
-        "aidant_id": aidant.id,
+    return {
+        "aidant_id": aidant_id,
         "creation_date": creation_date,
         "demarches_list": demarches_list,
         "expiration_date": expiration_date.date().isoformat(),
         "organisation_id": organisation_id,
-        "template_hash": generate_file_sha256_hash(f"templates/{mandat_template_path}"),
-        "usager_sub": usager.sub,
+        "usager_sub": usager_sub,
     }
+
+
+def hash_attestation_data(attestation_data: dict, template_digest: str) -> str:
+    attestation_data = {**attestation_data, "template_hash": template_digest}
     sorted_attestation_data = dict(sorted(attestation_data.items()))
     attestation_string = ";".join(
         str(x) for x in list(sorted_attestation_data.values())
@@ -106,6 +221,82 @@ def generate_attestation_hash(
     return generate_sha256_hash(attestation_string_with_salt.encode("utf-8"))
 
 
+def generate_attestation_hash(
+    aidant: "Aidant",
+    usager: "Usager",
+    demarches: Union[str, list],
+    expiration_date: datetime,
+    creation_date: str = date.today().isoformat(),
+    mandat_template_path: str = settings.MANDAT_TEMPLATE_PATH,
+    organisation_id: Optional[int] = None,
+):
+    organisation_id = (
+        aidant.organisation.id if organisation_id is None else organisation_id
+    )
+
+    attestation_data = get_attestation_data(
+        aidant.id,
+        organisation_id,
+        usager.sub,
+        demarches,
+        expiration_date,
+        creation_date,
+    )
+    return hash_attestation_data(
+        attestation_data, get_mandat_template_digest(mandat_template_path)
+    )
+
+
+@lru_cache(maxsize=None)
+def list_mandat_template_paths() -> Tuple[str, ...]:
+    """Lists the mandate templates that ever were in use.
+
+    Templates are never modified nor removed so the directory is only read once per
+    process.
+    """
+    template_dir = (
+        Path(__file__).resolve().parent / "templates" / settings.MANDAT_TEMPLATE_DIR
+    )
+    return tuple(
+        sorted(
+            f"{settings.MANDAT_TEMPLATE_DIR}/{entry.name}"
+            for entry in os.scandir(template_dir)
+            if entry.is_file()
+        )
+    )
+
+
+def get_mandat_template_digests() -> Dict[str, str]:
+    """Maps the path of every mandate template to its SHA-256 digest"""
+    return {
+        path: get_mandat_template_digest(path) for path in list_mandat_template_paths()
+    }
+
+
+def find_mandat_template_path(
+    attestations: Iterable[Tuple[dict, str]], template_digests: Dict[str, str]
+) -> Optional[str]:
+    """Finds which template was used to generate one of the given attestations.
+
+    This only hashes the given values, without any database or filesystem access, so
+    that it can be run in worker processes.
+
+    :param attestations: pairs of attestation data, as returned by
+        `get_attestation_data`, and of the attestation hash it is expected to match
+    :param template_digests: as returned by `get_mandat_template_digests`
+    :return: the path of the matching template, `None` if no template matches
+    """
+    for attestation_data, attestation_hash in attestations:
+        for template_path, template_digest in template_digests.items():
+            if (
+                hash_attestation_data(attestation_data, template_digest)
+                == attestation_hash
+            ):
+                return template_path
+
+    return None
+
+
 def generate_mailto_link(recipient: str, subject: str, body: str):
     urlencoded = urlencode(
         {"subject": subject, "body": body},
@@ -7,9 +7,15 @@ from django.db import IntegrityError
 from django.shortcuts import redirect, render
 
 import jwt
-import requests as python_request
 from jwt.api_jwt import ExpiredSignatureError
-
+from requests.exceptions import RequestException
+
+from aidants_connect_common.utils.http_client import franceconnect
+from aidants_connect_web.fc_handshakes import (
+    end_fs_state,
+    find_fs_connection_id,
+    register_fs_state,
+)
 from aidants_connect_web.models import Connection, Journal, Usager
 from aidants_connect_web.utilities import generate_sha256_hash
 
@@ -24,6 +30,7 @@ def fc_authorize(request):
     connection.nonce = token_urlsafe(16)
     connection.connection_type = "FS"
     connection.save()
+    register_fs_state(connection)
 
     fc_base = settings.FC_AS_FS_BASE_URL
     fc_id = settings.FC_AS_FS_ID
@@ -75,7 +82,7 @@ def fc_callback(request):
     state = request.GET.get("state")
 
     try:
-        connection = Connection.objects.get(state=state)
+        connection = Connection.objects.get(pk=find_fs_connection_id(state))
     except Connection.DoesNotExist:
         return fc_error(f"FC as FS - This state does not seem to exist: {state}")
 
@@ -102,7 +109,10 @@ def fc_callback(request):
     }
     headers = {"Accept": "application/json"}
 
-    request_for_token = python_request.post(token_url, data=payload, headers=headers)
+    try:
+        request_for_token = franceconnect.post(token_url, data=payload, headers=headers)
+    except RequestException as e:
+        return fc_error(f"Request to {token_url} failed: {e}")
 
     try:
         content = request_for_token.json()
@@ -150,6 +160,7 @@ def fc_callback(request):
         aidant=connection.aidant,
         usager=connection.usager,
     )
+    end_fs_state(state)
 
     logout_base = f"{fc_base}/logout"
     logout_id_token = f"id_token_hint={fc_id_token}"
@@ -161,10 +172,13 @@ def fc_callback(request):
 
 def get_user_info(connection: Connection) -> tuple:
     fc_base = settings.FC_AS_FS_BASE_URL
-    fc_user_info = python_request.get(
-        f"{fc_base}/userinfo?schema=openid",
-        headers={"Authorization": f"Bearer {connection.access_token}"},
-    )
+    try:
+        fc_user_info = franceconnect.get(
+            f"{fc_base}/userinfo?schema=openid",
+            headers={"Authorization": f"Bearer {connection.access_token}"},
+        )
+    except RequestException as e:
+        return None, f"Request to FC userinfo failed: {e}"
     user_info = fc_user_info.json()
 
     user_phone = connection.user_phone if len(connection.user_phone) > 0 else None
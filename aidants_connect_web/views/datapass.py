@@ -1,11 +1,11 @@
 import logging
 
 from django.conf import settings
-from django.core.mail import send_mail
 from django.http import HttpResponse, HttpResponseBadRequest, HttpResponseForbidden
 from django.views.decorators.csrf import csrf_exempt
 
 from aidants_connect_web.forms import DatapassForm, DatapassHabilitationForm
+from aidants_connect_web.mail import queue_mail
 from aidants_connect_web.models import (
     HabilitationRequest,
     Organisation,
@@ -78,7 +78,7 @@ def organisation_receiver(request):
             type=orga_type,
         )
 
-        send_mail(
+        queue_mail(
             subject="Une nouvelle structure",
             message=f"""
                 la structure {this_organisation.name} vient
@@ -89,7 +89,6 @@ def organisation_receiver(request):
             """,
             from_email=settings.DATAPASS_FROM_EMAIL,
             recipient_list=[settings.DATAPASS_TO_EMAIL],
-            fail_silently=False,
         )
 
         return HttpResponse(status=202)
@@ -6,7 +6,6 @@ from secrets import token_urlsafe
 from django.conf import settings
 from django.contrib.auth import logout
 from django.contrib.auth.decorators import login_required
-from django.contrib.auth.hashers import make_password
 from django.core.exceptions import ObjectDoesNotExist
 from django.forms.models import model_to_dict
 from django.http import (
@@ -24,8 +23,14 @@ from django.views.decorators.csrf import csrf_exempt
 import jwt
 
 from aidants_connect_web.decorators import activity_required, user_is_aidant
+from aidants_connect_web.fc_handshakes import (
+    end_fi_handshake,
+    get_fi_handshake,
+    save_fi_handshake,
+    start_fi_handshake,
+)
 from aidants_connect_web.models import Aidant, Connection, Journal, Usager
-from aidants_connect_web.utilities import generate_sha256_hash
+from aidants_connect_web.utilities import generate_sha256_hash, generate_token_digest
 
 logging.basicConfig(level=logging.INFO)
 log = logging.getLogger()
@@ -105,9 +110,8 @@ def authorize(request):
                 else HttpResponseForbidden()
             )
 
-        connection = Connection.objects.create(
-            state=parameters["state"],
-            nonce=parameters["nonce"],
+        connection_id = start_fi_handshake(
+            Connection(state=parameters["state"], nonce=parameters["nonce"])
         )
         aidant = request.user
 
@@ -115,7 +119,7 @@ def authorize(request):
             request,
             "aidants_connect_web/id_provider/authorize.html",
             {
-                "connection_id": connection.id,
+                "connection_id": connection_id,
                 "usagers": aidant.get_usagers_with_active_autorisation(),
                 "aidant": aidant,
             },
@@ -127,17 +131,17 @@ def authorize(request):
             "chosen_usager": request.POST.get("chosen_usager"),
         }
 
-        try:
-            connection = Connection.objects.get(pk=parameters["connection_id"])
-            if connection.is_expired:
-                log.info("connection has expired at authorize")
-                return render(request, "408.html", status=408)
-        except ObjectDoesNotExist:
+        connection = get_fi_handshake(parameters["connection_id"])
+        if connection is None:
             log.info("No connection corresponds to the connection_id:")
             log.info(parameters["connection_id"])
             logout(request)
             return HttpResponseForbidden()
 
+        if connection.is_expired:
+            log.info("connection has expired at authorize")
+            return render(request, "408.html", status=408)
+
         aidant = request.user
         chosen_usager = Usager.objects.get(pk=parameters["chosen_usager"])
         if chosen_usager not in aidant.get_usagers_with_active_autorisation():
@@ -151,10 +155,11 @@ def authorize(request):
             return HttpResponseForbidden()
 
         connection.usager = chosen_usager
-        connection.save()
+        save_fi_handshake(parameters["connection_id"], connection)
 
         select_demarches_url = (
-            f"{reverse('fi_select_demarche')}?connection_id={connection.id}"
+            f"{reverse('fi_select_demarche')}"
+            f"?connection_id={parameters['connection_id']}"
         )
         return redirect(select_demarches_url)
 
@@ -168,17 +173,17 @@ def fi_select_demarche(request):
             "connection_id": request.GET.get("connection_id"),
         }
 
-        try:
-            connection = Connection.objects.get(pk=parameters["connection_id"])
-            if connection.is_expired:
-                log.info("Connection has expired at select_demarche")
-                return render(request, "408.html", status=408)
-        except ObjectDoesNotExist:
+        connection = get_fi_handshake(parameters["connection_id"])
+        if connection is None:
             log.info("No connection matches the connection_id:")
             log.info(parameters["connection_id"])
             logout(request)
             return HttpResponseForbidden()
 
+        if connection.is_expired:
+            log.info("Connection has expired at select_demarche")
+            return render(request, "408.html", status=408)
+
         aidant = request.user
 
         usager_demarches = aidant.get_active_demarches_for_usager(connection.usager)
@@ -192,7 +197,7 @@ def fi_select_demarche(request):
             request,
             "aidants_connect_web/id_provider/fi_select_demarche.html",
             {
-                "connection_id": connection.id,
+                "connection_id": parameters["connection_id"],
                 "aidant": request.user.get_full_name(),
                 "usager": connection.usager,
                 "demarches": demarches,
@@ -205,17 +210,17 @@ def fi_select_demarche(request):
             "chosen_demarche": request.POST.get("chosen_demarche"),
         }
 
-        try:
-            connection = Connection.objects.get(pk=parameters["connection_id"])
-            if connection.is_expired:
-                log.info("connection has expired at select_demarche")
-                return render(request, "408.html", status=408)
-        except ObjectDoesNotExist:
+        connection = get_fi_handshake(parameters["connection_id"])
+        if connection is None:
             log.info("No connection corresponds to the connection_id:")
             log.info(parameters["connection_id"])
             logout(request)
             return HttpResponseForbidden()
 
+        if connection.is_expired:
+            log.info("connection has expired at select_demarche")
+            return render(request, "408.html", status=408)
+
         aidant: Aidant = request.user
         autorisation = aidant.get_valid_autorisation(
             parameters["chosen_demarche"], connection.usager
@@ -225,13 +230,15 @@ def fi_select_demarche(request):
             return HttpResponseForbidden()
 
         code = token_urlsafe(64)
-        connection.code = make_password(code, settings.FC_AS_FI_HASH_SALT)
+        connection.code_digest = generate_token_digest(code)
         connection.demarche = parameters["chosen_demarche"]
         connection.autorisation = autorisation
         connection.complete = True
         connection.aidant = aidant
         connection.organisation = aidant.organisation
+        # Only complete connections are persisted
         connection.save()
+        end_fi_handshake(parameters["connection_id"])
 
         return redirect(
             f"{settings.FC_AS_FI_CALLBACK_URL}?code={code}&state={connection.state}"
@@ -279,9 +286,8 @@ def token(request):
             else HttpResponseForbidden()
         )
 
-    code_hash = make_password(parameters["code"], settings.FC_AS_FI_HASH_SALT)
     try:
-        connection = Connection.objects.get(code=code_hash)
+        connection = Connection.objects.get_by_code(parameters["code"])
         if connection.is_expired:
             log.info("connection has expired at token")
             return render(request, "408.html", status=408)
@@ -307,7 +313,8 @@ def token(request):
     encoded_id_token = jwt.encode(id_token, client_secret, algorithm="HS256")
 
     access_token = token_urlsafe(64)
-    connection.access_token = make_password(access_token, settings.FC_AS_FI_HASH_SALT)
+    connection.access_token = generate_token_digest(access_token)
+    connection.access_token_digest = connection.access_token
     connection.save()
 
     response = {
@@ -334,9 +341,10 @@ def user_info(request):
         return HttpResponseForbidden()
 
     auth_token = auth_header[7:]
-    auth_token_hash = make_password(auth_token, settings.FC_AS_FI_HASH_SALT)
     try:
-        connection = Connection.objects.get(access_token=auth_token_hash)
+        connection = Connection.objects.select_related(
+            "usager", "aidant__organisation", "autorisation"
+        ).get_by_access_token(auth_token)
         if connection.is_expired:
             log.info("connection has expired at user_info")
             return render(request, "408.html", status=408)
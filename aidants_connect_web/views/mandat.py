@@ -5,29 +5,17 @@ from typing import Collection
 from django.conf import settings
 from django.contrib import messages as django_messages
 from django.contrib.auth.decorators import login_required
-from django.contrib.staticfiles import finders
 from django.db import IntegrityError
-from django.http import HttpResponse
 from django.shortcuts import redirect, render
 from django.template.loader import render_to_string
-from django.utils import formats, timezone
+from django.urls import NoReverseMatch
+from django.utils import formats
 
-from aidants_connect_common.utils.constants import AuthorizationDurations
 from aidants_connect_web.decorators import activity_required, user_is_aidant
 from aidants_connect_web.forms import MandatForm, RecapMandatForm
-from aidants_connect_web.models import (
-    Aidant,
-    Autorisation,
-    Connection,
-    Journal,
-    Mandat,
-    Usager,
-)
-from aidants_connect_web.utilities import (
-    generate_attestation_hash,
-    generate_mailto_link,
-    generate_qrcode_png,
-)
+from aidants_connect_web.models import Aidant, Connection, Mandat, Usager
+from aidants_connect_web.qrcodes import PNG, REVALIDATE_CACHE_CONTROL, qrcode_response
+from aidants_connect_web.utilities import generate_mailto_link
 from aidants_connect_web.views.service import humanize_demarche_names
 
 logging.basicConfig(level=logging.INFO)
@@ -130,58 +118,18 @@ def new_mandat_recap(request):
         form = RecapMandatForm(aidant=aidant, data=request.POST)
 
         if form.is_valid():
-            now = timezone.now()
-            durationkw = connection.duree_keyword
-            mandat_expiration_date = AuthorizationDurations.expiration(durationkw, now)
-            mandat_duree = AuthorizationDurations.duration(durationkw, now)
-
             try:
                 connection.demarches.sort()
 
-                # Create a mandat
-                mandat = Mandat.objects.create(
-                    organisation=aidant.organisation,
-                    usager=usager,
-                    duree_keyword=connection.duree_keyword,
-                    expiration_date=mandat_expiration_date,
-                    is_remote=connection.mandat_is_remote,
-                )
-
-                # Add a Journal 'create_attestation' action
-                Journal.log_attestation_creation(
+                Mandat.create_with_autorisations(
                     aidant=aidant,
                     usager=usager,
                     demarches=connection.demarches,
-                    duree=mandat_duree,
-                    is_remote_mandat=connection.mandat_is_remote,
+                    duree_keyword=connection.duree_keyword,
+                    is_remote=connection.mandat_is_remote,
                     access_token=connection.access_token,
-                    attestation_hash=generate_attestation_hash(
-                        aidant, usager, connection.demarches, mandat_expiration_date
-                    ),
-                    mandat=mandat,
                 )
 
-                # This loop creates one `autorisation` object per `démarche` in the form
-                for demarche in connection.demarches:
-                    # Revoke existing demarche autorisation(s)
-                    similar_active_autorisations = Autorisation.objects.active().filter(
-                        mandat__organisation=aidant.organisation,
-                        mandat__usager=usager,
-                        demarche=demarche,
-                    )
-                    for similar_active_autorisation in similar_active_autorisations:
-                        similar_active_autorisation.revoke(
-                            aidant=aidant, revocation_date=now
-                        )
-
-                    # Create new demarche autorisation
-                    autorisation = Autorisation.objects.create(
-                        mandat=mandat,
-                        demarche=demarche,
-                        last_renewal_token=connection.access_token,
-                    )
-                    Journal.log_autorisation_creation(autorisation, aidant)
-
             except AttributeError as error:
                 log.error("Error happened in Recap")
                 log.error(error)
@@ -396,10 +344,26 @@ def attestation_qrcode(request):
         if journal_create_attestation is not None:
             attestation_hash = journal_create_attestation.attestation_hash
 
-    if attestation_hash is not None:
-        qrcode_png = generate_qrcode_png(attestation_hash)
-    else:
-        with open(finders.find("images/empty_qr_code.png"), "rb") as f:
-            qrcode_png = f.read()
+    if attestation_hash is None:
+        return qrcode_response(request, None)
+
+    # The mandate templates embed this URL and can't be modified without changing
+    # their digest: the image is served from its hash-keyed URL, which browsers
+    # and the QR code caches keep for good
+    try:
+        response = redirect(
+            "attestation_qrcode_image",
+            attestation_hash=attestation_hash,
+            image_format=PNG,
+        )
+    except NoReverseMatch:
+        return qrcode_response(request, attestation_hash)
+    response["Cache-Control"] = REVALIDATE_CACHE_CONTROL
+    return response
 
-    return HttpResponse(qrcode_png, "image/png")
+
+@login_required
+@user_is_aidant
+@activity_required
+def attestation_qrcode_image(request, attestation_hash, image_format):
+    return qrcode_response(request, attestation_hash, image_format, immutable=True)
@@ -1,9 +1,7 @@
 from secrets import token_urlsafe
 
-from django.conf import settings
 from django.contrib import messages as django_messages
 from django.contrib.auth.decorators import login_required
-from django.contrib.auth.hashers import make_password
 from django.shortcuts import redirect
 from django.urls import reverse
 from django.utils.decorators import method_decorator
@@ -13,6 +11,7 @@ from aidants_connect_common.utils.constants import AuthorizationDurations
 from aidants_connect_web.decorators import activity_required, user_is_aidant
 from aidants_connect_web.forms import MandatForm
 from aidants_connect_web.models import Aidant, Connection, Journal, Mandat, Usager
+from aidants_connect_web.utilities import generate_token_digest
 
 
 class RenewMandat(FormView):
@@ -38,7 +37,7 @@ class RenewMandat(FormView):
 
     def form_valid(self, form):
         data = form.cleaned_data
-        access_token = make_password(token_urlsafe(64), settings.FC_AS_FI_HASH_SALT)
+        access_token = generate_token_digest(token_urlsafe(64))
         connection = Connection.objects.create(
             aidant=self.aidant,
             organisation=self.aidant.organisation,
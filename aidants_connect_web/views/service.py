@@ -1,18 +1,19 @@
 import logging
-from datetime import timedelta
 from operator import itemgetter
 
 from django.conf import settings
 from django.contrib import messages as django_messages
 from django.contrib.auth import logout
 from django.contrib.auth.decorators import login_required
+from django.core.cache import cache
 from django.http import HttpResponseNotFound
 from django.shortcuts import redirect, render
-from django.utils import timezone
-from django.utils.http import url_has_allowed_host_and_scheme
+from django.utils.cache import add_never_cache_headers, patch_cache_control
+from django.utils.http import http_date, url_has_allowed_host_and_scheme
 
 from aidants_connect_web.forms import OTPForm
-from aidants_connect_web.models import Aidant, Journal, Mandat, Organisation, Usager
+from aidants_connect_web.models import Journal, StatisticsSnapshot
+from aidants_connect_web.tasks import refresh_statistics_snapshot
 
 logging.basicConfig(level=logging.INFO)
 log = logging.getLogger()
@@ -53,76 +54,35 @@ def habilitation(request):
     return render(request, "public_website/habilitation.html")
 
 
-def statistiques(request):
-    last_30_days = timezone.now() - timedelta(days=30)
-    stafforg = settings.STAFF_ORGANISATION_NAME
-
-    def get_usager_ids(query_set) -> list:
-        return [query_set_item.usager_id for query_set_item in query_set]
-
-    organisations_accredited_count = (
-        Organisation.objects.accredited().exclude(name=stafforg).count()
-    )
-    organisations_not_accredited_count = (
-        Organisation.objects.not_yet_accredited().exclude(name=stafforg).count()
-    )
+def _schedule_statistics_snapshot():
+    # Concurrent hits schedule the task once per cache timeout; tasks scheduled by
+    # other processes do nothing once the first snapshot exists
+    if not cache.add("statistics_snapshot_scheduled", True, timeout=60):
+        return
 
-    aidants_count = (
-        Aidant.objects.exclude(organisation__name=stafforg)
-        .filter(carte_totp__isnull=False)
-        .filter(is_active=True)
-        .filter(can_create_mandats=True)
-        .count()
-    )
-    aidants_not_accredited_count = (
-        Aidant.objects.exclude(organisation__name=stafforg)
-        .filter(carte_totp__isnull=True)
-        .filter(is_active=True)
-        .filter(can_create_mandats=True)
-        .count()
-    )
+    try:
+        refresh_statistics_snapshot.delay(only_if_missing=True)
+    except Exception as e:
+        log.error("Could not schedule the first statistics snapshot", exc_info=e)
 
-    # mandats
-    # # mandats prep
-    mandats = Mandat.objects.exclude(organisation__name=stafforg)
-    active_mandats = mandats.active()
-
-    # # mandat results
-    mandat_count = mandats.count()
-    active_mandat_count = active_mandats.count()
-
-    # Usagers
-    usagers_with_mandat_count = Usager.objects.filter(
-        pk__in=get_usager_ids(mandats)
-    ).count()
-    usagers_with_active_mandat_count = Usager.objects.filter(
-        pk__in=get_usager_ids(active_mandats)
-    ).count()
-
-    # Autorisations
-    # # Autorisation prep
-    autorisation_use = Journal.objects.excluding_staff().filter(
-        action="use_autorisation"
-    )
-    autorisation_use_recent = autorisation_use.filter(creation_date__gte=last_30_days)
 
-    # # Autorisation results
-    autorisation_use_count = autorisation_use.count()
-    autorisation_use_recent_count = autorisation_use_recent.count()
-
-    usagers_helped_count = Usager.objects.filter(
-        pk__in=get_usager_ids(autorisation_use)
-    ).count()
-    usagers_helped_recent_count = Usager.objects.filter(
-        pk__in=get_usager_ids(autorisation_use_recent)
-    ).count()
+def statistiques(request):
+    snapshot_pending = False
+    try:
+        snapshot = StatisticsSnapshot.objects.latest()
+    except StatisticsSnapshot.DoesNotExist:
+        # The refresh task has not run yet: the statistics are computed in the
+        # background and the page shows empty figures meanwhile
+        _schedule_statistics_snapshot()
+        snapshot_pending = True
+        snapshot = StatisticsSnapshot()
 
     # # Démarches
     demarches_count = [
         {
             "title": settings.DEMARCHES[demarche]["titre_court"],
             "icon": settings.DEMARCHES[demarche]["icon"],
-            "value": autorisation_use.filter(demarche=demarche).count(),
+            "value": snapshot.demarches_count.get(demarche, 0),
         }
         for demarche in settings.DEMARCHES.keys()
     ]
@@ -135,27 +95,43 @@ def statistiques(request):
 
     chart_data = {"labels": chart_labels, "data": chart_values, "icons": chart_icons}
 
-    return render(
+    response = render(
         request,
         "public_website/statistiques.html",
         {
             "data": chart_data,
-            "organisations_accredited_count": organisations_accredited_count,
-            "organisations_not_accredited_count": organisations_not_accredited_count,
-            "aidants_count": aidants_count,
-            "aidants_accrediting_count": aidants_not_accredited_count,
-            "mandats_count": mandat_count,
-            "active_mandats_count": active_mandat_count,
-            "usagers_with_mandat_count": usagers_with_mandat_count,
-            "usagers_with_active_mandat_count": usagers_with_active_mandat_count,
-            "autorisation_use_count": autorisation_use_count,
-            "autorisation_use_recent_count": autorisation_use_recent_count,
-            "usagers_helped_count": usagers_helped_count,
-            "usagers_helped_recent_count": usagers_helped_recent_count,
+            "organisations_accredited_count": snapshot.organisations_accredited_count,
+            "organisations_not_accredited_count": (
+                snapshot.organisations_not_accredited_count
+            ),
+            "aidants_count": snapshot.aidants_count,
+            "aidants_accrediting_count": snapshot.aidants_accrediting_count,
+            "mandats_count": snapshot.mandats_count,
+            "active_mandats_count": snapshot.active_mandats_count,
+            "usagers_with_mandat_count": snapshot.usagers_with_mandat_count,
+            "usagers_with_active_mandat_count": (
+                snapshot.usagers_with_active_mandat_count
+            ),
+            "autorisation_use_count": snapshot.autorisation_use_count,
+            "autorisation_use_recent_count": snapshot.autorisation_use_recent_count,
+            "usagers_helped_count": snapshot.usagers_helped_count,
+            "usagers_helped_recent_count": snapshot.usagers_helped_recent_count,
             "demarches_count": demarches_count,
+            "snapshot_pending": snapshot_pending,
+            "snapshot_date": snapshot.creation_date,
         },
     )
 
+    if snapshot_pending:
+        add_never_cache_headers(response)
+    else:
+        patch_cache_control(
+            response, public=True, max_age=settings.STATISTICS_CACHE_MAX_AGE
+        )
+        response["Last-Modified"] = http_date(snapshot.creation_date.timestamp())
+
+    return response
+
 
 @login_required()
 def activity_check(request):
@@ -1,29 +1,53 @@
 import logging
 from collections import OrderedDict
-from typing import Iterable
+from typing import Iterable, Optional
 
 from django.conf import settings
 from django.contrib import messages as django_messages
 from django.contrib.auth.decorators import login_required
+from django.core.paginator import Paginator
+from django.db.models import Count, Exists, OuterRef, Prefetch, Q
 from django.db.models.functions import Concat
 from django.shortcuts import redirect, render
 from django.utils import timezone
 from django.utils.timezone import now, timedelta
 
 from aidants_connect_web.decorators import activity_required
-from aidants_connect_web.models import Aidant, Autorisation, Journal, Mandat
+from aidants_connect_web.models import Aidant, Autorisation, Journal, Mandat, Usager
 from aidants_connect_web.views.service import humanize_demarche_names
 
 logging.basicConfig(level=logging.INFO)
 log = logging.getLogger()
 
 
-def _get_mandats_for_usagers_index(aidant):
+def _get_index_mandats(aidant):
     return (
-        Mandat.objects.prefetch_related("autorisations")
-        .filter(organisation=aidant.organisation)
+        Mandat.objects.filter(organisation=aidant.organisation)
         .exclude(expiration_date__lt=timezone.now() - timedelta(365))
         .exclude(autorisations__revocation_date__lt=timezone.now() - timedelta(365))
+    )
+
+
+def _get_mandats_for_usagers_index(aidant, usagers: Optional[Iterable] = None):
+    """
+    :param usagers: restricts the mandates to those of these usagers, e.g. the
+        usagers of a page of ``_get_usagers_for_usagers_index``
+    """
+    mandats = _get_index_mandats(aidant)
+    if usagers is not None:
+        mandats = mandats.filter(usager__in=usagers)
+
+    return (
+        mandats.select_related("usager")
+        .prefetch_related(
+            Prefetch(
+                "autorisations",
+                queryset=Autorisation.objects.filter(revocation_date=None).order_by(
+                    "pk"
+                ),
+                to_attr="active_autorisations",
+            )
+        )
         .annotate(
             for_ordering=Concat("usager__preferred_username", "usager__family_name")
         )
@@ -31,8 +55,40 @@ def _get_mandats_for_usagers_index(aidant):
     )
 
 
+def _get_usagers_for_usagers_index(aidant, search_term: str = ""):
+    """
+    Usagers listed by ``usagers_index``, in the order of the index: those with an
+    active mandate first. They are annotated with ``has_active_mandat``.
+
+    :param search_term: keeps the usagers whose names contain it
+    """
+    mandats = _get_index_mandats(aidant)
+    active_mandats = mandats.filter(
+        usager=OuterRef("pk"), expiration_date__gte=timezone.now()
+    ).filter(
+        Exists(Autorisation.objects.filter(mandat=OuterRef("pk"), revocation_date=None))
+    )
+
+    usagers = Usager.objects.filter(
+        Exists(mandats.filter(usager=OuterRef("pk")))
+    ).annotate(
+        has_active_mandat=Exists(active_mandats),
+        for_ordering=Concat("preferred_username", "family_name"),
+    )
+
+    if search_term:
+        usagers = usagers.filter(
+            Q(family_name__icontains=search_term)
+            | Q(given_name__icontains=search_term)
+            | Q(preferred_username__icontains=search_term)
+        )
+
+    return usagers.order_by("-has_active_mandat", "for_ordering", "pk")
+
+
 def _get_usagers_dict_from_mandats(mandats: Iterable[Mandat]) -> dict:
     """
+    :param mandats: mandates as returned by ``_get_mandats_for_usagers_index``
     :return: A dict containing data about the users from input mandates with attributes:
 
             with_valid_mandate -> OrderedDict[Usager, list[Tuple[str, bool]]
@@ -79,24 +135,26 @@ def _get_usagers_dict_from_mandats(mandats: Iterable[Mandat]) -> dict:
     usagers_with_valid_mandate = OrderedDict()
     usagers_without_valid_mandate = OrderedDict()
     delta = settings.MANDAT_EXPIRED_SOON
+    current_date = now()
 
     for mandat in mandats:
         if mandat.usager not in usagers:
             usagers[mandat.usager] = {"active_mandats": [], "inactive_mandats": []}
 
-        expired = mandat.expiration_date if mandat.expiration_date < now() else False
+        expired = (
+            mandat.expiration_date if mandat.expiration_date < current_date else False
+        )
 
         expired_soon = (
             mandat.expiration_date
-            if mandat.expiration_date - timedelta(days=delta) < now()
+            if mandat.expiration_date - timedelta(days=delta) < current_date
             else False
         )
 
-        autorisations = (
-            mandat.autorisations.filter(revocation_date=None).all().order_by("pk")
-        )
+        # Prefetched by _get_mandats_for_usagers_index
+        autorisations = mandat.active_autorisations
 
-        has_no_autorisations = autorisations.count() == 0
+        has_no_autorisations = len(autorisations) == 0
 
         if expired or has_no_autorisations:
             usagers[mandat.usager]["inactive_mandats"].append(
@@ -135,8 +193,28 @@ def _get_usagers_dict_from_mandats(mandats: Iterable[Mandat]) -> dict:
 @activity_required
 def usagers_index(request):
     aidant = request.user
-    mandats = _get_mandats_for_usagers_index(aidant)
+    search_term = request.GET.get("q", "").strip()
+
+    # Counts cover all the usagers of the organisation
+    counts = _get_usagers_for_usagers_index(aidant).aggregate(
+        with_valid_mandate_count=Count("pk", filter=Q(has_active_mandat=True)),
+        without_valid_mandate_count=Count("pk", filter=Q(has_active_mandat=False)),
+    )
+
+    # Only the mandates of the usagers of the requested page are loaded
+    page = Paginator(
+        _get_usagers_for_usagers_index(aidant, search_term),
+        settings.USAGERS_INDEX_PAGE_SIZE,
+    ).get_page(request.GET.get("page"))
+    mandats = _get_mandats_for_usagers_index(aidant, usagers=list(page))
+
     usagers_dict = _get_usagers_dict_from_mandats(mandats)
+    usagers_dict.update(
+        counts,
+        total=(
+            counts["with_valid_mandate_count"] + counts["without_valid_mandate_count"]
+        ),
+    )
 
     return render(
         request,
@@ -144,6 +222,8 @@ def usagers_index(request):
         {
             "aidant": aidant,
             "usagers_dict": usagers_dict,
+            "page": page,
+            "search_term": search_term,
         },
     )
 
@@ -319,15 +399,16 @@ def confirm_mandat_cancelation(request, mandat_id):
 
         if request.method == "POST":
             if request.POST:
-                autorisation_in_mandat = Autorisation.objects.filter(mandat=mandat)
-                for autorisation in autorisation_in_mandat:
-                    if not autorisation.revocation_date:
-                        autorisation.revocation_date = (
-                            autorisation.revocation_date
-                        ) = timezone.now()
-                        autorisation.save(update_fields=["revocation_date"])
-                        Journal.log_autorisation_cancel(autorisation, aidant)
-                Journal.log_mandat_cancel(mandat, aidant)
+                with Journal.batch():
+                    autorisation_in_mandat = Autorisation.objects.filter(mandat=mandat)
+                    for autorisation in autorisation_in_mandat:
+                        if not autorisation.revocation_date:
+                            autorisation.revocation_date = (
+                                autorisation.revocation_date
+                            ) = timezone.now()
+                            autorisation.save(update_fields=["revocation_date"])
+                            Journal.log_autorisation_cancel(autorisation, aidant)
+                    Journal.log_mandat_cancel(mandat, aidant)
                 return redirect("mandat_cancelation_success", mandat_id=mandat.id)
             else:
                 return render(